@@ -0,0 +1,162 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from crewai import Agent
+
+from .agents import ClassificationAgents, AlertAgents, JiraAgents, LogAgents, SynthesisAgents
+
+logger = logging.getLogger(__name__)
+
+# agent 标识 -> 构造函数
+AGENT_FACTORIES: Dict[str, Callable[[Any], Agent]] = {
+    # 分类agents
+    'input_classifier': ClassificationAgents.input_classifier_agent,
+    'pattern_extractor': ClassificationAgents.pattern_extraction_agent,
+
+    # 告警分析agents
+    'alert_triage': AlertAgents.alert_triage_agent,
+    'alert_component': AlertAgents.alert_component_identifier_agent,
+    'alert_log_strategy': AlertAgents.alert_log_search_strategist_agent,
+    'alert_log_executor': AlertAgents.alert_log_searcher_agent,
+    'alert_business_impact': AlertAgents.alert_business_impact_assessor_agent,
+
+    # Jira分析agents
+    'jira_fetcher': JiraAgents.jira_fetcher_agent,
+    'jira_categorizer': JiraAgents.jira_categorizer_agent,
+    'jira_tech_analyzer': JiraAgents.jira_technical_analyzer_agent,
+    'jira_context_enricher': JiraAgents.jira_context_enricher_agent,
+
+    # 日志分析agents
+    'log_executor': LogAgents.log_search_executor_agent,
+    'log_pattern': LogAgents.log_pattern_analyzer_agent,
+    'log_anomaly': LogAgents.log_anomaly_detector_agent,
+    'log_correlation': LogAgents.log_correlation_analyst_agent,
+
+    # 综合分析agents
+    'timeline_reconstructor': SynthesisAgents.timeline_reconstructor_agent,
+    'root_cause_generator': SynthesisAgents.root_cause_hypothesis_generator_agent,
+    'hypothesis_validator': SynthesisAgents.hypothesis_validator_agent,
+    'solution_architect': SynthesisAgents.solution_architect_agent,
+    'report_generator': SynthesisAgents.report_generator_agent,
+    'qa_specialist': SynthesisAgents.quality_assurance_agent,
+}
+
+# 工作流任务类型 -> 执行该任务的 agent 标识
+# 分类任务（input_classification、pattern_extraction）已在分类阶段处理，不在工作流中执行
+TASK_AGENT_KEYS: Dict[str, str] = {
+    # 告警分析任务
+    'alert_triage': 'alert_triage',
+    'alert_component_identification': 'alert_component',
+    'alert_log_search_params': 'alert_log_strategy',
+    'alert_business_impact': 'alert_business_impact',
+
+    # Jira分析任务
+    'jira_basic_info': 'jira_fetcher',
+    'jira_categorization': 'jira_categorizer',
+    'jira_components_analysis': 'jira_tech_analyzer',
+    'jira_context_enrichment': 'jira_context_enricher',
+
+    # 日志分析任务
+    'log_search_execution': 'log_executor',
+    'log_pattern_analysis': 'log_pattern',
+    'log_anomaly_detection': 'log_anomaly',
+    'log_correlation_analysis': 'log_correlation',
+
+    # 综合分析任务
+    'timeline_reconstruction': 'timeline_reconstructor',
+    'root_cause_hypothesis': 'root_cause_generator',
+    'hypothesis_validation': 'hypothesis_validator',
+    'solution_architecture': 'solution_architect',
+    'comprehensive_report': 'report_generator',
+    'fast_synthesis': 'report_generator',
+}
+
+
+def agent_key_for_task(task_type: str) -> Optional[str]:
+    """获取执行任务的 agent 标识，没有对应 agent 时返回 None"""
+    return TASK_AGENT_KEYS.get(task_type)
+
+
+class AgentPool:
+    """进程级 agent 池 - agent 按需构造，租借给 Flow 使用后归还复用
+
+    crewai 的 Agent 在执行期间会记录 crew、工具结果等状态，不能被多个任务同时使用，
+    因此每次租借独占一个实例；没有空闲实例时才构造新的，每个 (agent, LLM) 组合
+    最多保留 max_idle_per_key 个空闲实例。
+    """
+
+    def __init__(self, max_idle_per_key: int = 8):
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: Dict[Tuple[str, str], List[Agent]] = {}
+        self._lock = threading.Lock()
+        self._built = 0
+        self._leased = 0
+        self._reused = 0
+
+    @contextmanager
+    def lease(self, agent_key: str, llm) -> Iterator[Agent]:
+        """租借一个 agent，上下文结束时自动归还"""
+        agent = self.acquire(agent_key, llm)
+        try:
+            yield agent
+        finally:
+            self.release(agent_key, llm, agent)
+
+    def acquire(self, agent_key: str, llm) -> Agent:
+        """取出一个空闲 agent，没有空闲实例时构造新的"""
+        factory = AGENT_FACTORIES.get(agent_key)
+        if factory is None:
+            raise KeyError(f"未知的 agent: '{agent_key}'")
+
+        pool_key = self._pool_key(agent_key, llm)
+        with self._lock:
+            idle_agents = self._idle.get(pool_key)
+            self._leased += 1
+            if idle_agents:
+                self._reused += 1
+                return idle_agents.pop()
+            self._built += 1
+
+        # 构造在锁外进行，避免阻塞其他线程租借
+        logger.debug(f"构造 agent: {agent_key}")
+        return factory(llm)
+
+    def release(self, agent_key: str, llm, agent: Agent):
+        """归还 agent，清理上一次执行留下的状态"""
+        self._reset(agent)
+        pool_key = self._pool_key(agent_key, llm)
+        with self._lock:
+            self._leased -= 1
+            idle_agents = self._idle.setdefault(pool_key, [])
+            if len(idle_agents) < self.max_idle_per_key:
+                idle_agents.append(agent)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取 agent 池当前状态"""
+        with self._lock:
+            return {
+                "agents_built": self._built,
+                "agents_reused": self._reused,
+                "agents_leased": self._leased,
+                "agents_idle": sum(len(agents) for agents in self._idle.values())
+            }
+
+    @staticmethod
+    def _pool_key(agent_key: str, llm) -> Tuple[str, str]:
+        # 注册表中的 LLM 按名称区分，其他 LLM 对象按实例区分
+        return agent_key, getattr(llm, "registry_name", None) or str(id(llm))
+
+    @staticmethod
+    def _reset(agent: Agent):
+        agent.tools_results = []
+        agent.crew = None
+        agent._times_executed = 0
+
+
+# 创建一个全局实例
+agent_pool = AgentPool(
+    max_idle_per_key=int(os.getenv("AGENT_POOL_MAX_IDLE_PER_KEY", "8"))
+)
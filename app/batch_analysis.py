@@ -0,0 +1,61 @@
+import logging
+from typing import Any, Dict, List
+
+from .flow_coalescer import fingerprint_text
+
+logger = logging.getLogger(__name__)
+
+
+class BatchGroup:
+    """批量分析中的一组输入 - 分类结果和指纹相同，共享一次 Flow 执行"""
+
+    def __init__(self, group_key: str, input_type: str, representative_text: str):
+        self.group_key = group_key
+        self.input_type = input_type
+        self.representative_text = representative_text
+        self.item_indexes: List[int] = []
+        self.request_id: str = ""
+
+
+class BatchAnalysisPlanner:
+    """批量分析规划器 - 一次遍历完成所有输入的规则分类和分组"""
+
+    def __init__(self):
+        self._rule_classifier = None
+
+    @property
+    def rule_classifier(self):
+        # 分类引擎依赖 crewai，首次规划时才导入，避免拖慢 API 进程启动
+        if self._rule_classifier is None:
+            from .classification_engine import RuleBasedClassifier
+            self._rule_classifier = RuleBasedClassifier()
+        return self._rule_classifier
+
+    def plan(self, texts: List[str]) -> Dict[str, Any]:
+        """对批量输入做规则分类并分组
+
+        返回 groups（按首次出现顺序）和 items（每个输入的分类信息和所属分组）。
+        """
+        groups: Dict[str, BatchGroup] = {}
+        items: List[Dict[str, Any]] = []
+
+        for index, text in enumerate(texts):
+            classification = self.rule_classifier.classify(text)
+            input_type = classification.input_type.value
+            group_key = f"{input_type}:{fingerprint_text(text)[:16]}"
+
+            group = groups.get(group_key)
+            if group is None:
+                group = BatchGroup(group_key, input_type, text)
+                groups[group_key] = group
+            group.item_indexes.append(index)
+
+            items.append({
+                "index": index,
+                "group_key": group_key,
+                "input_type": input_type,
+                "confidence": classification.confidence
+            })
+
+        logger.info(f"批量分析规划完成: {len(texts)} 条输入，分为 {len(groups)} 组")
+        return {"groups": list(groups.values()), "items": items}
@@ -1,15 +1,43 @@
+import os
 import logging
 import re
-import json
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Callable
 from crewai import Agent, Task, Crew, Process
+from pydantic import BaseModel
 
 from .flow_state import InputType, ClassificationResult
-from .agents import ClassificationAgents
+from .agent_pool import agent_pool
+from .llms import llm_registry
 from .tasks import TaskRegistry
+from .metrics import CLASSIFICATION_DURATION, PATTERN_EXTRACTION_DURATION
+from .output_parsing import parse_json_output
 
 logger = logging.getLogger(__name__)
 
+# 允许的 Jira 项目前缀（逗号分隔，如 CASH,LOAN），为空时接受除 NON_JIRA_KEY_PREFIXES 以外的所有前缀
+JIRA_PROJECT_KEYS = {key.strip().upper() for key in os.getenv("JIRA_PROJECT_KEYS", "").split(",") if key.strip()}
+# 形如 Jira 工单号、实际是编码、标准或算法名称的前缀（如 UTF-8、ISO-8601、SHA-256）
+NON_JIRA_KEY_PREFIXES = {
+    'UTF', 'UCS', 'ISO', 'IEC', 'RFC', 'SHA', 'MD', 'AES', 'RSA', 'DES', 'CRC', 'HMAC', 'TLS', 'SSL',
+    'HTTP', 'IPV', 'CVE', 'CWE', 'PEP', 'ECMA', 'IEEE', 'ANSI', 'ASCII', 'CP', 'WINDOWS', 'LATIN',
+    'GB', 'BIG', 'EUC', 'KOI', 'UTC', 'GMT', 'X', 'P',
+}
+
+
+def filter_jira_issue_keys(keys: List[str]) -> List[str]:
+    """过滤提取出的 Jira 工单号并去重：配置了 JIRA_PROJECT_KEYS 时只保留这些项目，否则排除常见的非工单前缀"""
+    filtered = []
+    for key in dict.fromkeys(key for key in keys or [] if isinstance(key, str)):
+        prefix = key.rsplit('-', 1)[0].upper()
+        if JIRA_PROJECT_KEYS:
+            if prefix in JIRA_PROJECT_KEYS:
+                filtered.append(key)
+        elif prefix not in NON_JIRA_KEY_PREFIXES:
+            filtered.append(key)
+    return filtered
+
+
 class ClassificationEngine:
     """高级输入分类引擎 - 整合规则和AI分类"""
     
@@ -18,9 +46,15 @@ class ClassificationEngine:
         self.rule_classifier = RuleBasedClassifier()
         self.ai_classifier = AIBasedClassifier(llm)
         
-    def classify(self, input_text: str) -> ClassificationResult:
-        """执行完整的输入分类流程"""
+    def classify(self, input_text: str,
+                 on_ai_pending: Optional[Callable[[ClassificationResult], None]] = None) -> ClassificationResult:
+        """执行完整的输入分类流程
+        
+        规则分类置信度不足、需要等待 AI 分类时，先以规则分类结果调用 on_ai_pending（用于推测执行）。
+        """
         logger.info(f"开始分类输入文本，长度: {len(input_text)}")
+        start_time = time.perf_counter()
+        path = "rule"
         
         try:
             # 1. 规则分类 - 快速初步判断
@@ -33,6 +67,12 @@ class ClassificationEngine:
                 return rule_result
             
             # 3. 置信度不够高，使用AI增强分类
+            path = "ai"
+            if on_ai_pending:
+                try:
+                    on_ai_pending(rule_result)
+                except Exception as e:
+                    logger.warning(f"AI 分类前回调失败: {e}")
             ai_result = self.ai_classifier.classify(input_text, rule_result)
             logger.info(f"AI增强分类结果: {ai_result.input_type.value}, 置信度: {ai_result.confidence}")
             
@@ -47,6 +87,8 @@ class ClassificationEngine:
                 extracted_data={},
                 reasoning=f"分类失败: {str(e)}"
             )
+        finally:
+            CLASSIFICATION_DURATION.observe(time.perf_counter() - start_time, path=path)
 
 class RuleBasedClassifier:
     """基于规则的快速分类器"""
@@ -84,7 +126,7 @@ class RuleBasedClassifier:
         text_lower = input_text.lower()
         
         # 检测Jira Issue Key
-        jira_matches = self.jira_pattern.findall(input_text)
+        jira_matches = filter_jira_issue_keys(self.jira_pattern.findall(input_text))
         has_jira = len(jira_matches) > 0
         
         # 计算各类型的匹配分数
@@ -226,29 +268,29 @@ class AIBasedClassifier:
         logger.info("执行AI增强分类...")
         
         try:
-            # 创建分类专家agent
-            classifier_agent = ClassificationAgents.input_classifier_agent(self.llm)
-            
-            # 创建分类任务
-            classification_task = TaskRegistry.create_task(
-                'input_classification',
-                agent=classifier_agent,
-                input_text=input_text
-            )
-            
-            # 创建crew执行分类
-            crew = Crew(
-                agents=[classifier_agent],
-                tasks=[classification_task],
-                process=Process.sequential,
-                verbose=False
-            )
-            
-            # 执行分类
-            result = crew.kickoff()
+            # 从 agent 池租借分类专家agent
+            llm = llm_registry.get_for_task('input_classification', fallback=self.llm)
+            with agent_pool.lease('input_classifier', llm) as classifier_agent:
+                # 创建分类任务
+                classification_task = TaskRegistry.create_task(
+                    'input_classification',
+                    agent=classifier_agent,
+                    input_text=input_text
+                )
+                
+                # 创建crew执行分类
+                crew = Crew(
+                    agents=[classifier_agent],
+                    tasks=[classification_task],
+                    process=Process.sequential,
+                    verbose=False
+                )
+                
+                # 执行分类
+                result = crew.kickoff()
             
             # 解析AI返回的结果
-            ai_result = self._parse_ai_result(result.raw, rule_result)
+            ai_result = self._parse_ai_result(result.raw, rule_result, result.pydantic)
             
             return ai_result
             
@@ -257,20 +299,17 @@ class AIBasedClassifier:
             # 使用规则分类结果作为fallback
             return rule_result
     
-    def _parse_ai_result(self, ai_output: str, rule_result: ClassificationResult) -> ClassificationResult:
-        """解析AI分类结果"""
+    def _parse_ai_result(self, ai_output: str, rule_result: ClassificationResult,
+                         structured: Optional[BaseModel] = None) -> ClassificationResult:
+        """解析AI分类结果，structured 为结构化输出得到的模型实例"""
         try:
-            # 尝试解析JSON格式的AI输出
-            if '{' in ai_output and '}' in ai_output:
-                # 提取JSON部分
-                start_idx = ai_output.find('{')
-                end_idx = ai_output.rfind('}') + 1
-                json_str = ai_output[start_idx:end_idx]
-                
-                ai_data = json.loads(json_str)
-                
+            ai_data = parse_json_output(
+                ai_output, 'input_classification',
+                TaskRegistry.get_output_model('input_classification'), structured
+            )
+            if ai_data is not None:
                 # 验证和映射输入类型
-                input_type_str = ai_data.get('input_type', 'unknown').lower()
+                input_type_str = (ai_data.get('input_type') or 'unknown').lower()
                 input_type_map = {
                     'alert': InputType.ALERT,
                     'jira_issue': InputType.JIRA_ISSUE,
@@ -280,11 +319,12 @@ class AIBasedClassifier:
                 }
                 
                 input_type = input_type_map.get(input_type_str, InputType.UNKNOWN)
-                confidence = min(1.0, max(0.0, ai_data.get('confidence', 0.5)))
+                confidence = ai_data.get('confidence')
+                confidence = min(1.0, max(0.0, 0.5 if confidence is None else float(confidence)))
                 
                 # 合并规则分类和AI分类的提取数据
                 combined_extracted_data = rule_result.extracted_data.copy()
-                combined_extracted_data.update(ai_data.get('extracted_data', {}))
+                combined_extracted_data.update(ai_data.get('extracted_data') or {})
                 
                 return ClassificationResult(
                     input_type=input_type,
@@ -293,7 +333,7 @@ class AIBasedClassifier:
                     reasoning=f"AI分类: {ai_data.get('reasoning', 'AI增强分类结果')}"
                 )
             
-        except (json.JSONDecodeError, KeyError) as e:
+        except (TypeError, ValueError, AttributeError) as e:
             logger.warning(f"AI结果解析失败: {e}")
         
         # 解析失败，返回规则分类结果但稍微提高置信度
@@ -304,46 +344,121 @@ class AIBasedClassifier:
             reasoning=f"{rule_result.reasoning} (AI增强处理)"
         )
 
+class LocalPatternExtractor:
+    """本地模式提取器 - 用一个预编译正则单次扫描提取格式固定的模式，不调用 LLM"""
+    
+    # 服务名只能识别带常见后缀的标识（如 payment-service），其余需要 LLM 理解语义
+    PATTERN = re.compile(
+        r'(?P<timestamps>\b\d{4}[-/]\d{2}[-/]\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?\b)'
+        r'|(?P<ip_addresses>\b(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b)'
+        r'|(?P<jira_issues>\b[A-Z][A-Z0-9_]*-\d+\b)'
+        r'|(?P<version_numbers>\bv?\d+\.\d+\.\d+(?:[-+][0-9A-Za-z.]+)?\b)'
+        r'|(?P<error_codes>(?i:\b(?:http|status|code)[ _:=]*[45]\d{2}\b)'
+        r'|\b[A-Za-z_][\w.]*(?:Exception|Error)\b|\b[A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+\b)'
+        r'|(?P<log_levels>\b(?:FATAL|ERROR|WARN|WARNING|INFO|DEBUG|TRACE)\b)'
+        r'|(?P<severity_indicators>(?i:\b(?:critical|urgent|severe|sev[ -]?[0-4]|p[0-4])\b)|严重|紧急|致命)'
+        r'|(?P<service_names>(?i:\b[a-z][a-z0-9]*(?:-[a-z0-9]+)*-(?:service|svc|api|server|worker|gateway|job)\b))'
+    )
+    
+    # 本地可以确定性提取的模式
+    DETERMINISTIC_PATTERNS = {
+        'timestamps', 'ip_addresses', 'jira_issues', 'version_numbers',
+        'error_codes', 'log_levels', 'severity_indicators'
+    }
+    
+    def extract(self, input_text: str, target_patterns: List[str]) -> Dict[str, List[str]]:
+        """提取目标模式，返回 {模式: 去重后的匹配列表}，没有匹配的模式不出现在结果中"""
+        found: Dict[str, List[str]] = {}
+        for match in self.PATTERN.finditer(input_text):
+            values = found.setdefault(match.lastgroup, [])
+            value = match.group().strip()
+            if value not in values:
+                values.append(value)
+        
+        # 带后缀的服务名同时作为日志搜索的应用名
+        if 'service_names' in found:
+            found['application_names'] = list(found['service_names'])
+        
+        return {pattern: found[pattern] for pattern in target_patterns if found.get(pattern)}
+
 class PatternExtractor:
-    """模式提取器 - 从输入中提取关键信息"""
+    """模式提取器 - 从输入中提取关键信息
+    
+    格式固定的模式由 LocalPatternExtractor 在本地提取，只有本地无法识别的语义字段
+    （服务名、组件名等）才调用 LLM。
+    """
     
     def __init__(self, llm):
         self.llm = llm
+        self.local_extractor = LocalPatternExtractor()
     
     def extract_patterns(self, input_text: str, classification_result: ClassificationResult) -> Dict[str, Any]:
         """提取输入文本中的关键模式"""
         logger.info("执行模式提取...")
+        start_time = time.perf_counter()
+        status = "local"
         
         try:
-            # 创建模式提取agent
-            extractor_agent = ClassificationAgents.pattern_extraction_agent(self.llm)
-            
             # 根据分类结果确定提取目标
             target_patterns = self._determine_target_patterns(classification_result.input_type)
             
-            # 创建模式提取任务
-            extraction_task = TaskRegistry.create_task(
-                'pattern_extraction',
-                agent=extractor_agent,
-                input_text=input_text,
-                target_patterns=target_patterns
-            )
+            # 本地提取格式固定的模式
+            patterns = self.local_extractor.extract(input_text, target_patterns)
             
-            # 执行提取
-            crew = Crew(
-                agents=[extractor_agent],
-                tasks=[extraction_task],
-                process=Process.sequential,
-                verbose=False
-            )
+            # 本地未找到的语义字段交给 LLM
+            missing_patterns = [
+                pattern for pattern in target_patterns
+                if pattern not in LocalPatternExtractor.DETERMINISTIC_PATTERNS and pattern not in patterns
+            ]
+            if not missing_patterns:
+                logger.info(f"本地模式提取完成: {list(patterns)}，无需调用 LLM")
+                return patterns
             
-            result = crew.kickoff()
-            
-            # 解析提取结果
-            return self._parse_extraction_result(result.raw)
+            status = "success"
+            logger.info(f"本地模式提取完成: {list(patterns)}，调用 LLM 提取: {missing_patterns}")
+            llm_patterns = self._extract_with_llm(input_text, missing_patterns)
+            for pattern in missing_patterns:
+                if llm_patterns.get(pattern):
+                    patterns[pattern] = llm_patterns[pattern]
+            return patterns
             
         except Exception as e:
             logger.warning(f"模式提取失败: {e}")
+            status = "error"
+            return {}
+        finally:
+            PATTERN_EXTRACTION_DURATION.observe(time.perf_counter() - start_time, status=status)
+    
+    def _extract_with_llm(self, input_text: str, target_patterns: List[str]) -> Dict[str, Any]:
+        """使用 LLM 提取语义字段"""
+        try:
+            # 从 agent 池租借模式提取agent
+            llm = llm_registry.get_for_task('pattern_extraction', fallback=self.llm)
+            with agent_pool.lease('pattern_extractor', llm) as extractor_agent:
+                # 创建模式提取任务
+                extraction_task = TaskRegistry.create_task(
+                    'pattern_extraction',
+                    agent=extractor_agent,
+                    input_text=input_text,
+                    target_patterns=target_patterns
+                )
+                
+                # 执行提取
+                crew = Crew(
+                    agents=[extractor_agent],
+                    tasks=[extraction_task],
+                    process=Process.sequential,
+                    verbose=False
+                )
+                
+                result = crew.kickoff()
+            
+            # 解析提取结果，模式位于 extracted_patterns 字段中
+            parsed = self._parse_extraction_result(result.raw, result.pydantic)
+            return parsed.get('extracted_patterns', parsed) if isinstance(parsed, dict) else {}
+            
+        except Exception as e:
+            logger.warning(f"LLM 模式提取失败: {e}")
             return {}
     
     def _determine_target_patterns(self, input_type: InputType) -> List[str]:
@@ -361,16 +476,11 @@ class PatternExtractor:
         else:
             return base_patterns
     
-    def _parse_extraction_result(self, extraction_output: str) -> Dict[str, Any]:
-        """解析模式提取结果"""
-        try:
-            if '{' in extraction_output and '}' in extraction_output:
-                start_idx = extraction_output.find('{')
-                end_idx = extraction_output.rfind('}') + 1
-                json_str = extraction_output[start_idx:end_idx]
-                
-                return json.loads(json_str)
-        except Exception as e:
-            logger.warning(f"提取结果解析失败: {e}")
-        
-        return {} 
\ No newline at end of file
+    def _parse_extraction_result(self, extraction_output: str,
+                                 structured: Optional[BaseModel] = None) -> Dict[str, Any]:
+        """解析模式提取结果，structured 为结构化输出得到的模型实例"""
+        parsed = parse_json_output(
+            extraction_output, 'pattern_extraction',
+            TaskRegistry.get_output_model('pattern_extraction'), structured
+        )
+        return parsed or {} 
\ No newline at end of file
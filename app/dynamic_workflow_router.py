@@ -1,62 +1,66 @@
+import os
 import logging
 import asyncio
+import threading
+import time
 from typing import Dict, Any, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-from crewai import Agent, Task, Crew, Process
+from crewai import Crew, CrewOutput, Process
+from pydantic import BaseModel
 
 from .flow_state import DiagnosisState, InputType, AnalysisResult
-from .agents import AlertAgents, JiraAgents, LogAgents, SynthesisAgents
-from .tasks import TaskRegistry, WorkflowTemplates, TaskDependencyManager, ParallelTaskCoordinator
+from .agent_pool import agent_pool, agent_key_for_task
+from .llms import llm_registry
+from .workflow_planner import WorkflowPlanner
+from .tasks import TaskRegistry, TaskCreationError, WorkflowTemplates, TaskDependencyManager, ParallelTaskCoordinator
+from .metrics import TASK_DURATION, TASKS_SHED
+from .llm_cache import track_cache_usage
+from .output_parsing import parse_json_output
+from .tasks.prompt_budget import track_prompt_cuts
 
 logger = logging.getLogger(__name__)
 
+# 单个 Flow 内同时执行的任务数上限
+MAX_PARALLEL_TASKS = int(os.getenv("MAX_PARALLEL_TASKS", "3"))
+# 综合分析模式：full 为五步串行综合分析，fast 为单次快速综合分析（fast_synthesis）
+SYNTHESIS_MODE = os.getenv("SYNTHESIS_MODE", "full").lower()
+# 多个 Jira 工单时，单个 Flow 内同时分析的工单数上限和分析的工单总数上限
+JIRA_FAN_OUT_CONCURRENCY = int(os.getenv("JIRA_FAN_OUT_CONCURRENCY", "3"))
+JIRA_FAN_OUT_MAX_ISSUES = int(os.getenv("JIRA_FAN_OUT_MAX_ISSUES", "10"))
+
+# 按工单执行的 Jira 任务，多个工单时并发执行并合并为一个结果
+JIRA_PER_ISSUE_TASKS = {
+    'jira_basic_info',
+    'jira_categorization',
+    'jira_components_analysis',
+    'jira_context_enrichment'
+}
+
 class DynamicWorkflowRouter:
     """动态工作流路由器 - 根据输入类型选择和执行最优的处理流程"""
     
-    def __init__(self, llm, max_parallel_tasks: int = 3):
+    def __init__(self, llm, max_parallel_tasks: int = MAX_PARALLEL_TASKS, synthesis_mode: str = SYNTHESIS_MODE):
+        # 任务按模型分级选择 LLM，所属分级未注册时使用 llm
         self.llm = llm
         self.max_parallel_tasks = max_parallel_tasks
+        self.synthesis_mode = synthesis_mode
+        # 同一 Flow 内所有 Jira 任务共享的工单并发上限
+        self._jira_slots = threading.BoundedSemaphore(JIRA_FAN_OUT_CONCURRENCY)
         self.task_registry = TaskRegistry
         self.workflow_templates = WorkflowTemplates
         self.dependency_manager = TaskDependencyManager
+        self.coordinator = ParallelTaskCoordinator
+        self.planner = WorkflowPlanner()
         
-        # 初始化agent池
-        self._init_agent_pool()
-        
-    def _init_agent_pool(self):
-        """初始化专门化的agent池"""
-        self.agents = {
-            # 告警分析agents
-            'alert_triage': AlertAgents.alert_triage_agent(self.llm),
-            'alert_component': AlertAgents.alert_component_identifier_agent(self.llm),
-            'alert_log_strategy': AlertAgents.alert_log_search_strategist_agent(self.llm),
-            'alert_log_executor': AlertAgents.alert_log_searcher_agent(self.llm),
-            'alert_business_impact': AlertAgents.alert_business_impact_assessor_agent(self.llm),
-            
-            # Jira分析agents
-            'jira_fetcher': JiraAgents.jira_fetcher_agent(self.llm),
-            'jira_categorizer': JiraAgents.jira_categorizer_agent(self.llm),
-            'jira_tech_analyzer': JiraAgents.jira_technical_analyzer_agent(self.llm),
-            'jira_context_enricher': JiraAgents.jira_context_enricher_agent(self.llm),
-            
-            # 日志分析agents
-            'log_executor': LogAgents.log_search_executor_agent(self.llm),
-            'log_pattern': LogAgents.log_pattern_analyzer_agent(self.llm),
-            'log_anomaly': LogAgents.log_anomaly_detector_agent(self.llm),
-            'log_correlation': LogAgents.log_correlation_analyst_agent(self.llm),
-            
-            # 综合分析agents
-            'timeline_reconstructor': SynthesisAgents.timeline_reconstructor_agent(self.llm),
-            'root_cause_generator': SynthesisAgents.root_cause_hypothesis_generator_agent(self.llm),
-            'hypothesis_validator': SynthesisAgents.hypothesis_validator_agent(self.llm),
-            'solution_architect': SynthesisAgents.solution_architect_agent(self.llm),
-            'report_generator': SynthesisAgents.report_generator_agent(self.llm),
-            'qa_specialist': SynthesisAgents.quality_assurance_agent(self.llm)
-        }
+    def route_and_execute(self, state: DiagnosisState,
+                          cancel_event: Optional[threading.Event] = None,
+                          speculative_tasks: Optional[Dict[str, Future]] = None) -> DiagnosisState:
+        """根据分类结果路由到相应的工作流并执行，cancel_event 被设置后不再调度新的任务
         
-    def route_and_execute(self, state: DiagnosisState) -> DiagnosisState:
-        """根据分类结果路由到相应的工作流并执行"""
+        speculative_tasks 为分类期间已提前启动的任务，调度时直接等待其结果而不重复执行。
+        """
         if not state.classification:
             logger.error("状态中没有分类结果，无法路由")
             return state
@@ -66,29 +70,23 @@ class DynamicWorkflowRouter:
         
         try:
             # 根据输入类型获取工作流模板
-            workflow_tasks = self.workflow_templates.get_workflow_for_input_type(input_type.value)
+            workflow_tasks = self.workflow_templates.get_workflow_for_input_type(
+                input_type.value, synthesis_mode=self.synthesis_mode
+            )
+            state.metadata["synthesis_mode"] = self.synthesis_mode
             
-            # 计算任务执行顺序
-            execution_levels = self.dependency_manager.get_task_execution_order(workflow_tasks)
+            # 规划：移除输入缺失的任务
+            planned_tasks, pruned_tasks = self.planner.plan(workflow_tasks, state)
+            state.metadata["pruned_tasks"] = pruned_tasks
             
-            logger.info(f"工作流包含 {len(workflow_tasks)} 个任务，分 {len(execution_levels)} 个执行层级")
+            # 计算工作流内部的任务依赖
+            dependencies = self.dependency_manager.get_task_dependencies(planned_tasks)
             
-            # 逐层执行任务
-            for level_index, tasks_in_level in enumerate(execution_levels):
-                logger.info(f"执行第 {level_index + 1} 层任务: {tasks_in_level}")
-                
-                if len(tasks_in_level) == 1:
-                    # 单个任务，直接执行
-                    task_type = tasks_in_level[0]
-                    result = self._execute_single_task(task_type, state)
-                    if result:
-                        state.add_analysis_result(task_type, result)
-                else:
-                    # 多个任务，并行执行
-                    parallel_results = self._execute_parallel_tasks(tasks_in_level, state)
-                    for task_type, result in parallel_results.items():
-                        if result:
-                            state.add_analysis_result(task_type, result)
+            logger.info(f"工作流包含 {len(planned_tasks)} 个任务（规划移除 {len(pruned_tasks)} 个），"
+                        f"最多同时执行 {self.max_parallel_tasks} 个")
+            
+            # 按依赖关系调度执行
+            self._execute_dag(planned_tasks, dependencies, state, cancel_event, speculative_tasks)
             
             logger.info(f"工作流执行完成，共完成 {len(state.completed_tasks)} 个任务")
             return state
@@ -97,125 +95,418 @@ class DynamicWorkflowRouter:
             logger.error(f"工作流执行失败: {e}", exc_info=True)
             return state
     
-    def _execute_single_task(self, task_type: str, state: DiagnosisState) -> Optional[AnalysisResult]:
-        """执行单个任务"""
-        logger.info(f"执行单个任务: {task_type}")
+    def _execute_single_task(self, task_type: str, state: DiagnosisState,
+                             cancel_event: Optional[threading.Event] = None) -> Optional[AnalysisResult]:
+        """执行单个任务，多个 Jira 工单时按工单并发执行 Jira 任务"""
+        if task_type in JIRA_PER_ISSUE_TASKS and len(state.jira_issues) > 1:
+            return self._execute_jira_fan_out(task_type, state, cancel_event)
+        return self._execute_task(task_type, state, cancel_event=cancel_event)
+    
+    def _execute_jira_fan_out(self, task_type: str, state: DiagnosisState,
+                              cancel_event: Optional[threading.Event] = None) -> AnalysisResult:
+        """对每个 Jira 工单并发执行任务，合并为 {"issues": {工单: 结果}, "failed_issues": {工单: 错误}}"""
+        issue_keys = list(dict.fromkeys(state.jira_issues))
+        if len(issue_keys) > JIRA_FAN_OUT_MAX_ISSUES:
+            logger.warning(f"Jira 工单数 {len(issue_keys)} 超过上限 {JIRA_FAN_OUT_MAX_ISSUES}，"
+                           f"忽略: {issue_keys[JIRA_FAN_OUT_MAX_ISSUES:]}")
+            issue_keys = issue_keys[:JIRA_FAN_OUT_MAX_ISSUES]
+        
+        # 后续 Jira 任务只分析基础信息获取成功的工单
+        basic_info = state.get_analysis_result('jira_basic_info')
+        if task_type != 'jira_basic_info' and basic_info and basic_info.success \
+                and "failed_issues" in basic_info.result_data:
+            issue_keys = [key for key in issue_keys if key in basic_info.result_data["issues"]]
+        
+        logger.info(f"任务 {task_type} 并发分析 {len(issue_keys)} 个 Jira 工单: {issue_keys}")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=min(JIRA_FAN_OUT_CONCURRENCY, len(issue_keys)),
+                                thread_name_prefix="heimdallr-jira") as executor:
+            futures = {
+                issue_key: executor.submit(self._execute_issue_task, task_type, state, issue_key, cancel_event)
+                for issue_key in issue_keys
+            }
+            results = {issue_key: future.result() for issue_key, future in futures.items()}
+        
+        issues = {key: result.result_data for key, result in results.items() if result and result.success}
+        failed_issues = {
+            key: (result.error_message if result else "未执行")
+            for key, result in results.items() if not (result and result.success)
+        }
+        return AnalysisResult(
+            task_type=task_type,
+            result_data={"issues": issues, "failed_issues": failed_issues},
+            execution_time=time.time() - start_time,
+            success=bool(issues),
+            error_message="; ".join(f"{key}: {error}" for key, error in failed_issues.items()) if not issues else None
+        )
+    
+    def _execute_issue_task(self, task_type: str, state: DiagnosisState, issue_key: str,
+                            cancel_event: Optional[threading.Event] = None) -> Optional[AnalysisResult]:
+        with self._jira_slots:
+            return self._execute_task(task_type, state, issue_key, cancel_event)
+    
+    def _execute_task(self, task_type: str, state: DiagnosisState, issue_key: Optional[str] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Optional[AnalysisResult]:
+        """执行单个任务，按任务类型的执行策略限制截止时间并在失败后退避重试
+        
+        超过截止时间的任务记录为失败结果，工作流继续调度其余任务；
+        crew.kickoff 无法被中断，超时的尝试在后台线程中自行结束后归还 agent。
+        参数准备和任务创建失败不重试，其余错误（包括 LLM 返回空响应或无效输出）按策略重试；
+        cancel_event 被设置后不再开始新的尝试，退避等待也会立即结束。
+        """
+        logger.info(f"执行单个任务: {task_type}{f' ({issue_key})' if issue_key else ''}")
+        
+        # 根据任务类型选择合适的agent
+        agent_key = agent_key_for_task(task_type)
+        if not agent_key:
+            logger.warning(f"未找到适合任务 {task_type} 的agent")
+            return None
+        
+        cancel_event = cancel_event or threading.Event()
+        policy = self.coordinator.get_task_policy(task_type)
+        start_time = time.time()
+        deadline = start_time + policy['timeout']
+        attempt = 0
         
         try:
-            # 根据任务类型选择合适的agent
-            agent = self._select_agent_for_task(task_type)
-            if not agent:
-                logger.warning(f"未找到适合任务 {task_type} 的agent")
-                return None
-            
             # 准备任务参数
-            task_params = self._prepare_task_parameters(task_type, state)
-            
-            # 创建任务
-            task = self.task_registry.create_task(task_type, agent, **task_params)
-            
-            # 执行任务
-            crew = Crew(
-                agents=[agent],
-                tasks=[task],
-                process=Process.sequential,
-                verbose=False
-            )
-            
-            start_time = time.time()
-            result = crew.kickoff()
-            execution_time = time.time() - start_time
-            
-            # 包装结果
-            return AnalysisResult(
-                task_type=task_type,
-                result_data=self._parse_task_result(result.raw),
-                execution_time=execution_time,
-                success=True
-            )
-            
+            task_params = self._prepare_task_parameters(task_type, state, issue_key)
         except Exception as e:
-            logger.error(f"任务 {task_type} 执行失败: {e}")
-            return AnalysisResult(
-                task_type=task_type,
-                result_data={},
-                execution_time=0.0,
-                success=False,
-                error_message=str(e)
-            )
+            return self._failed_result(task_type, start_time, f"任务参数准备失败: {e}", "error")
+        
+        while True:
+            if cancel_event.is_set():
+                error_message = f"任务已取消（已尝试 {attempt} 次）"
+                status = "cancelled"
+                break
+            attempt += 1
+            try:
+                output = self._run_with_deadline(
+                    lambda: self._run_task_attempt(task_type, agent_key, task_params, state),
+                    deadline - time.time()
+                )
+                execution_time = time.time() - start_time
+                TASK_DURATION.observe(execution_time, task_type=task_type, status="success")
+                
+                # 包装结果
+                return AnalysisResult(
+                    task_type=task_type,
+                    result_data=self._parse_task_result(output.raw, task_type, output.pydantic),
+                    execution_time=execution_time,
+                    success=True
+                )
+                
+            except FutureTimeoutError:
+                error_message = f"任务超时: 超过 {policy['timeout']:g}s 截止时间（第 {attempt} 次尝试）"
+                status = "timeout"
+                break
+            except TaskCreationError as e:
+                # 任务创建错误，重试不会改变结果
+                error_message = str(e)
+                status = "error"
+                break
+            except Exception as e:
+                error_message = str(e)
+                status = "error"
+                delay = policy['retry_backoff'] * (2 ** (attempt - 1))
+                if attempt > policy['retry_count'] or time.time() + delay >= deadline:
+                    break
+                logger.warning(f"任务 {task_type} 第 {attempt} 次尝试失败，{delay:.1f}s 后重试: {e}")
+                if cancel_event.wait(delay):
+                    error_message = f"任务已取消: {e}"
+                    status = "cancelled"
+                    break
+        
+        return self._failed_result(task_type, start_time, error_message, status)
+    
+    @staticmethod
+    def _failed_result(task_type: str, start_time: float, error_message: str, status: str) -> AnalysisResult:
+        """记录任务失败并构建失败结果"""
+        execution_time = time.time() - start_time
+        logger.error(f"任务 {task_type} 执行失败: {error_message}")
+        TASK_DURATION.observe(execution_time, task_type=task_type, status=status)
+        return AnalysisResult(
+            task_type=task_type,
+            result_data={},
+            execution_time=execution_time,
+            success=False,
+            error_message=error_message
+        )
+    
+    def _run_task_attempt(self, task_type: str, agent_key: str, task_params: Dict[str, Any],
+                          state: DiagnosisState) -> CrewOutput:
+        """从 agent 池租借 agent 执行一次任务，返回 crew 输出；LLM 缓存命中统计累加到 state"""
+        llm = llm_registry.get_for_task(task_type, fallback=self.llm)
+        with agent_pool.lease(agent_key, llm) as agent, track_cache_usage() as cache_usage:
+            try:
+                with track_prompt_cuts() as prompt_cuts:
+                    task = self.task_registry.create_task(task_type, agent, **task_params)
+                state.record_prompt_cuts(task_type, prompt_cuts)
+                crew = Crew(
+                    agents=[agent],
+                    tasks=[task],
+                    process=Process.sequential,
+                    verbose=False
+                )
+                return crew.kickoff()
+            finally:
+                state.record_llm_cache_usage(cache_usage["hits"], cache_usage["misses"])
     
-    def _execute_parallel_tasks(self, task_types: List[str], state: DiagnosisState) -> Dict[str, Optional[AnalysisResult]]:
-        """并行执行多个任务"""
-        logger.info(f"并行执行任务: {task_types}")
+    @staticmethod
+    def _run_with_deadline(function, timeout: float):
+        """在守护线程中执行 function 并最多等待 timeout 秒，超时抛出 TimeoutError"""
+        if timeout <= 0:
+            raise FutureTimeoutError()
+        future: Future = Future()
         
-        results = {}
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(function())
+            except BaseException as e:
+                future.set_exception(e)
         
-        with ThreadPoolExecutor(max_workers=min(len(task_types), self.max_parallel_tasks)) as executor:
-            # 提交所有任务
-            future_to_task = {
-                executor.submit(self._execute_single_task, task_type, state): task_type
-                for task_type in task_types
-            }
-            
-            # 收集结果
-            for future in as_completed(future_to_task):
-                task_type = future_to_task[future]
-                try:
-                    result = future.result()
-                    results[task_type] = result
-                    if result and result.success:
-                        logger.info(f"并行任务 {task_type} 完成，耗时: {result.execution_time:.2f}s")
-                    else:
-                        logger.warning(f"并行任务 {task_type} 失败")
-                except Exception as e:
-                    logger.error(f"并行任务 {task_type} 异常: {e}")
-                    results[task_type] = AnalysisResult(
-                        task_type=task_type,
-                        result_data={},
-                        execution_time=0.0,
-                        success=False,
-                        error_message=str(e)
-                    )
+        threading.Thread(target=run, name="heimdallr-task-attempt", daemon=True).start()
+        return future.result(timeout=timeout)
+    
+    def first_level_tasks(self, input_type: InputType, state: DiagnosisState) -> List[str]:
+        """获取工作流中没有上游依赖、且输入已由当前状态满足的任务（可在分类完成前推测执行）"""
+        workflow_tasks = self.workflow_templates.get_workflow_for_input_type(
+            input_type.value, synthesis_mode=self.synthesis_mode
+        )
+        dependencies = self.dependency_manager.get_task_dependencies(workflow_tasks)
+        return [
+            task_type for task_type in workflow_tasks
+            if not dependencies.get(task_type)
+            and agent_key_for_task(task_type)
+            and not self.planner.missing_inputs(task_type, state, set())
+        ]
+    
+    def _execute_dag(self, task_types: List[str], dependencies: Dict[str, List[str]],
+                     state: DiagnosisState, cancel_event: Optional[threading.Event] = None,
+                     adopted_tasks: Optional[Dict[str, Future]] = None):
+        """按依赖关系调度任务：每个任务在自身依赖全部结束后立即开始，同时执行的任务数受 max_parallel_tasks 限制
+        
+        任务结果在调度线程中写入状态，保证依赖任务开始前能读取到上游结果；执行时间线和关键路径记录到 state.metadata。
+        上游任务失败导致输入缺失的任务不会执行，记录到 state.metadata["pruned_tasks"]；
+        设置了 state.latency_deadline 时按优先级跳过预计无法在截止时间内完成的任务，记录到 state.metadata["shed_tasks"]；
+        最终报告任务不会被跳过，还没有任何结果时至少保留第一个分析任务。等待执行中的任务时也按截止时间重新检查预算；
+        最终报告在单独的线程中执行，不占用 max_parallel_tasks 的名额，提前生成报告后不再等待仍在执行的任务。
+        """
+        pending = list(task_types)
+        finished: Dict[str, float] = {}
+        skipped = set()
+        timeline: Dict[str, Dict[str, float]] = {}
+        running = {}
+        workflow_start = time.time()
+        pruned_tasks = state.metadata.setdefault("pruned_tasks", {})
+        shed_tasks = state.metadata.setdefault("shed_tasks", {})
+        # 剩余预算仅够生成报告时不再等待执行中的任务
+        report_now = False
         
-        return results
+        def shed(tasks: List[str], reason: str):
+            for task_type in tasks:
+                pending.remove(task_type)
+                skipped.add(task_type)
+                shed_tasks[task_type] = reason
+                TASKS_SHED.inc(task_type=task_type)
+            if tasks:
+                logger.info(f"{reason}，跳过任务: {tasks}")
+        
+        def next_budget_check() -> Optional[float]:
+            """距离下一次需要检查时间预算还有多少秒，不需要检查时返回 None"""
+            deadline = state.latency_deadline
+            if deadline is None or report_now or not pending:
+                return None
+            critical = [task for task in pending if self.coordinator.get_task_priority(task) == 'critical']
+            reserve = self._estimate_total_duration(critical) or 0.0
+            return max(0.0, deadline - reserve - time.time())
+        
+        def apply_latency_budget():
+            nonlocal report_now
+            deadline = state.latency_deadline
+            if deadline is None or not pending:
+                return
+            now = time.time()
+            critical = [task for task in pending if self.coordinator.get_task_priority(task) == 'critical']
+            # 没有历史耗时数据的任务无法估计，只在截止时间已过时才跳过任务
+            reserve = self._estimate_total_duration(critical)
+            if deadline <= now or (reserve is not None and deadline - now <= reserve):
+                # 剩余预算只够生成报告：跳过其余任务，使用已有结果生成报告；
+                # 还没有任何结果时保留第一个没有依赖的任务，避免报告只能基于原始输入
+                keep = []
+                if not running and not state.analysis_results:
+                    keep = [task for task in pending if task not in critical and not dependencies.get(task)][:1]
+                shed([task for task in pending if task not in critical and task not in keep], "剩余时间预算仅够生成报告")
+                report_now = not keep
+                return
+            for priority in ('low', 'medium'):
+                remaining = self._estimate_remaining_time(pending, dependencies)
+                if remaining is None or now + remaining <= deadline:
+                    break
+                shed([task for task in pending if self.coordinator.get_task_priority(task) == priority],
+                     f"预计无法在时间预算内完成，跳过 {priority} 优先级任务")
+        
+        # 从检查点恢复时，已完成的任务视为已结束
+        for task_type in list(pending):
+            if task_type in state.completed_tasks:
+                pending.remove(task_type)
+                finished[task_type] = 0.0
+        if finished:
+            logger.info(f"跳过检查点中已完成的任务: {list(finished)}")
+        
+        # 接管已在执行中的推测任务
+        for task_type, future in (adopted_tasks or {}).items():
+            if task_type in pending:
+                pending.remove(task_type)
+                timeline[task_type] = {"start": 0.0}
+                running[future] = task_type
+        
+        def submit_ready(executor):
+            apply_latency_budget()
+            progressed = True
+            while progressed:
+                progressed = False
+                for task_type in list(pending):
+                    # 提前生成报告时不再等待报告依赖的执行中任务
+                    if not (report_now and self._is_critical(task_type)) and not all(
+                            dep in finished or dep in skipped for dep in dependencies.get(task_type, [])):
+                        continue
+                    if self.coordinator.get_task_priority(task_type) == 'critical' and not report_now and (
+                            running or any(self.coordinator.get_task_priority(task) != 'critical' for task in pending)):
+                        # 最终报告汇总所有结果，依赖被跳过时也要等其他任务结束
+                        continue
+                    pending.remove(task_type)
+                    progressed = True
+                    missing = self.planner.missing_inputs(task_type, state, set(state.completed_tasks))
+                    if missing:
+                        # 跳过的任务视为已结束，其下游任务随后同样检查输入
+                        skipped.add(task_type)
+                        pruned_tasks[task_type] = f"上游任务未成功，缺少输入: {', '.join(missing)}"
+                        logger.info(f"跳过任务 {task_type}: {pruned_tasks[task_type]}")
+                        continue
+                    timeline[task_type] = {"start": round(time.time() - workflow_start, 3)}
+                    task_executor = report_executor if self._is_critical(task_type) else executor
+                    running[task_executor.submit(self._execute_single_task, task_type, state, cancel_event)] = task_type
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_parallel_tasks, thread_name_prefix="heimdallr-task")
+        report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heimdallr-report")
+        abandoned = False
+        try:
+            while pending or running:
+                if cancel_event and cancel_event.is_set():
+                    if pending:
+                        logger.info(f"工作流已取消，跳过剩余 {len(pending)} 个任务: {pending}")
+                        pending.clear()
+                    if not running:
+                        break
+                else:
+                    submit_ready(executor)
+                    if not running and pending:
+                        # 依赖无法满足（例如存在环），直接执行剩余任务，避免死锁
+                        logger.warning(f"任务依赖无法满足，直接执行剩余任务: {pending}")
+                        dependencies = {}
+                        continue
+                
+                done, _ = wait(list(running), timeout=next_budget_check(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_type = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"任务 {task_type} 异常: {e}")
+                        result = AnalysisResult(
+                            task_type=task_type,
+                            result_data={},
+                            execution_time=0.0,
+                            success=False,
+                            error_message=str(e)
+                        )
+                    finished[task_type] = time.time() - workflow_start
+                    timeline[task_type]["end"] = round(finished[task_type], 3)
+                    if result:
+                        state.add_analysis_result(task_type, result)
+                
+                if report_now and not pending and running and all(
+                        not self._is_critical(task) for task in running.values()):
+                    # 报告已生成：不再等待仍在执行的任务，其结果不会被采用
+                    abandoned_tasks = list(running.values())
+                    for task_type in abandoned_tasks:
+                        shed_tasks[task_type] = "最终报告已提前生成，未等待任务完成"
+                        TASKS_SHED.inc(task_type=task_type)
+                        del timeline[task_type]
+                    logger.info(f"最终报告已提前生成，不再等待执行中的任务: {abandoned_tasks}")
+                    running.clear()
+                    abandoned = True
+        finally:
+            executor.shutdown(wait=not abandoned, cancel_futures=abandoned)
+            report_executor.shutdown(wait=not abandoned)
+        
+        critical_path = self._critical_path(finished, dependencies)
+        state.metadata["task_timeline"] = timeline
+        state.metadata["critical_path"] = critical_path
+        state.metadata["critical_path_time"] = round(finished[critical_path[-1]], 3) if critical_path else 0.0
+        logger.info(f"关键路径: {' -> '.join(critical_path)}，"
+                    f"耗时: {state.metadata['critical_path_time']:.2f}s")
     
-    def _select_agent_for_task(self, task_type: str) -> Optional[Agent]:
-        """为任务选择合适的agent"""
-        agent_mapping = {
-            # 分类任务使用通用的智能agent（在分类阶段已处理）
-            'input_classification': None,  # 已在分类阶段处理
-            'pattern_extraction': None,    # 已在分类阶段处理
-            
-            # 告警分析任务
-            'alert_triage': self.agents['alert_triage'],
-            'alert_component_identification': self.agents['alert_component'],
-            'alert_log_search_params': self.agents['alert_log_strategy'],
-            'alert_business_impact': self.agents['alert_business_impact'],
-            
-            # Jira分析任务
-            'jira_basic_info': self.agents['jira_fetcher'],
-            'jira_categorization': self.agents['jira_categorizer'],
-            'jira_components_analysis': self.agents['jira_tech_analyzer'],
-            'jira_context_enrichment': self.agents['jira_context_enricher'],
-            
-            # 日志分析任务
-            'log_search_execution': self.agents['log_executor'],
-            'log_pattern_analysis': self.agents['log_pattern'],
-            'log_anomaly_detection': self.agents['log_anomaly'],
-            'log_correlation_analysis': self.agents['log_correlation'],
-            
-            # 综合分析任务
-            'timeline_reconstruction': self.agents['timeline_reconstructor'],
-            'root_cause_hypothesis': self.agents['root_cause_generator'],
-            'hypothesis_validation': self.agents['hypothesis_validator'],
-            'solution_architecture': self.agents['solution_architect'],
-            'comprehensive_report': self.agents['report_generator']
-        }
+    def _is_critical(self, task_type: str) -> bool:
+        return self.coordinator.get_task_priority(task_type) == 'critical'
+    
+    @staticmethod
+    def _estimate_task_duration(task_type: str) -> Optional[float]:
+        """按历史成功执行的平均耗时估计任务耗时，没有历史数据时返回 None"""
+        return TASK_DURATION.mean(task_type=task_type, status="success")
+    
+    def _estimate_total_duration(self, task_types: List[str]) -> Optional[float]:
+        """估计多个任务依次执行的总耗时，任一任务没有历史数据时返回 None"""
+        estimates = [self._estimate_task_duration(task_type) for task_type in task_types]
+        return None if None in estimates else sum(estimates)
+    
+    def _estimate_remaining_time(self, pending: List[str], dependencies: Dict[str, List[str]]) -> Optional[float]:
+        """估计尚未开始的任务沿最长依赖链执行完还需要的时间（不计入执行中任务的剩余时间），
+        任一任务没有历史数据时返回 None"""
+        if self._estimate_total_duration(pending) is None:
+            return None
+        pending_set = set(pending)
+        finish_times: Dict[str, float] = {}
+        
+        def finish_time(task_type: str) -> float:
+            if task_type not in finish_times:
+                finish_times[task_type] = 0.0  # 防止依赖环导致无限递归
+                upstream = [finish_time(dep) for dep in dependencies.get(task_type, []) if dep in pending_set]
+                finish_times[task_type] = max(upstream, default=0.0) + self._estimate_task_duration(task_type)
+            return finish_times[task_type]
         
-        return agent_mapping.get(task_type)
+        return max((finish_time(task_type) for task_type in pending), default=0.0)
+    
+    @staticmethod
+    def _critical_path(finished: Dict[str, float], dependencies: Dict[str, List[str]]) -> List[str]:
+        """从最后结束的任务开始，沿最晚结束的依赖回溯得到关键路径"""
+        if not finished:
+            return []
+        path = [max(finished, key=finished.get)]
+        while True:
+            upstream = [dep for dep in dependencies.get(path[-1], []) if dep in finished]
+            if not upstream:
+                break
+            path.append(max(upstream, key=finished.get))
+        return list(reversed(path))
+    
+    @staticmethod
+    def _jira_issue_result(state: DiagnosisState, task_type: str, issue_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """获取 Jira 任务针对指定工单的结果数据，多工单合并结果中取对应工单的条目"""
+        result = state.get_analysis_result(task_type)
+        if not result or not result.success:
+            return None
+        issues = result.result_data.get("issues")
+        if issue_key and isinstance(issues, dict) and "failed_issues" in result.result_data:
+            return issues.get(issue_key)
+        return result.result_data
     
-    def _prepare_task_parameters(self, task_type: str, state: DiagnosisState) -> Dict[str, Any]:
-        """为任务准备参数"""
+    def _prepare_task_parameters(self, task_type: str, state: DiagnosisState,
+                                 issue_key: Optional[str] = None) -> Dict[str, Any]:
+        """为任务准备参数，issue_key 为多工单并发执行时当前处理的 Jira 工单"""
         base_params = {}
         
         # 根据任务类型准备特定参数
@@ -225,6 +516,7 @@ class DynamicWorkflowRouter:
                 # 可以使用之前的分析结果
                 pass
             elif task_type == 'alert_log_search_params':
+                base_params['alert_info'] = state.input_text
                 component_result = state.get_analysis_result('alert_component_identification')
                 if component_result:
                     base_params['components'] = component_result.result_data
@@ -238,46 +530,47 @@ class DynamicWorkflowRouter:
                     base_params['components'] = {}
                     
         elif task_type.startswith('jira_'):
-            if state.jira_issues:
-                base_params['issue_key'] = state.jira_issues[0]  # 使用第一个Issue Key
+            if issue_key or state.jira_issues:
+                base_params['issue_key'] = issue_key or state.jira_issues[0]
             if task_type == 'jira_categorization':
-                info_result = state.get_analysis_result('jira_basic_info')
-                if info_result:
-                    base_params['issue_content'] = str(info_result.result_data)
+                info_data = self._jira_issue_result(state, 'jira_basic_info', issue_key)
+                if info_data:
+                    base_params['issue_content'] = str(info_data)
                 else:
                     base_params['issue_content'] = state.input_text
             elif task_type == 'jira_components_analysis':
-                info_result = state.get_analysis_result('jira_basic_info')
-                if info_result:
-                    base_params['issue_content'] = str(info_result.result_data)
+                info_data = self._jira_issue_result(state, 'jira_basic_info', issue_key)
+                if info_data:
+                    base_params['issue_content'] = str(info_data)
                 else:
                     base_params['issue_content'] = state.input_text
             elif task_type == 'jira_context_enrichment':
-                info_result = state.get_analysis_result('jira_basic_info')
-                components_result = state.get_analysis_result('jira_components_analysis')
-                base_params['issue_info'] = info_result.result_data if info_result else {}
-                base_params['components'] = components_result.result_data if components_result else {}
+                info_data = self._jira_issue_result(state, 'jira_basic_info', issue_key)
+                components_data = self._jira_issue_result(state, 'jira_components_analysis', issue_key)
+                base_params['issue_info'] = info_data or {}
+                base_params['components'] = components_data or {}
                 
         elif task_type.startswith('log_'):
             if task_type == 'log_search_execution':
-                # 从告警分析结果或默认参数获取搜索参数
+                # 优先使用告警分析生成的搜索参数，其次使用分类阶段提取的应用和关键词
                 search_params_result = state.get_analysis_result('alert_log_search_params')
-                if search_params_result and search_params_result.result_data:
-                    params_data = search_params_result.result_data
-                    base_params['applications'] = params_data.get('applications', ['default-app'])
-                    base_params['query'] = params_data.get('search_queries', [{'query': 'ERROR'}])[0]['query']
+                params_data = search_params_result.result_data if search_params_result and search_params_result.success else {}
+                applications = params_data.get('applications') or state.log_search_params.get('target_applications') or []
+                search_queries = params_data.get('search_queries') or []
+                suggested_queries = state.log_search_params.get('suggested_queries') or []
+                base_params['applications'] = applications
+                if search_queries and isinstance(search_queries[0], dict) and search_queries[0].get('query'):
+                    base_params['query'] = search_queries[0]['query']
+                elif suggested_queries:
+                    base_params['query'] = suggested_queries[0]
                 else:
-                    base_params['applications'] = ['default-app']
                     base_params['query'] = 'ERROR'
             else:
-                # 其他日志分析任务需要日志条目
+                # 其他日志分析任务需要日志条目（规划阶段已保证日志搜索结果可用）
                 log_result = state.get_analysis_result('log_search_execution')
-                if log_result:
-                    base_params['log_entries'] = str(log_result.result_data)
-                else:
-                    base_params['log_entries'] = 'No log data available'
+                base_params['log_entries'] = str(log_result.result_data) if log_result else ''
                     
-        elif task_type.startswith('timeline_') or task_type.startswith('root_cause_') or task_type.startswith('hypothesis_') or task_type.startswith('solution_') or task_type.startswith('comprehensive_'):
+        elif task_type.startswith('timeline_') or task_type.startswith('root_cause_') or task_type.startswith('hypothesis_') or task_type.startswith('solution_') or task_type.startswith('comprehensive_') or task_type == 'fast_synthesis':
             # 综合分析任务需要之前的所有结果
             if task_type == 'timeline_reconstruction':
                 all_results = {}
@@ -300,26 +593,24 @@ class DynamicWorkflowRouter:
                 all_data = {task: result.result_data for task, result in state.analysis_results.items() if result.success}
                 base_params['validated_root_cause'] = validated_result.result_data if validated_result else {}
                 base_params['context'] = all_data
-            elif task_type == 'comprehensive_report':
+            elif task_type in ('comprehensive_report', 'fast_synthesis'):
                 all_results = {task: result.result_data for task, result in state.analysis_results.items() if result.success}
                 base_params['all_analysis_results'] = all_results
+                base_params['skipped_analyses'] = dict(state.metadata.get("shed_tasks", {}))
+                base_params['input_text'] = state.input_text
         
         return base_params
     
-    def _parse_task_result(self, raw_result: str) -> Dict[str, Any]:
-        """解析任务结果"""
-        try:
-            # 尝试解析JSON结果
-            import json
-            if '{' in raw_result and '}' in raw_result:
-                start_idx = raw_result.find('{')
-                end_idx = raw_result.rfind('}') + 1
-                json_str = raw_result[start_idx:end_idx]
-                return json.loads(json_str)
-        except Exception as e:
-            logger.warning(f"结果解析失败: {e}")
-        
-        # 解析失败，返回原始文本
-        return {'raw_output': raw_result}
+    def _parse_task_result(self, raw_result: str, task_type: str = "unknown",
+                           structured: Optional[BaseModel] = None) -> Dict[str, Any]:
+        """解析任务结果：优先使用结构化输出，否则按任务的输出模型容错解析原始文本"""
+        output_model = self.task_registry.get_output_model(task_type)
+        if output_model is None and task_type in self.task_registry.get_available_task_types():
+            # 自由文本输出的任务（如 Markdown 综合报告）不做 JSON 解析，避免把报告中的示例片段当作结果
+            return {'raw_output': raw_result}
+        result_data = parse_json_output(raw_result, task_type, output_model, structured)
+        if result_data is None:
+            # 解析失败，返回原始文本
+            return {'raw_output': raw_result}
+        return result_data
 
-import time 
\ No newline at end of file
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .flow_state import DiagnosisState
+
+logger = logging.getLogger(__name__)
+
+
+class FlowCheckpoint:
+    """一个未完成 Flow 的检查点：最近一次保存的状态和订阅该 Flow 的请求"""
+
+    def __init__(self, flow_id: str, state: DiagnosisState, requests: Dict[str, Optional[Dict[str, Any]]],
+                 updated_at: float):
+        self.flow_id = flow_id
+        self.state = state
+        # request_id -> 请求来源（如 SeaTalk 回复目标），恢复时用于重建请求记录
+        self.requests = requests
+        self.updated_at = updated_at
+
+
+class FlowCheckpointStore:
+    """Flow 检查点存储 - 基于 SQLite，每个任务结果写入状态后保存 DiagnosisState
+
+    Flow 正常结束（包括失败和取消）时删除检查点；进程在 Flow 执行中被终止时检查点保留，
+    服务重启后据此恢复执行，已完成的任务不再重复调用 LLM。默认关闭，通过 FLOW_CHECKPOINT_ENABLED 开启。
+    """
+
+    def __init__(self, db_path: str, enabled: bool = False, max_age_seconds: float = 3600):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if not enabled:
+            return
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS flow_checkpoints (
+                    flow_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    requests TEXT NOT NULL DEFAULT '{}',
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def save(self, state: DiagnosisState):
+        """保存 Flow 的最新状态"""
+        if not self.enabled or not state.flow_id:
+            return
+        payload = state.snapshot_json()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO flow_checkpoints (flow_id, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(flow_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (state.flow_id, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def attach_request(self, state: DiagnosisState, request_id: str, source: Optional[Dict[str, Any]] = None):
+        """记录订阅 Flow 的请求，恢复后继续更新这些请求的结果"""
+        if not self.enabled or not state.flow_id:
+            return
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT requests FROM flow_checkpoints WHERE flow_id = ?", (state.flow_id,)
+            ).fetchone()
+            requests = json.loads(row[0]) if row else {}
+            requests[request_id] = source
+            if row:
+                self._conn.execute(
+                    "UPDATE flow_checkpoints SET requests = ? WHERE flow_id = ?",
+                    (json.dumps(requests, ensure_ascii=False), state.flow_id),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO flow_checkpoints (flow_id, state, requests, updated_at) VALUES (?, ?, ?, ?)",
+                    (state.flow_id, state.snapshot_json(), json.dumps(requests, ensure_ascii=False), time.time()),
+                )
+            self._conn.commit()
+
+    def delete(self, flow_id: str):
+        """Flow 结束后删除检查点"""
+        if not self.enabled or not flow_id:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM flow_checkpoints WHERE flow_id = ?", (flow_id,))
+            self._conn.commit()
+
+    def load_unfinished(self) -> List[FlowCheckpoint]:
+        """取出所有可恢复的检查点，超过 max_age_seconds 或没有订阅请求的检查点直接删除"""
+        if not self.enabled:
+            return []
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM flow_checkpoints WHERE updated_at < ? OR requests = '{}'",
+                (time.time() - self.max_age_seconds,),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT flow_id, state, requests, updated_at FROM flow_checkpoints ORDER BY updated_at"
+            ).fetchall()
+
+        checkpoints = []
+        for flow_id, payload, requests, updated_at in rows:
+            try:
+                state = DiagnosisState.model_validate_json(payload)
+            except Exception as e:
+                logger.warning(f"Flow {flow_id} 的检查点无法解析，已丢弃: {e}")
+                self.delete(flow_id)
+                continue
+            checkpoints.append(FlowCheckpoint(flow_id, state, json.loads(requests), updated_at))
+        return checkpoints
+
+
+# 创建一个全局实例
+flow_checkpoints = FlowCheckpointStore(
+    db_path=os.getenv("FLOW_CHECKPOINT_PATH", "data/checkpoints.db"),
+    enabled=os.getenv("FLOW_CHECKPOINT_ENABLED", "false").lower() == "true",
+    max_age_seconds=float(os.getenv("FLOW_CHECKPOINT_MAX_AGE_SECONDS", "3600"))
+)
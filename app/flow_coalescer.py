@@ -0,0 +1,191 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .flow_executor import FlowExecutor, flow_executor
+from .metrics import FLOWS_COALESCED
+
+logger = logging.getLogger(__name__)
+
+# 指纹归一化规则：把每次告警都会变化的部分替换为占位符
+_NORMALIZATION_PATTERNS = [
+    # ISO 8601 / 常见日期时间，如 2024-01-15T14:30:00.123Z、2024/01/15 14:30:00
+    (re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}(?:[T\s]\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?', re.IGNORECASE), '<time>'),
+    # 单独的时间，如 14:30:00
+    (re.compile(r'\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b'), '<time>'),
+    # UUID
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b'), '<id>'),
+    # 较长的十六进制 ID，如 trace id、commit hash
+    (re.compile(r'\b(?=[0-9a-f]*\d)[0-9a-f]{12,}\b'), '<id>'),
+    # 较长的纯数字，如时间戳、请求号
+    (re.compile(r'\b\d{5,}\b'), '<num>'),
+]
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def fingerprint_text(text: str) -> str:
+    """计算输入文本的归一化指纹，仅时间戳和 ID 不同的文本得到相同的指纹"""
+    normalized = text.strip().lower()
+    for pattern, placeholder in _NORMALIZATION_PATTERNS:
+        normalized = pattern.sub(placeholder, normalized)
+    normalized = _WHITESPACE_PATTERN.sub(' ', normalized)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class _InflightFlow:
+    """执行中的 Flow 及其所有订阅者"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.future: Optional[Future] = None
+        self.flow: Any = None
+        self.cancel_event = threading.Event()
+        self.flow_callbacks: List[Callable[[Any], None]] = []
+        self.total_subscribers = 0
+        # 可取消的订阅者（同步请求）数量；只要存在不可取消的订阅者，Flow 就不会被取消
+        self.active_cancellable = 0
+        self.pinned = False
+        # 所有订阅者中最早的时间预算截止时间
+        self.latency_deadline: Optional[float] = None
+
+
+class FlowCoalescer:
+    """请求合并层 - 相同指纹的请求共享同一个执行中的 Flow
+
+    告警风暴中同一告警（或只有时间戳、ID 不同的告警）会被重复提交，合并后 N 个重复请求
+    只执行一次 Flow，每个调用方仍各自得到结果。
+    """
+
+    def __init__(self, executor: FlowExecutor, enabled: bool = True):
+        self.executor = executor
+        self.enabled = enabled
+        self._inflight: Dict[str, _InflightFlow] = {}
+        # 可重入锁：Future 已完成时 add_done_callback 会在当前线程立即回调
+        self._lock = threading.RLock()
+        self._coalesced_count = 0
+
+    def submit(self, input_text: str,
+               on_flow_created: Optional[Callable[[Any], None]] = None,
+               latency_budget: Optional[float] = None) -> Tuple[Future, bool]:
+        """提交分析请求，返回 (Future, 是否合并到已有 Flow)"""
+        entry, coalesced = self._attach(input_text, on_flow_created, cancellable=False,
+                                        latency_budget=latency_budget)
+        return entry.future, coalesced
+
+    async def run_async(self, input_text: str, timeout: Optional[float] = None,
+                        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                        latency_budget: Optional[float] = None) -> Any:
+        """异步执行（或合并到已有的）Flow，只有所有同步订阅者都放弃后才取消共享 Flow"""
+        entry, _ = self._attach(input_text, None, cancellable=True, latency_budget=latency_budget)
+        return await self.executor.wait_async(
+            entry.future,
+            lambda: self._detach(entry),
+            timeout=timeout,
+            is_disconnected=is_disconnected
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """获取合并层当前状态"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "inflight_fingerprints": len(self._inflight),
+                "coalesced_requests": self._coalesced_count
+            }
+
+    def _attach(self, input_text: str, on_flow_created: Optional[Callable[[Any], None]],
+                cancellable: bool, latency_budget: Optional[float] = None) -> Tuple[_InflightFlow, bool]:
+        fingerprint = fingerprint_text(input_text) if self.enabled else None
+        latency_deadline = time.time() + latency_budget if latency_budget else None
+
+        with self._lock:
+            entry = self._inflight.get(fingerprint) if fingerprint else None
+            coalesced = (
+                entry is not None
+                and not entry.future.done()
+                and not entry.cancel_event.is_set()
+            )
+
+            if coalesced:
+                self._coalesced_count += 1
+                FLOWS_COALESCED.inc()
+                logger.info(f"请求合并到执行中的 Flow (指纹 {fingerprint[:12]}), "
+                            f"订阅者: {entry.total_subscribers + 1}")
+            else:
+                entry = _InflightFlow(fingerprint or "")
+                entry.future = self.executor.submit(
+                    input_text,
+                    on_flow_created=lambda flow, e=entry: self._on_flow_created(e, flow),
+                    cancel_event=entry.cancel_event,
+                    latency_budget=latency_budget
+                )
+                if fingerprint:
+                    self._inflight[fingerprint] = entry
+                    entry.future.add_done_callback(lambda _, e=entry: self._remove(e))
+
+            entry.total_subscribers += 1
+            # 合并的 Flow 使用所有订阅者中最紧的时间预算；没有预算的订阅者不放宽已有预算
+            if latency_deadline is not None:
+                entry.latency_deadline = min(entry.latency_deadline or latency_deadline, latency_deadline)
+            if cancellable:
+                entry.active_cancellable += 1
+            else:
+                entry.pinned = True
+
+            flow = entry.flow
+            if flow is not None:
+                flow.state.metadata["coalesced_requests"] = entry.total_subscribers - 1
+                self._apply_latency_deadline(entry, flow)
+            elif on_flow_created:
+                entry.flow_callbacks.append(on_flow_created)
+
+        if flow is not None and on_flow_created:
+            on_flow_created(flow)
+        return entry, coalesced
+
+    def _on_flow_created(self, entry: _InflightFlow, flow: Any):
+        with self._lock:
+            entry.flow = flow
+            flow.state.metadata["coalesced_requests"] = entry.total_subscribers - 1
+            self._apply_latency_deadline(entry, flow)
+            callbacks = list(entry.flow_callbacks)
+            entry.flow_callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback(flow)
+            except Exception as e:
+                logger.warning(f"Flow 创建回调执行失败: {e}")
+
+    @staticmethod
+    def _apply_latency_deadline(entry: _InflightFlow, flow: Any):
+        """把订阅者中最紧的时间预算同步到 Flow 状态（调用方需持有锁）"""
+        if entry.latency_deadline is None:
+            return
+        current = flow.state.latency_deadline
+        if current is None or entry.latency_deadline < current:
+            flow.state.latency_deadline = entry.latency_deadline
+
+    def _detach(self, entry: _InflightFlow):
+        """同步订阅者放弃等待；没有其他订阅者时取消 Flow"""
+        with self._lock:
+            entry.active_cancellable -= 1
+            should_cancel = entry.active_cancellable <= 0 and not entry.pinned
+        if should_cancel:
+            entry.cancel_event.set()
+
+    def _remove(self, entry: _InflightFlow):
+        with self._lock:
+            if self._inflight.get(entry.fingerprint) is entry:
+                del self._inflight[entry.fingerprint]
+
+
+# 创建一个全局实例
+flow_coalescer = FlowCoalescer(
+    flow_executor,
+    enabled=os.getenv("FLOW_COALESCING_ENABLED", "true").lower() == "true"
+)
@@ -0,0 +1,219 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import FLOW_QUEUE_DEPTH, FLOWS_IN_FLIGHT, FLOWS_REJECTED
+from .flow_checkpoint import flow_checkpoints
+
+logger = logging.getLogger(__name__)
+
+
+class FlowTimeoutError(Exception):
+    """Flow 执行超过截止时间"""
+
+
+class FlowCancelledError(Exception):
+    """Flow 被调用方取消（例如客户端断开连接）"""
+
+
+class FlowQueueFullError(Exception):
+    """Flow 等待队列已满，拒绝新的请求"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"分析队列已满，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class FlowExecutor:
+    """Flow 执行器 - 在专用线程池中运行 HeimdallrFlow，避免占用 Web 服务的线程池
+
+    同时运行的 Flow 数量由 max_concurrent_flows 限制，等待执行的 Flow 数量由
+    max_queue_size 限制；队列满时 submit 抛出 FlowQueueFullError，由调用方返回 429。
+    """
+
+    def __init__(self, max_concurrent_flows: int = 4, max_queue_size: int = 32,
+                 poll_interval: float = 1.0, default_flow_duration: float = 45.0):
+        self.max_concurrent_flows = max_concurrent_flows
+        self.max_queue_size = max_queue_size
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_flows,
+            thread_name_prefix="heimdallr-flow"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        # 最近 Flow 耗时的指数移动平均，用于估算 Retry-After
+        self._avg_flow_duration = default_flow_duration
+        # Flow 相关模块（crewai 等）是否已预加载
+        self._preloaded = threading.Event()
+
+    def preload(self) -> threading.Thread:
+        """在后台线程中导入 Flow 相关模块并注册 LLM
+
+        API 进程启动时不再同步导入 crewai，服务可以立即开始接收请求；
+        预加载完成前到达的请求会在工作线程中等待导入完成。
+        """
+        def load():
+            start_time = time.time()
+            try:
+                from .heimdallr_flow import HeimdallrFlow  # noqa: F401
+                from .llms import llm_registry
+                llm_registry.ensure_registered()
+                self._preloaded.set()
+                logger.info(f"Flow 模块预加载完成，耗时: {time.time() - start_time:.2f}s")
+            except Exception as e:
+                logger.error(f"Flow 模块预加载失败: {e}", exc_info=True)
+
+        thread = threading.Thread(target=load, name="heimdallr-flow-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def submit(self, input_text: str,
+               on_flow_created: Optional[Callable[[Any], None]] = None,
+               cancel_event: Optional[threading.Event] = None,
+               latency_budget: Optional[float] = None,
+               resume_state: Optional[Any] = None) -> "Future":
+        """提交一个分析请求，返回的 Future 在 Flow 执行结束后得到 HeimdallrFlow 实例
+
+        Flow 在工作线程中创建，on_flow_created 在开始执行前调用（可用于注册进度监听）。
+        latency_budget 为调用方的时间预算（秒，从提交时开始计算，包含排队时间）；
+        resume_state 为检查点中的 DiagnosisState，Flow 从该状态继续执行。
+        """
+        with self._lock:
+            if self._queued >= self.max_queue_size:
+                retry_after = self._estimate_retry_after()
+                logger.warning(f"Flow 队列已满 (排队 {self._queued}, 执行中 {self._running})，"
+                               f"拒绝请求，建议 {retry_after}s 后重试")
+                FLOWS_REJECTED.inc()
+                raise FlowQueueFullError(retry_after)
+            self._queued += 1
+
+        enqueued_at = time.time()
+        latency_deadline = enqueued_at + latency_budget if latency_budget else None
+        return self._executor.submit(
+            self._run_flow, input_text, enqueued_at, on_flow_created, cancel_event or threading.Event(),
+            latency_deadline, resume_state
+        )
+
+    def _run_flow(self, input_text: str, enqueued_at: float,
+                  on_flow_created: Optional[Callable[[Any], None]],
+                  cancel_event: threading.Event,
+                  latency_deadline: Optional[float] = None,
+                  resume_state: Optional[Any] = None):
+        from .heimdallr_flow import HeimdallrFlow
+
+        queue_wait_time = time.time() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+        start_time = time.time()
+        flow = None
+        try:
+            if cancel_event.is_set():
+                raise FlowCancelledError("Flow 在排队期间被取消")
+
+            logger.info(f"Flow 开始执行，排队等待: {queue_wait_time:.2f}s")
+            flow = HeimdallrFlow(input_text=input_text, cancel_event=cancel_event, resume_state=resume_state)
+            flow.state.metadata["queue_wait_time"] = round(queue_wait_time, 3)
+            # 恢复的 Flow 不沿用检查点中的截止时间：原调用方的时间预算在进程重启期间已经失效
+            flow.state.latency_deadline = latency_deadline
+            # 每个任务结果写入状态后保存检查点
+            flow.state.add_result_listener(lambda state, task_type, result: flow_checkpoints.save(state))
+            if on_flow_created:
+                on_flow_created(flow)
+
+            flow.kickoff()
+            return flow
+        finally:
+            if flow is not None:
+                flow_checkpoints.delete(flow.state.flow_id)
+            duration = time.time() - start_time
+            with self._lock:
+                self._running -= 1
+                self._avg_flow_duration = 0.8 * self._avg_flow_duration + 0.2 * duration
+
+    async def run_async(self, input_text: str, timeout: Optional[float] = None,
+                        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                        latency_budget: Optional[float] = None) -> Any:
+        """异步执行 Flow，支持截止时间和断开连接取消"""
+        cancel_event = threading.Event()
+        future = self.submit(input_text, cancel_event=cancel_event, latency_budget=latency_budget)
+        return await self.wait_async(future, cancel_event.set, timeout=timeout,
+                                     is_disconnected=is_disconnected)
+
+    async def wait_async(self, future: "Future", on_cancel: Callable[[], None],
+                         timeout: Optional[float] = None,
+                         is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> Any:
+        """在事件循环中等待已提交的 Flow
+
+        事件循环只负责等待结果，排队时间计入截止时间；超时、客户端断开或协程被取消时，
+        调用 on_cancel 通知 Flow 停止调度后续任务。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        wrapped = asyncio.wrap_future(future)
+
+        try:
+            while True:
+                wait_time = self.poll_interval
+                if deadline is not None:
+                    wait_time = min(wait_time, max(0.0, deadline - loop.time()))
+
+                done, _ = await asyncio.wait({wrapped}, timeout=wait_time)
+                if wrapped in done:
+                    return wrapped.result()
+
+                if deadline is not None and loop.time() >= deadline:
+                    logger.warning(f"Flow 执行超时（{timeout}s），取消后续任务")
+                    on_cancel()
+                    raise FlowTimeoutError(f"分析超过 {timeout} 秒未完成")
+
+                if is_disconnected and await is_disconnected():
+                    logger.info("客户端已断开连接，取消 Flow 执行")
+                    on_cancel()
+                    raise FlowCancelledError("客户端已断开连接")
+
+        except asyncio.CancelledError:
+            on_cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """获取执行器当前状态"""
+        with self._lock:
+            return {
+                "max_concurrent_flows": self.max_concurrent_flows,
+                "max_queue_size": self.max_queue_size,
+                "queued_flows": self._queued,
+                "running_flows": self._running,
+                "avg_flow_duration": round(self._avg_flow_duration, 2),
+                "preloaded": self._preloaded.is_set()
+            }
+
+    def _estimate_retry_after(self) -> int:
+        """按排队数量和平均耗时估算队列空出位置的时间（调用方需持有锁）"""
+        waves = (self._queued + 1) / self.max_concurrent_flows
+        return max(1, math.ceil(waves * self._avg_flow_duration))
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._queued
+
+    def running_flows(self) -> int:
+        with self._lock:
+            return self._running
+
+
+# 创建一个全局实例
+flow_executor = FlowExecutor(
+    max_concurrent_flows=int(os.getenv("MAX_CONCURRENT_FLOWS", "4")),
+    max_queue_size=int(os.getenv("FLOW_QUEUE_MAX_SIZE", "32"))
+)
+FLOW_QUEUE_DEPTH.set_function(flow_executor.queue_depth)
+FLOWS_IN_FLIGHT.set_function(flow_executor.running_flows)
@@ -1,8 +1,16 @@
-from pydantic import BaseModel, Field
+import logging
+import threading
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# 保护任务线程并发更新 metadata（锁不能放在 state 上，state 需要可被深拷贝）
+_metadata_lock = threading.Lock()
+
+
 class InputType(Enum):
     """输入类型枚举"""
     ALERT = "alert"           # 告警信息
@@ -56,6 +64,15 @@ class DiagnosisState(BaseModel):
     # 元数据
     flow_id: str = ""
     total_execution_time: float = 0.0
+    latency_deadline: Optional[float] = None  # 调用方时间预算的截止时间（Unix 时间戳），None 表示不限制
+    metadata: Dict[str, Any] = Field(default_factory=dict)  # 执行相关的附加信息，如排队时间
+    
+    # 结果监听器（不参与序列化）
+    _result_listeners: List[Callable[["DiagnosisState", str, AnalysisResult], None]] = PrivateAttr(default_factory=list)
+    
+    def add_result_listener(self, listener: Callable[["DiagnosisState", str, AnalysisResult], None]):
+        """注册分析结果监听器，每次记录任务结果后调用"""
+        self._result_listeners.append(listener)
     
     def add_analysis_result(self, task_type: str, result: AnalysisResult):
         """添加分析结果"""
@@ -64,6 +81,34 @@ class DiagnosisState(BaseModel):
             self.completed_tasks.append(task_type)
         else:
             self.failed_tasks.append(task_type)
+        
+        for listener in self._result_listeners:
+            try:
+                listener(self, task_type, result)
+            except Exception as e:
+                # 监听器异常不能影响工作流执行
+                logger.warning(f"结果监听器执行失败: {e}")
+    
+    def record_llm_cache_usage(self, hits: int, misses: int):
+        """累加 LLM 响应缓存命中统计到 metadata["llm_cache"]（可在任务线程中调用）"""
+        if not hits and not misses:
+            return
+        with _metadata_lock:
+            usage = self.metadata.setdefault("llm_cache", {"hits": 0, "misses": 0})
+            usage["hits"] += hits
+            usage["misses"] += misses
+    
+    def record_prompt_cuts(self, task_type: str, cuts: List[Dict[str, Any]]):
+        """记录任务提示词中因超出 token 预算被压缩的段落到 metadata["prompt_cuts"]"""
+        if not cuts:
+            return
+        with _metadata_lock:
+            self.metadata.setdefault("prompt_cuts", {})[task_type] = list(cuts)
+    
+    def snapshot_json(self) -> str:
+        """序列化状态（用于检查点），与任务线程对 metadata 的更新互斥，避免序列化到一半的快照"""
+        with _metadata_lock:
+            return self.model_dump_json()
     
     def get_analysis_result(self, task_type: str) -> Optional[AnalysisResult]:
         """获取分析结果"""
@@ -81,4 +126,15 @@ class DiagnosisState(BaseModel):
             "failed_tasks": len(self.failed_tasks),
             "total_results": len(self.analysis_results),
             "classification": self.classification.dict() if self.classification else None
+        }
+    
+    def get_task_progress(self) -> Dict[str, Any]:
+        """获取每个任务的执行进度（不包含结果数据，便于轻量轮询）"""
+        return {
+            task_type: {
+                "success": result.success,
+                "execution_time": result.execution_time,
+                "error_message": result.error_message
+            }
+            for task_type, result in self.analysis_results.items()
         } 
\ No newline at end of file
@@ -2,6 +2,7 @@ import logging
 import uuid
 import time
 import re
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
@@ -10,19 +11,31 @@ from crewai import Agent, Task, Crew, Process, LLM
 
 from .flow_state import DiagnosisState, InputType, ClassificationResult, AnalysisResult
 from .llms import llm_registry
-from .classification_engine import ClassificationEngine, PatternExtractor
+from .classification_engine import ClassificationEngine, PatternExtractor, filter_jira_issue_keys
 from .dynamic_workflow_router import DynamicWorkflowRouter
+from .speculative_execution import speculative_executor
+from .metrics import FLOW_DURATION
+from .llm_cache import track_cache_usage
 
 logger = logging.getLogger(__name__)
 
 class HeimdallrFlow(Flow[DiagnosisState]):
     """Heimdallr AI诊断助手主流程"""
     
-    def __init__(self, input_text: str = ""):
+    def __init__(self, input_text: str = "", cancel_event: Optional[threading.Event] = None,
+                 resume_state: Optional[DiagnosisState] = None):
+        # 取消信号：超时或调用方断开时停止调度后续任务
+        # 需在父类初始化前设置，Flow.__init__ 会遍历属性（包括 is_cancelled）
+        self.cancel_event = cancel_event or threading.Event()
+        
         super().__init__()
         
         # 保存输入文本
         self.input_text = input_text
+        self.state.input_text = input_text
+        self.state.flow_id = str(uuid.uuid4())
+        if resume_state is not None:
+            self._restore_state(resume_state)
         
         # 初始化LLM
         self.llm = llm_registry.get("default")
@@ -34,31 +47,61 @@ class HeimdallrFlow(Flow[DiagnosisState]):
         # 初始化动态工作流路由器
         self.workflow_router = DynamicWorkflowRouter(self.llm)
         
+        # 分类期间推测执行、分类后被采用的任务
+        self.speculative_tasks = {}
+        
         logger.info(f"初始化HeimdallrFlow，输入文本长度: {len(input_text)}")
     
+    def cancel(self):
+        """请求取消 Flow，已在执行中的任务完成后不再调度新任务"""
+        if not self.cancel_event.is_set():
+            logger.info(f"Flow {self.state.flow_id or '-'} 收到取消请求")
+            self.cancel_event.set()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+    
     @start()
     def classify_input(self):
         """Step 1: 输入分类 - 分析输入内容并确定处理策略"""
+        if self.state.classification is not None:
+            # 从检查点恢复的 Flow 已完成分类
+            logger.info(f"Flow {self.state.flow_id} 从检查点恢复，跳过输入分类，"
+                        f"已完成任务: {self.state.completed_tasks}")
+            return self.state.classification.input_type.value
+        
         input_text = self.input_text
         logger.info(f"开始输入分类，输入内容: {input_text[:100]}...")
         start_time = time.time()
         
         # 初始化状态
         self.state.input_text = input_text
-        self.state.flow_id = str(uuid.uuid4())
         self.state.input_timestamp = datetime.now()
         
+        # 使用新的分类引擎进行分类，等待 AI 分类期间可推测执行规则预测的第一层任务
+        speculation = None
+        
+        def start_speculation(rule_result: ClassificationResult):
+            nonlocal speculation
+            speculation = speculative_executor.start(self.workflow_router, self.state, rule_result)
+        
         try:
-            # 使用新的分类引擎进行分类
-            classification_result = self.classification_engine.classify(input_text)
-            self.state.classification = classification_result
-            self.state.current_workflow = classification_result.input_type.value
-            
-            # 执行模式提取，丰富分类信息
-            extracted_patterns = self.pattern_extractor.extract_patterns(
-                self.state.input_text, 
-                classification_result
-            )
+            with track_cache_usage() as cache_usage:
+                classification_result = self.classification_engine.classify(
+                    input_text, on_ai_pending=start_speculation
+                )
+                self.state.classification = classification_result
+                self.state.current_workflow = classification_result.input_type.value
+                
+                # 执行模式提取，丰富分类信息
+                extracted_patterns = self.pattern_extractor.extract_patterns(
+                    self.state.input_text, 
+                    classification_result
+                )
+            self.state.record_llm_cache_usage(cache_usage["hits"], cache_usage["misses"])
+            # 分类和模式提取都成功后再采用推测任务，任一步失败都按未命中处理
+            self.speculative_tasks = speculative_executor.resolve(speculation, classification_result, self.state)
             
             # 将提取的模式信息合并到状态中
             if extracted_patterns:
@@ -82,6 +125,8 @@ class HeimdallrFlow(Flow[DiagnosisState]):
                 confidence=0.1,
                 reasoning=f"分类过程出错: {str(e)}"
             )
+            # 取消尚未开始的推测任务，并计为未命中
+            self.speculative_tasks = speculative_executor.resolve(speculation, fallback_result, self.state)
             self.state.classification = fallback_result
             self.state.current_workflow = "unknown"
             return "unknown"
@@ -99,6 +144,11 @@ class HeimdallrFlow(Flow[DiagnosisState]):
         """Step 2: 执行动态工作流 - 根据输入类型选择并执行相应的处理流程"""
         logger.info(f"开始执行动态工作流，输入类型: {input_type}")
 
+        if self.is_cancelled:
+            logger.info("Flow 已取消，跳过动态工作流执行")
+            self.state.final_report = "分析已取消"
+            return self.state.final_report
+
         try:
             if input_type == InputType.UNKNOWN.value:
                 logger.info("输入类型为未知，执行通用问答流程。")
@@ -142,19 +192,35 @@ class HeimdallrFlow(Flow[DiagnosisState]):
 
             else:
                 # 使用动态工作流路由器执行分析
-                self.workflow_router.route_and_execute(self.state)
+                self.workflow_router.route_and_execute(
+                    self.state,
+                    cancel_event=self.cancel_event,
+                    speculative_tasks=self.speculative_tasks
+                )
                 
-                # 检查是否有最终报告
+                # 检查是否有最终报告（快速综合分析模式下报告在 fast_synthesis 结果的 report 字段中）
                 final_report_result = self.state.get_analysis_result('comprehensive_report')
+                fast_synthesis_result = self.state.get_analysis_result('fast_synthesis')
                 if final_report_result and final_report_result.success:
                     self.state.final_report = final_report_result.result_data.get('raw_output', str(final_report_result.result_data))
+                elif fast_synthesis_result and fast_synthesis_result.success:
+                    result_data = fast_synthesis_result.result_data
+                    self.state.final_report = result_data.get('report') or result_data.get('raw_output', str(result_data))
+                    solutions = result_data.get('solutions')
+                    if isinstance(solutions, dict):
+                        self.state.recommendations = list(solutions.get('immediate_actions') or [])
                 else:
                     # 如果没有生成综合报告，生成基础报告
                     self.state.final_report = self._get_basic_summary()
+                
+                skipped_section = self._get_skipped_analyses_section()
+                if skipped_section:
+                    self.state.final_report = f"{self.state.final_report}\n\n{skipped_section}"
             
             # 记录总执行时间
             total_time = time.time() - self.state.input_timestamp.timestamp()
             self.state.total_execution_time = total_time
+            FLOW_DURATION.observe(total_time, workflow=self.state.current_workflow or input_type)
             
             logger.info(f"动态工作流执行完成，总耗时: {total_time:.2f}s")
             return self.state.final_report
@@ -165,13 +231,25 @@ class HeimdallrFlow(Flow[DiagnosisState]):
             self.state.final_report = error_report
             return error_report
     
+    def _restore_state(self, resume_state: DiagnosisState):
+        """从检查点恢复状态：保留成功的任务结果，失败的任务在恢复后重新执行"""
+        for field_name in DiagnosisState.model_fields:
+            setattr(self.state, field_name, getattr(resume_state, field_name))
+        self.state.analysis_results = {
+            task_type: result for task_type, result in resume_state.analysis_results.items() if result.success
+        }
+        self.state.failed_tasks = []
+        self.state.metadata["resumed_from_checkpoint"] = True
+        self.input_text = resume_state.input_text
+    
     def _update_state_from_classification(self, classification_result: ClassificationResult):
         """根据分类结果更新状态中的特定信息"""
         extracted_data = classification_result.extracted_data
         
         # 更新Jira issues信息
         if 'jira_issues' in extracted_data:
-            self.state.jira_issues = extracted_data['jira_issues']
+            # 排除 UTF-8、SHA-256 等形似工单号的词，避免按工单并发执行时查询不存在的工单
+            self.state.jira_issues = filter_jira_issue_keys(extracted_data['jira_issues'])
         
         # 更新告警信息
         if classification_result.input_type in [InputType.ALERT, InputType.HYBRID]:
@@ -204,6 +282,18 @@ class HeimdallrFlow(Flow[DiagnosisState]):
     
 
     
+    def _get_skipped_analyses_section(self) -> str:
+        """列出因时间预算或缺少输入而未执行的分析，没有时返回空字符串"""
+        shed_tasks = self.state.metadata.get("shed_tasks", {})
+        pruned_tasks = self.state.metadata.get("pruned_tasks", {})
+        if not shed_tasks and not pruned_tasks:
+            return ""
+        
+        lines = ["## 未执行的分析"]
+        lines.extend(f"- {task}: {reason}" for task, reason in shed_tasks.items())
+        lines.extend(f"- {task}: {reason}" for task, reason in pruned_tasks.items())
+        return "\n".join(lines)
+    
     def _get_basic_summary(self) -> str:
         """获取基础摘要"""
         classification = self.state.classification
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .metrics import LLM_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_messages(messages: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, str]]:
+    """归一化消息列表：统一为 role/content 结构，统一换行符并去除首尾空白"""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        normalized.append({
+            "role": str(message.get("role", "user")),
+            "content": content.replace("\r\n", "\n").strip()
+        })
+    return normalized
+
+
+def cache_key(model: str, messages: Union[str, List[Dict[str, Any]]], params: Dict[str, Any]) -> str:
+    """按模型、归一化后的消息和采样参数计算缓存键"""
+    payload = json.dumps(
+        {"model": model, "messages": normalize_messages(messages), "params": params},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """两级 LLM 响应缓存 - 内存 LRU + SQLite 磁盘缓存
+
+    内存层按最近使用淘汰；磁盘层按 TTL 过期、超过条数上限时淘汰最旧的记录，进程重启后仍可命中。
+    只应用于 temperature 为 0 的 LLM（由 LLM 配置中的 deterministic 开启），否则缓存的回答没有意义。
+    """
+
+    def __init__(self, max_memory_entries: int = 512, disk_path: Optional[str] = None,
+                 ttl_seconds: float = 86400, max_disk_entries: int = 10000):
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if disk_path:
+            db_dir = os.path.dirname(disk_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_responses_created_at ON llm_responses (created_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """查找缓存的响应，内存未命中时查找磁盘层并回填内存"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._put_memory(key, row[0], row[1])
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """写入两级缓存"""
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, response, now)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, now),
+            )
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                """DELETE FROM llm_responses WHERE cache_key IN (
+                    SELECT cache_key FROM llm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_disk_entries,),
+            )
+            self._conn.commit()
+
+    def _put_memory(self, key: str, response: str, created_at: float):
+        """写入内存层（调用方需持有锁）"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+# 当前线程的缓存命中统计，用于按 Flow 汇总到 state.metadata
+_usage = threading.local()
+
+
+@contextmanager
+def track_cache_usage() -> Iterator[Dict[str, int]]:
+    """统计上下文内（当前线程）LLM 调用的缓存命中和未命中次数"""
+    previous = getattr(_usage, "counts", None)
+    counts = {"hits": 0, "misses": 0}
+    _usage.counts = counts
+    try:
+        yield counts
+    finally:
+        _usage.counts = previous
+        if previous is not None:
+            previous["hits"] += counts["hits"]
+            previous["misses"] += counts["misses"]
+
+
+def record_cache_lookup(llm_name: str, hit: bool):
+    """记录一次缓存查找结果"""
+    LLM_CACHE_LOOKUPS.inc(llm=llm_name, result="hit" if hit else "miss")
+    counts = getattr(_usage, "counts", None)
+    if counts is not None:
+        counts["hits" if hit else "misses"] += 1
+
+
+def create_llm_cache() -> Optional[LLMResponseCache]:
+    """根据环境变量创建 LLM 响应缓存，未开启时返回 None"""
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return LLMResponseCache(
+        max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_MAX_ENTRIES", "512")),
+        disk_path=os.getenv("LLM_CACHE_PATH", "data/llm_cache.db") or None,
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+        max_disk_entries=int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+    )
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from .metrics import LLM_RATE_LIMIT_WAIT, LLM_RATE_LIMIT_QUEUE_DEPTH, LLM_RATE_LIMIT_ESTIMATED_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class _TokenBucket:
+    """令牌桶：容量为每分钟配额，按秒匀速补充"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay_for(self, amount: float) -> float:
+        """补足 amount 个令牌还需等待的秒数（调用前需先 refill）"""
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMRateLimiter:
+    """进程级 LLM 限流器 - 按请求数（RPM）和估算 token 数（TPM）令牌桶限流，并限制同时进行的调用数
+
+    调用方按到达顺序排队，只有队首可以消耗令牌，配额不足时等待而不是失败，
+    避免多个 Flow 的并行任务同时突发导致服务商 429。收到 429 时暂停放行 cooldown_seconds 秒。
+    各项限制为 0 表示不限制，全部为 0 时限流器不生效。
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 0, cooldown_seconds: float = 5.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.cooldown_seconds = cooldown_seconds
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._condition = threading.Condition()
+        self._queue: deque = deque()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_wait = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._requests or self._tokens or self.max_concurrency > 0)
+
+    @contextmanager
+    def acquire(self, estimated_tokens: int, llm_name: str = "default") -> Iterator[None]:
+        """排队等待配额后执行一次调用，上下文结束时释放并发名额"""
+        if not self.enabled:
+            yield
+            return
+
+        self._wait_turn(estimated_tokens, llm_name)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def penalize(self):
+        """服务商返回 429 时调用：cooldown_seconds 秒内不再放行新的调用"""
+        if not self.enabled:
+            return
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + self.cooldown_seconds)
+        logger.warning(f"LLM 服务商返回限流错误，暂停放行 {self.cooldown_seconds:g}s")
+
+    def queue_depth(self) -> int:
+        """正在排队等待配额的调用数"""
+        with self._condition:
+            return len(self._queue)
+
+    def estimated_wait_seconds(self) -> float:
+        """新到达的调用预计需要等待的秒数（按冷却时间和排队调用所需的请求配额估算）"""
+        if not self.enabled:
+            return 0.0
+        with self._condition:
+            now = time.monotonic()
+            delays = [self._blocked_until - now]
+            if self._requests is not None:
+                self._requests.refill(now)
+                delays.append((len(self._queue) + 1 - self._requests.tokens) / self._requests.rate)
+            return max(0.0, *delays)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取限流器当前状态"""
+        estimated_wait = self.estimated_wait_seconds()
+        with self._condition:
+            return {
+                "enabled": self.enabled,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "max_concurrency": self.max_concurrency,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "estimated_wait_seconds": round(estimated_wait, 3),
+                "last_wait_seconds": round(self._last_wait, 3)
+            }
+
+    def _wait_turn(self, estimated_tokens: int, llm_name: str):
+        """按 FIFO 顺序等待，轮到自己且配额充足时消耗令牌并占用并发名额"""
+        ticket = object()
+        start_time = time.monotonic()
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    if self._queue[0] is ticket:
+                        delay = self._admission_delay(estimated_tokens)
+                        if delay <= 0:
+                            break
+                        # 并发名额已满时等待其他调用释放（notify），否则等到令牌补足
+                        self._condition.wait(timeout=None if delay == float("inf") else delay)
+                    else:
+                        self._condition.wait()
+                if self._requests is not None:
+                    self._requests.consume(1)
+                if self._tokens is not None:
+                    self._tokens.consume(estimated_tokens)
+                self._in_flight += 1
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+
+            self._last_wait = time.monotonic() - start_time
+        LLM_RATE_LIMIT_WAIT.observe(self._last_wait, llm=llm_name)
+        if self._last_wait >= 1:
+            logger.info(f"LLM 调用 ({llm_name}) 排队等待 {self._last_wait:.1f}s")
+
+    def _admission_delay(self, estimated_tokens: int) -> float:
+        """队首调用还需等待的秒数，调用方需持有锁"""
+        now = time.monotonic()
+        delays = [self._blocked_until - now]
+        if self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+            delays.append(float("inf"))
+        if self._requests is not None:
+            self._requests.refill(now)
+            delays.append(self._requests.delay_for(1))
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            delays.append(self._tokens.delay_for(estimated_tokens))
+        return max(delays)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """判断异常是否为服务商的限流错误（HTTP 429）"""
+    return getattr(error, "status_code", None) == 429 or "RateLimitError" in type(error).__name__
+
+
+# 创建一个全局实例
+llm_rate_limiter = LLMRateLimiter(
+    requests_per_minute=float(os.getenv("LLM_RATE_LIMIT_RPM", "0")),
+    tokens_per_minute=float(os.getenv("LLM_RATE_LIMIT_TPM", "0")),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "0")),
+    cooldown_seconds=float(os.getenv("LLM_RATE_LIMIT_COOLDOWN_SECONDS", "5"))
+)
+LLM_RATE_LIMIT_QUEUE_DEPTH.set_function(llm_rate_limiter.queue_depth)
+LLM_RATE_LIMIT_ESTIMATED_WAIT.set_function(llm_rate_limiter.estimated_wait_seconds)
@@ -1,18 +1,110 @@
 import os
 import logging
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.language_models.chat_models import BaseChatModel
-from config.llm_config import LLM_CONFIG
+import threading
+from typing import Any, Dict, Optional
+from crewai import LLM
+from config.llm_config import LLM_CONFIG, TASK_LLM_TIERS, DEFAULT_LLM_TIER
+
+from .metrics import LLM_CALL_DURATION
+from .llm_cache import LLMResponseCache, cache_key, create_llm_cache, normalize_messages, record_cache_lookup
+from .llm_rate_limiter import LLMRateLimiter, is_rate_limit_error, llm_rate_limiter
+from .tasks.prompt_budget import count_tokens
+
+# 限流时对回答 token 数的估计（未设置 max_tokens 时使用）
+LLM_RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("LLM_RATE_LIMIT_COMPLETION_TOKENS", "1000"))
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
+class InstrumentedLLM(LLM):
+    """记录每次调用耗时的 LLM。
+
+    crewai 会把 Agent 收到的非 crewai LLM 对象重新构造成 crewai.LLM，
+    因此注册表直接构造 crewai.LLM 的子类，才能在每次调用上挂载指标。
+    """
+    def __init__(self, registry_name: str, response_cache: Optional[LLMResponseCache] = None,
+                 rate_limiter: Optional[LLMRateLimiter] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.registry_name = registry_name
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+
+    def call(self, messages, *args, **kwargs):
+        key = self._cache_key(messages, args, kwargs)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            record_cache_lookup(self.registry_name, hit=cached is not None)
+            if cached is not None:
+                return cached
+
+        if self.rate_limiter is None or not self.rate_limiter.enabled:
+            response = self._timed_call(messages, *args, **kwargs)
+        else:
+            with self.rate_limiter.acquire(self._estimate_tokens(messages), self.registry_name):
+                try:
+                    response = self._timed_call(messages, *args, **kwargs)
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        self.rate_limiter.penalize()
+                    raise
+
+        if key is not None and isinstance(response, str) and response.strip():
+            self.response_cache.set(key, response)
+        return response
+
+    def _timed_call(self, messages, *args, **kwargs):
+        with LLM_CALL_DURATION.time(llm=self.registry_name, model=self.model, status="success") as labels:
+            try:
+                return super().call(messages, *args, **kwargs)
+            except Exception:
+                labels["status"] = "error"
+                raise
+
+    def _estimate_tokens(self, messages) -> int:
+        """估算一次调用消耗的 token 数（提示词 + 回答上限），用于 TPM 限流"""
+        prompt_tokens = sum(count_tokens(message["content"]) for message in normalize_messages(messages))
+        return prompt_tokens + (self.max_tokens or LLM_RATE_LIMIT_COMPLETION_TOKENS)
+
+    def _cache_key(self, messages, args, kwargs) -> Optional[str]:
+        """计算缓存键；未启用缓存或调用带有工具（可能有副作用）时返回 None"""
+        if self.response_cache is None or args or kwargs.get("tools") or kwargs.get("available_functions"):
+            return None
+        params = {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "max_tokens": self.max_tokens,
+            "max_completion_tokens": self.max_completion_tokens,
+            "stop": self.stop,
+            "seed": self.seed,
+            "response_format": self.response_format,
+        }
+        return cache_key(self.model, messages, params)
+
+
+def llm_tier_for_task(task_type: str) -> str:
+    """获取任务使用的模型分级"""
+    return TASK_LLM_TIERS.get(task_type, DEFAULT_LLM_TIER)
+
+
 class LLMRegistry:
-    """一个基于配置的、可根据服务商选择不同实现的智能 LLM 工厂。"""
+    """一个基于配置的、可根据服务商选择不同实现的智能 LLM 工厂。
+
+    LLM 在第一次获取时才注册，导入本模块不会构造任何 LLM 实例。
+    """
     def __init__(self):
         self._llms = {}
-        self._register_all()
+        self._response_cache: Optional[LLMResponseCache] = None
+        self._registered = False
+        self._lock = threading.Lock()
+
+    def ensure_registered(self):
+        """确保已读取配置并注册所有 LLM（线程安全，只执行一次）。"""
+        if self._registered:
+            return
+        with self._lock:
+            if not self._registered:
+                self._register_all()
+                self._registered = True
 
     def _register_all(self):
         """读取配置并注册所有定义的 LLM。"""
@@ -47,29 +139,62 @@ class LLMRegistry:
         # 这是解决所有问题的核心
         model_identifier = f"{provider}/{model_name}"
 
-        base_params = {"model": model_identifier, "api_key": api_key, "temperature": 0.7}
+        # deterministic 的 LLM 使用 temperature 0，并开启响应缓存（相同请求的回答可以复用）
+        deterministic = bool(config.get("deterministic", False))
+        temperature = 0.0 if deterministic else config.get("temperature", 0.7)
+        base_params = {"model": model_identifier, "api_key": api_key, "temperature": temperature}
+
+        response_cache = None
+        if deterministic:
+            if self._response_cache is None:
+                self._response_cache = create_llm_cache()
+            response_cache = self._response_cache
 
         if provider == "openai":
             if base_url_env and (base_url := os.getenv(base_url_env)):
                 base_params["base_url"] = base_url
-            llm_instance = ChatOpenAI(**base_params)
+            llm_instance = InstrumentedLLM(registry_name=name, response_cache=response_cache,
+                                           rate_limiter=llm_rate_limiter, **base_params)
         
         else:
             logger.warning(f"不支持的服务商: '{provider}'。跳过注册 '{name}'。")
             return
 
         self._llms[name] = llm_instance
-        logger.info(f"✅ 成功注册 LLM: '{name}' (标识: {model_identifier})。")
+        logger.info(f"✅ 成功注册 LLM: '{name}' (标识: {model_identifier}, temperature: {temperature}, "
+                    f"缓存: {'开启' if response_cache else '关闭'})。")
 
-    def get(self, name: str) -> BaseChatModel:
+    def get(self, name: str) -> LLM:
         """
         从注册表中获取一个已命名的 LLM 实例。
         """
+        self.ensure_registered()
         llm = self._llms.get(name)
         if not llm:
             logger.error(f"请求的 LLM '{name}' 未被注册或注册失败。")
             raise ValueError(f"LLM '{name}' not found.")
         return llm
 
+    def get_for_task(self, task_type: str, fallback: Optional[LLM] = None) -> LLM:
+        """获取任务所属模型分级的 LLM；该分级未注册时使用 fallback，没有 fallback 时使用 default"""
+        self.ensure_registered()
+        llm = self._llms.get(llm_tier_for_task(task_type))
+        if llm is not None:
+            return llm
+        return fallback if fallback is not None else self.get("default")
+
+    def stats(self) -> Dict[str, Any]:
+        """各已注册 LLM 的模型、调用次数和平均调用耗时，用于对比各模型分级的延迟"""
+        totals = LLM_CALL_DURATION.totals_by("llm")
+        stats = {}
+        for name, llm in self._llms.items():
+            count, total = totals.get(name, (0, 0.0))
+            stats[name] = {
+                "model": llm.model,
+                "calls": count,
+                "mean_call_seconds": round(total / count, 3) if count else None
+            }
+        return stats
+
 # 创建一个全局实例
 llm_registry = LLMRegistry()
@@ -0,0 +1,309 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 延迟类指标的默认分桶（秒），覆盖从毫秒级规则分类到分钟级 LLM 调用
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类"""
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值，也可在采集时通过回调函数计算"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """采集时调用 function 获取当前值（仅适用于无标签的指标）"""
+        self._function = function
+
+    def _render_samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Histogram(_Metric):
+    """分桶直方图，用于统计延迟分布（可据此计算 p95 等分位数）"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 每组标签对应 (各分桶计数, 总和, 总数)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[Dict[str, str]]:
+        """计时上下文，可在上下文中修改产出的标签字典（如根据执行结果设置 status）"""
+        start_time = time.perf_counter()
+        mutable_labels = dict(labels)
+        try:
+            yield mutable_labels
+        finally:
+            self.observe(time.perf_counter() - start_time, **mutable_labels)
+
+    def mean(self, **labels) -> Optional[float]:
+        """获取指定标签下观测值的平均值，没有观测值时返回 None"""
+        with self._lock:
+            _, total, count = self._values.get(self._label_values(labels), (None, 0.0, 0))
+        return total / count if count else None
+
+    def totals_by(self, label_name: str) -> Dict[str, Tuple[int, float]]:
+        """按单个标签汇总观测次数和总和，返回 {标签值: (次数, 总和)}"""
+        index = self.label_names.index(label_name)
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for key, (_, total, count) in self._values.items():
+                previous_count, previous_total = totals.get(key[index], (0, 0.0))
+                totals[key[index]] = (previous_count + count, previous_total + total)
+        return totals
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(upper_bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，按 Prometheus 文本格式输出所有指标"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 创建一个全局实例
+metrics_registry = MetricsRegistry()
+
+# 分类与模式提取
+CLASSIFICATION_DURATION = metrics_registry.histogram(
+    "heimdallr_classification_duration_seconds",
+    "输入分类耗时，path 为 rule（规则分类直接返回）或 ai（AI 增强分类）",
+    ["path"]
+)
+PATTERN_EXTRACTION_DURATION = metrics_registry.histogram(
+    "heimdallr_pattern_extraction_duration_seconds",
+    "模式提取耗时，status 为 local（仅本地提取）、success（调用了 LLM）或 error",
+    ["status"]
+)
+
+# 工作流与任务
+FLOW_DURATION = metrics_registry.histogram(
+    "heimdallr_flow_duration_seconds",
+    "单个 Flow 从分类到生成报告的总耗时",
+    ["workflow"]
+)
+TASK_DURATION = metrics_registry.histogram(
+    "heimdallr_task_duration_seconds",
+    "工作流中单个任务的执行耗时",
+    ["task_type", "status"]
+)
+TASKS_SHED = metrics_registry.counter(
+    "heimdallr_tasks_shed_total",
+    "因时间预算不足而跳过的工作流任务数",
+    ["task_type"]
+)
+
+PROMPT_SECTIONS_CUT = metrics_registry.counter(
+    "heimdallr_prompt_sections_cut_total",
+    "因超出提示词 token 预算被压缩的数据段落数（action: summarized / truncated / omitted）",
+    ["task_type", "action"]
+)
+
+OUTPUT_PARSE_RESULTS = metrics_registry.counter(
+    "heimdallr_output_parse_results_total",
+    "任务输出解析结果（outcome: structured / json / repaired / schema_mismatch / failed）",
+    ["task_type", "outcome"]
+)
+
+# LLM 与工具调用
+LLM_CALL_DURATION = metrics_registry.histogram(
+    "heimdallr_llm_call_duration_seconds",
+    "单次 LLM 调用耗时",
+    ["llm", "model", "status"]
+)
+LLM_CACHE_LOOKUPS = metrics_registry.counter(
+    "heimdallr_llm_cache_lookups_total",
+    "LLM 响应缓存查找次数（result: hit / miss）",
+    ["llm", "result"]
+)
+LLM_RATE_LIMIT_WAIT = metrics_registry.histogram(
+    "heimdallr_llm_rate_limit_wait_seconds",
+    "LLM 调用在进程级限流器中排队等待配额的时间",
+    ["llm"]
+)
+LLM_RATE_LIMIT_QUEUE_DEPTH = metrics_registry.gauge(
+    "heimdallr_llm_rate_limit_queue_depth",
+    "正在限流器中排队的 LLM 调用数"
+)
+LLM_RATE_LIMIT_ESTIMATED_WAIT = metrics_registry.gauge(
+    "heimdallr_llm_rate_limit_estimated_wait_seconds",
+    "新到达的 LLM 调用在限流器中的预计等待时间"
+)
+TOOL_CALL_DURATION = metrics_registry.histogram(
+    "heimdallr_tool_call_duration_seconds",
+    "外部工具调用耗时",
+    ["tool", "status"]
+)
+
+# Flow 执行器
+FLOW_QUEUE_DEPTH = metrics_registry.gauge(
+    "heimdallr_flow_queue_depth",
+    "等待执行的 Flow 数量"
+)
+FLOWS_IN_FLIGHT = metrics_registry.gauge(
+    "heimdallr_flows_in_flight",
+    "正在执行的 Flow 数量"
+)
+FLOWS_REJECTED = metrics_registry.counter(
+    "heimdallr_flows_rejected_total",
+    "因队列已满被拒绝的请求数"
+)
+FLOWS_COALESCED = metrics_registry.counter(
+    "heimdallr_flows_coalesced_total",
+    "合并到执行中 Flow 的请求数"
+)
+
+# 推测执行
+SPECULATION_OUTCOMES = metrics_registry.counter(
+    "heimdallr_speculation_outcomes_total",
+    "推测执行结果，outcome 为 hit（AI 分类与规则预测一致，结果被采用）或 miss（结果被丢弃）",
+    ["outcome"]
+)
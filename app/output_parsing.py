@@ -0,0 +1,187 @@
+import re
+import ast
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from .metrics import OUTPUT_PARSE_RESULTS
+
+logger = logging.getLogger(__name__)
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+# 在一段文本中尝试解码的 JSON 起始位置上限，避免对超长的非 JSON 文本反复解码
+_MAX_DECODE_ATTEMPTS = 50
+# 截断输出补全时最多回退的次数
+_MAX_TRUNCATION_REPAIRS = 5
+
+
+def extract_json_object(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """从 LLM 输出中提取 JSON 对象，返回 (对象, 结果)
+
+    结果为 json（整段即 JSON）、repaired（从代码块、前后说明文字中提取，或经过修复）或 failed。
+    修复包括：去掉尾随逗号和 // 注释、按 Python 字面量解析（单引号、True/False/None）、
+    补全被截断的字符串和括号。
+    """
+    text = (text or "").strip()
+    if not text:
+        return None, "failed"
+
+    try:
+        data = json.loads(text, strict=False)
+        if isinstance(data, dict):
+            return data, "json"
+    except ValueError:
+        pass
+
+    candidates = [block.strip() for block in _FENCE_PATTERN.findall(text)] + [text]
+    for candidate in candidates:
+        data = _decode_largest_object(candidate)
+        if data is not None:
+            return data, "repaired"
+
+    for candidate in candidates:
+        data = _repair(candidate)
+        if data is not None:
+            return data, "repaired"
+
+    return None, "failed"
+
+
+def parse_json_output(raw: str, task_type: str, output_model: Optional[Type[BaseModel]] = None,
+                      structured: Optional[BaseModel] = None) -> Optional[Dict[str, Any]]:
+    """解析任务输出为字典，无法解析时返回 None
+
+    structured 为 crewai 按 output_pydantic 转换得到的模型实例，存在时直接使用；
+    否则用 extract_json_object 容错解析原始输出，再按 output_model 校验和规范字段类型。
+    与模型不符的结果仍然返回（记为 schema_mismatch），只有无法解析出 JSON 对象时才视为失败。
+    每次解析的结果记录在 heimdallr_output_parse_results_total 中。
+    """
+    if structured is not None:
+        data, outcome = structured.model_dump(exclude_unset=True), "structured"
+    else:
+        data, outcome = extract_json_object(raw)
+        if data is not None and output_model is not None:
+            try:
+                data = output_model.model_validate(data).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                logger.warning(f"任务 {task_type} 的输出与输出模型不符，保留原始字段: {e.error_count()} 处错误")
+                outcome = "schema_mismatch"
+
+    OUTPUT_PARSE_RESULTS.inc(task_type=task_type, outcome=outcome)
+    if data is None:
+        logger.warning(f"任务 {task_type} 的输出无法解析为 JSON，长度: {len(raw or '')}")
+    return data
+
+
+def _decode_largest_object(text: str) -> Optional[Dict[str, Any]]:
+    """在文本中查找能直接解码的 JSON 对象，返回其中最长的一个"""
+    decoder = json.JSONDecoder(strict=False)
+    best, best_length = None, 0
+    index = text.find("{")
+    attempts = 0
+    while index != -1 and attempts < _MAX_DECODE_ATTEMPTS:
+        attempts += 1
+        try:
+            data, end = decoder.raw_decode(text, index)
+        except ValueError:
+            index = text.find("{", index + 1)
+            continue
+        if isinstance(data, dict) and end - index > best_length:
+            best, best_length = data, end - index
+        index = text.find("{", end)
+    return best
+
+
+def _repair(text: str) -> Optional[Dict[str, Any]]:
+    """修复常见的格式问题后解析，失败返回 None"""
+    start = text.find("{")
+    if start == -1:
+        return None
+    end = text.rfind("}")
+    body = text[start:end + 1] if end > start else text[start:]
+    body = _TRAILING_COMMA_PATTERN.sub(r"\1", _strip_comments(body))
+
+    for attempt in (body, text[start:]):
+        data = _loads(attempt)
+        if data is not None:
+            return data
+
+    # 输出被截断：补全字符串和括号，仍失败时回退到上一个逗号再试
+    truncated = _TRAILING_COMMA_PATTERN.sub(r"\1", _strip_comments(text[start:]))
+    for _ in range(_MAX_TRUNCATION_REPAIRS):
+        data = _loads(_close_truncated(truncated))
+        if data is not None:
+            return data
+        cut = truncated.rfind(",")
+        if cut <= 0:
+            break
+        truncated = truncated[:cut]
+    return None
+
+
+def _loads(text: str) -> Optional[Dict[str, Any]]:
+    """按 JSON 解析，失败时按 Python 字面量解析"""
+    try:
+        data = json.loads(text, strict=False)
+    except ValueError:
+        try:
+            data = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _strip_comments(text: str) -> str:
+    """去掉字符串之外的 // 注释（到行尾）"""
+    result = []
+    in_string = escaped = in_comment = False
+    for index, char in enumerate(text):
+        if in_comment:
+            if char == "\n":
+                in_comment = False
+                result.append(char)
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "/" and text.startswith("//", index):
+            in_comment = True
+            continue
+        result.append(char)
+    return "".join(result)
+
+
+def _close_truncated(text: str) -> str:
+    """补全被截断的 JSON：闭合未结束的字符串，去掉悬空的逗号，按嵌套顺序补齐括号"""
+    closers = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",").rstrip()
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(closers))
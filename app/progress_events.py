@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressEventType:
+    """进度事件类型"""
+    STATUS = "status"                  # 请求状态变化
+    TASK_COMPLETED = "task_completed"  # 单个任务记录了结果
+    COMPLETED = "completed"            # 分析完成（终止事件）
+    FAILED = "failed"                  # 分析失败（终止事件）
+
+
+TERMINAL_EVENT_TYPES = {ProgressEventType.COMPLETED, ProgressEventType.FAILED}
+
+
+class _EventChannel:
+    """单个请求的事件历史和订阅者"""
+
+    def __init__(self):
+        self.history: List[Dict[str, Any]] = []
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self.closed = False
+
+
+class ProgressEventBroker:
+    """进度事件中心 - 工作线程发布任务进度，事件循环中的 SSE 连接订阅
+
+    每个请求保留事件历史，晚连接的订阅者会先收到历史事件；保留的请求数量有上限，
+    仍有订阅者的通道不会被淘汰。
+    """
+
+    def __init__(self, max_channels: int = 500):
+        self.max_channels = max_channels
+        self._channels: "OrderedDict[str, _EventChannel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, request_id: str, event_type: str, data: Dict[str, Any]):
+        """发布事件（可在任意线程调用）"""
+        event = make_event(event_type, data)
+        with self._lock:
+            channel = self._get_or_create(request_id)
+            if channel.closed:
+                return
+            channel.history.append(event)
+            if event_type in TERMINAL_EVENT_TYPES:
+                channel.closed = True
+            subscribers = list(channel.subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+    async def subscribe(self, request_id: str, keepalive_interval: float = 15.0,
+                        terminal_check: Optional[Callable[[], Optional[Dict[str, Any]]]] = None
+                        ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """订阅请求的进度事件，先回放历史事件；空闲时产出 None 作为心跳，收到终止事件后结束
+
+        terminal_check 返回请求已结束时的终止事件（否则返回 None），在订阅开始和每次心跳时调用，
+        用于事件历史已被淘汰或进程重启后丢失时，仍能向订阅者推送终止事件并结束。
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        with self._lock:
+            channel = self._get_or_create(request_id)
+            history = list(channel.history)
+            closed = channel.closed
+            if not closed:
+                channel.subscribers.append((loop, queue))
+
+        try:
+            for event in history:
+                yield event
+            if closed:
+                return
+
+            check_terminal = True
+            while True:
+                if check_terminal and terminal_check is not None:
+                    event = terminal_check()
+                    if event is not None:
+                        yield event
+                        return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive_interval)
+                except asyncio.TimeoutError:
+                    check_terminal = True
+                    yield None
+                    continue
+                check_terminal = False
+                yield event
+                if event["event"] in TERMINAL_EVENT_TYPES:
+                    return
+        finally:
+            with self._lock:
+                if (loop, queue) in channel.subscribers:
+                    channel.subscribers.remove((loop, queue))
+
+    def _get_or_create(self, request_id: str) -> _EventChannel:
+        """获取请求的事件通道，超出容量时淘汰最旧的无订阅者通道（调用方需持有锁）"""
+        channel = self._channels.get(request_id)
+        if channel is None:
+            channel = _EventChannel()
+            self._channels[request_id] = channel
+            excess = len(self._channels) - self.max_channels
+            if excess > 0:
+                evictable = [key for key, existing in self._channels.items()
+                             if not existing.subscribers and key != request_id][:excess]
+                for key in evictable:
+                    del self._channels[key]
+        return channel
+
+
+def make_event(event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """构建进度事件"""
+    return {"event": event_type, "data": data, "timestamp": time.time()}
+
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """将事件格式化为 Server-Sent Events 文本，None 表示心跳注释"""
+    if event is None:
+        return ": keepalive\n\n"
+    payload = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"event: {event['event']}\ndata: {payload}\n\n"
+
+
+# 创建一个全局实例
+progress_broker = ProgressEventBroker(
+    max_channels=int(os.getenv("PROGRESS_EVENT_MAX_CHANNELS", "500"))
+)
@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_MESSAGES = metrics_registry.counter(
+    "heimdallr_delivery_messages_total",
+    "报告投递消息数，status 为 sent / failed / dropped",
+    ["status"]
+)
+DELIVERY_QUEUE_DEPTH = metrics_registry.gauge(
+    "heimdallr_delivery_queue_depth",
+    "等待投递的报告消息数量"
+)
+
+
+def split_markdown(text: str, max_length: int = 4096) -> List[str]:
+    """将 Markdown 报告按平台消息长度上限拆分
+
+    优先在行边界拆分；代码块被拆开时，会在前一段末尾补上结束标记、在后一段开头重新打开代码块。
+    """
+    if len(text) <= max_length:
+        return [text]
+
+    fence_closing = "\n```"
+    # 每段预留代码块结束标记的长度
+    budget = max_length - len(fence_closing)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_length = 0
+    # 当前段是否只有重新打开代码块的标记（没有新内容）
+    fresh = True
+    fence_opener: Optional[str] = None
+
+    def flush():
+        nonlocal current, current_length, fresh
+        chunk = "\n".join(current)
+        if fence_opener is not None:
+            chunk += fence_closing
+        chunks.append(chunk)
+        current = [fence_opener] if fence_opener is not None else []
+        current_length = len(fence_opener) if fence_opener is not None else 0
+        fresh = True
+
+    def append(piece: str):
+        nonlocal current_length, fresh
+        current_length += len(piece) + (1 if current else 0)
+        current.append(piece)
+        fresh = False
+
+    for line in text.split("\n"):
+        rest = line
+        while True:
+            separator = 1 if current else 0
+            if current_length + separator + len(rest) <= budget:
+                append(rest)
+                break
+            if not fresh:
+                # 优先在行边界拆分
+                flush()
+                continue
+            # 新的一段也放不下：超长的单行直接硬切，长度扣除已重新打开的代码块标记
+            available = max(budget - current_length - separator, 1)
+            append(rest[:available])
+            rest = rest[available:]
+            flush()
+
+        if line.strip().startswith("```"):
+            # 重新打开代码块的标记最多占每段的一半，保证硬切时仍有空间
+            fence_opener = None if fence_opener is not None else line.strip()[:budget // 2]
+
+    # 末尾不需要补代码块结束标记
+    if current and not fresh:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class SeaTalkTokenCache:
+    """应用访问令牌缓存 - 进程内缓存 app_access_token，过期前一段时间才重新获取"""
+
+    def __init__(self, app_id: str, app_secret: str, api_base: str, refresh_margin: float = 300):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.api_base = api_base
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expire_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_token(self, client: httpx.AsyncClient) -> str:
+        if self._is_fresh():
+            return self._token
+        async with self._lock:
+            # 等锁期间可能已被其他协程刷新
+            if self._is_fresh():
+                return self._token
+            response = await client.post(
+                f"{self.api_base}/auth/app_access_token",
+                json={"app_id": self.app_id, "app_secret": self.app_secret}
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get("code") != 0:
+                raise RuntimeError(f"获取 app_access_token 失败: {data}")
+            self._token = data["app_access_token"]
+            self._expire_at = float(data.get("expire") or time.time() + 7200)
+            logger.info("已刷新 SeaTalk app_access_token")
+            return self._token
+
+    def invalidate(self):
+        self._token = None
+        self._expire_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._expire_at - self.refresh_margin
+
+
+class ReportDeliveryService:
+    """报告投递服务 - 将分析报告发送回 SeaTalk 会话
+
+    使用单个带连接池的 httpx.AsyncClient，消息进入有界队列后由后台协程按平台速率限制依次发送，
+    Flow 工作线程只负责入队，不会被投递阻塞。
+    """
+
+    def __init__(self, app_id: str, app_secret: str,
+                 api_base: str = "https://openapi.seatalk.io",
+                 rate_limit_per_minute: int = 100,
+                 max_queue_size: int = 1000,
+                 max_message_length: int = 4096):
+        self.enabled = bool(app_id and app_secret)
+        self.api_base = api_base.rstrip("/")
+        self.min_interval = 60.0 / rate_limit_per_minute
+        self.max_queue_size = max_queue_size
+        self.max_message_length = max_message_length
+        self.token_cache = SeaTalkTokenCache(app_id, app_secret, self.api_base)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """在应用启动时调用，创建 HTTP 客户端和投递协程"""
+        if not self.enabled:
+            logger.info("未配置 SEATALK_APP_ID / SEATALK_APP_SECRET，报告投递未启用")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+        )
+        self._worker = asyncio.create_task(self._run())
+        DELIVERY_QUEUE_DEPTH.set_function(self._queue.qsize)
+        logger.info("报告投递服务已启动")
+
+    async def stop(self):
+        """在应用关闭时调用"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        if self._client:
+            await self._client.aclose()
+
+    def deliver_threadsafe(self, reply_target: Dict[str, Any], report: str):
+        """从任意线程提交报告投递，报告会被拆分为多条消息"""
+        if not self.enabled or self._loop is None:
+            return
+        messages = split_markdown(report, self.max_message_length)
+        for index, content in enumerate(messages):
+            # 只有第一条消息引用原消息
+            target = dict(reply_target) if index == 0 else {**reply_target, "quoted_message_id": None}
+            self._loop.call_soon_threadsafe(self._enqueue, target, content)
+
+    def _enqueue(self, reply_target: Dict[str, Any], content: str):
+        try:
+            self._queue.put_nowait((reply_target, content))
+        except asyncio.QueueFull:
+            DELIVERY_MESSAGES.inc(status="dropped")
+            logger.warning("报告投递队列已满，丢弃消息")
+
+    async def _run(self):
+        while True:
+            reply_target, content = await self._queue.get()
+            try:
+                await self._send(reply_target, content)
+                DELIVERY_MESSAGES.inc(status="sent")
+            except Exception as e:
+                DELIVERY_MESSAGES.inc(status="failed")
+                logger.error(f"报告投递失败: {e}")
+            finally:
+                self._queue.task_done()
+            # 按平台速率限制发送
+            await asyncio.sleep(self.min_interval)
+
+    async def _send(self, reply_target: Dict[str, Any], content: str, retry_on_auth_error: bool = True):
+        message: Dict[str, Any] = {"tag": "text", "text": {"format": 1, "content": content}}
+        if reply_target.get("quoted_message_id"):
+            message["quoted_message_id"] = reply_target["quoted_message_id"]
+
+        if reply_target.get("type") == "group":
+            url = f"{self.api_base}/messaging/v2/group_chat"
+            payload = {"group_id": reply_target["group_id"], "message": message}
+        else:
+            url = f"{self.api_base}/messaging/v2/single_chat"
+            payload = {"employee_code": reply_target["employee_code"], "message": message}
+
+        token = await self.token_cache.get_token(self._client)
+        response = await self._client.post(url, json=payload, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 401 and retry_on_auth_error:
+            self.token_cache.invalidate()
+            return await self._send(reply_target, content, retry_on_auth_error=False)
+        response.raise_for_status()
+
+        data = response.json()
+        if data.get("code") != 0:
+            raise RuntimeError(f"SeaTalk 消息发送失败: {data}")
+
+
+# 创建一个全局实例
+report_delivery = ReportDeliveryService(
+    app_id=os.getenv("SEATALK_APP_ID", ""),
+    app_secret=os.getenv("SEATALK_APP_SECRET", ""),
+    api_base=os.getenv("SEATALK_API_BASE", "https://openapi.seatalk.io"),
+    rate_limit_per_minute=int(os.getenv("SEATALK_RATE_LIMIT_PER_MINUTE", "100")),
+    max_queue_size=int(os.getenv("DELIVERY_QUEUE_MAX_SIZE", "1000")),
+    max_message_length=int(os.getenv("SEATALK_MESSAGE_MAX_LENGTH", "4096"))
+)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStatus:
+    """分析请求状态"""
+    PENDING = "pending"       # 已接收，等待执行
+    RUNNING = "running"       # 正在执行
+    COMPLETED = "completed"   # 执行完成
+    FAILED = "failed"         # 执行失败
+
+
+class ResultStore:
+    """分析结果存储 - 基于内存，按 request_id 保存状态、任务进度和最终报告
+
+    存储有界：超过 TTL 的记录会被淘汰，记录数超过上限时按最近更新时间淘汰最旧的记录。
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def create(self, request_id: str, input_text: str = "", source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """创建一条新的请求记录，source 记录请求来源（如 SeaTalk 回复目标）"""
+        now = time.time()
+        record = {
+            "request_id": request_id,
+            "status": ResultStatus.PENDING,
+            "input_preview": input_text[:200],
+            "progress": {},
+            "final_report": None,
+            "metadata": None,
+            "error": None,
+            "source": source,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._save(request_id, record)
+        return record
+
+    def update(self, request_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """更新请求记录的部分字段，记录不存在时返回 None"""
+        with self._lock:
+            record = self.get(request_id)
+            if record is None:
+                logger.warning(f"结果存储中不存在请求 {request_id}，忽略更新")
+                return None
+            record.update(fields)
+            record["updated_at"] = time.time()
+            self._save(request_id, record)
+            return record
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """获取请求记录，过期或不存在时返回 None"""
+        with self._lock:
+            record = self._entries.get(request_id)
+            if record is None:
+                return None
+            if self._is_expired(record):
+                del self._entries[request_id]
+                return None
+            return dict(record)
+
+    def delete(self, request_id: str):
+        """删除请求记录"""
+        with self._lock:
+            self._entries.pop(request_id, None)
+
+    def _save(self, request_id: str, record: Dict[str, Any]):
+        with self._lock:
+            self._entries[request_id] = dict(record)
+            self._entries.move_to_end(request_id)
+            self._evict()
+
+    def _evict(self):
+        """淘汰过期记录和超出容量的最旧记录（调用方需持有锁）"""
+        expired = [key for key, record in self._entries.items() if self._is_expired(record)]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _is_expired(self, record: Dict[str, Any]) -> bool:
+        return time.time() - record["updated_at"] > self.ttl_seconds
+
+
+class SQLiteResultStore(ResultStore):
+    """分析结果存储 - 基于 SQLite，进程重启后结果仍可查询"""
+
+    def __init__(self, db_path: str, ttl_seconds: float = 3600, max_entries: int = 1000):
+        super().__init__(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS analysis_results (
+                    request_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_results_updated_at "
+                "ON analysis_results (updated_at)"
+            )
+            self._conn.commit()
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, updated_at FROM analysis_results WHERE request_id = ?",
+                (request_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        payload, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            return None
+        return json.loads(payload)
+
+    def delete(self, request_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_results WHERE request_id = ?", (request_id,))
+            self._conn.commit()
+
+    def _save(self, request_id: str, record: Dict[str, Any]):
+        payload = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_results (request_id, payload, updated_at) "
+                "VALUES (?, ?, ?)",
+                (request_id, payload, record["updated_at"]),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """淘汰过期记录和超出容量的最旧记录（调用方需持有锁）"""
+        self._conn.execute(
+            "DELETE FROM analysis_results WHERE updated_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+        self._conn.execute(
+            """DELETE FROM analysis_results WHERE request_id IN (
+                SELECT request_id FROM analysis_results
+                ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+
+
+def create_result_store() -> ResultStore:
+    """根据环境变量创建结果存储"""
+    backend = os.getenv("RESULT_STORE_BACKEND", "memory").lower()
+    ttl_seconds = float(os.getenv("RESULT_STORE_TTL_SECONDS", "3600"))
+    max_entries = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "1000"))
+
+    if backend == "sqlite":
+        db_path = os.getenv("RESULT_STORE_PATH", "data/results.db")
+        logger.info(f"使用 SQLite 结果存储: {db_path}")
+        return SQLiteResultStore(db_path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    if backend != "memory":
+        logger.warning(f"不支持的结果存储类型: '{backend}'，使用内存存储")
+    return ResultStore(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+
+# 创建一个全局实例
+result_store = create_result_store()
@@ -0,0 +1,85 @@
+import hmac
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 事件列表，参考: https://open.seatalk.io/docs/list-of-events
+EVENT_VERIFICATION = "event_verification"
+MESSAGE_FROM_BOT_SUBSCRIBER = "message_from_bot_subscriber"
+NEW_MENTIONED_MESSAGE_RECEIVED_FROM_GROUP_CHAT = "new_mentioned_message_received_from_group_chat"
+
+# 需要触发分析的消息事件
+MESSAGE_EVENT_TYPES = {
+    MESSAGE_FROM_BOT_SUBSCRIBER,
+    NEW_MENTIONED_MESSAGE_RECEIVED_FROM_GROUP_CHAT,
+}
+
+
+def compute_signature(body: bytes, signing_secret: bytes) -> str:
+    """按 SeaTalk 规则计算签名：sha256(请求体 + 签名密钥) 的小写十六进制"""
+    return hashlib.sha256(body + signing_secret).hexdigest()
+
+
+def is_valid_signature(body: bytes, signature: Optional[str], signing_secret: bytes) -> bool:
+    """以常量时间比较签名，避免时序攻击"""
+    if not signature or not signing_secret:
+        return False
+    expected = compute_signature(body, signing_secret)
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def extract_message_text(event_type: str, event: Dict[str, Any]) -> Optional[str]:
+    """从消息事件中提取纯文本内容，非文本消息返回 None"""
+    message = event.get("message") or {}
+    if message.get("tag") != "text":
+        return None
+    text = message.get("text") or {}
+    # 群聊 @ 消息的 plain_text 已去掉 @ 机器人的部分
+    content = text.get("plain_text") or text.get("content")
+    return content.strip() if content else None
+
+
+def extract_reply_target(event_type: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """提取回复目标，用于将分析报告发送回原会话"""
+    message = event.get("message") or {}
+    if event_type == NEW_MENTIONED_MESSAGE_RECEIVED_FROM_GROUP_CHAT:
+        return {
+            "type": "group",
+            "group_id": event.get("group_id"),
+            "quoted_message_id": message.get("message_id"),
+        }
+    return {
+        "type": "single",
+        "employee_code": event.get("employee_code"),
+        "seatalk_id": event.get("seatalk_id"),
+        "quoted_message_id": message.get("message_id"),
+    }
+
+
+class EventDeduplicator:
+    """事件去重器 - 有界 LRU，记录最近处理过的 event_id，平台重试时不会重复触发分析"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_and_mark(self, event_id: str) -> bool:
+        """如果事件已处理过返回 True，否则标记为已处理并返回 False"""
+        now = time.time()
+        with self._lock:
+            seen_at = self._seen.get(event_id)
+            if seen_at is not None and now - seen_at <= self.ttl_seconds:
+                self._seen.move_to_end(event_id)
+                return True
+            self._seen[event_id] = now
+            self._seen.move_to_end(event_id)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
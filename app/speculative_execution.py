@@ -0,0 +1,153 @@
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from .flow_state import DiagnosisState, InputType, ClassificationResult
+from .metrics import SPECULATION_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+
+class Speculation:
+    """一次推测执行 - 按规则分类预测的工作流提前启动的任务
+
+    推测任务在状态的副本上执行，LLM 缓存和提示词压缩等统计先记录在副本中，
+    只有推测命中且所有推测任务结束后才合并到 Flow 的状态，未命中时直接丢弃。
+    """
+
+    def __init__(self, predicted_type: InputType, state: DiagnosisState):
+        self.predicted_type = predicted_type
+        self.state = state
+        self.scratch_state = state.model_copy(deep=True, update={"metadata": {}})
+        self.futures: Dict[str, Future] = {}
+        self.outcome: Optional[str] = None
+        self._running = 0
+        self._merged = False
+        self._lock = threading.Lock()
+
+    def run_task(self, router, task_type: str):
+        """在状态副本上执行一个推测任务"""
+        try:
+            return router._execute_single_task(task_type, self.scratch_state)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self.merge_if_ready()
+
+    def discard(self):
+        """丢弃推测任务的统计，之后不再合并"""
+        with self._lock:
+            self._merged = True
+
+    def merge_if_ready(self):
+        """推测命中且所有推测任务已结束时，把副本中记录的统计合并到 Flow 的状态（只合并一次）"""
+        with self._lock:
+            if self._merged or self.outcome != "hit" or self._running > 0:
+                return
+            self._merged = True
+        metadata = self.scratch_state.metadata
+        cache_usage = metadata.get("llm_cache", {})
+        self.state.record_llm_cache_usage(cache_usage.get("hits", 0), cache_usage.get("misses", 0))
+        for task_type, cuts in metadata.get("prompt_cuts", {}).items():
+            self.state.record_prompt_cuts(task_type, cuts)
+
+
+class SpeculativeExecutor:
+    """推测执行器 - 规则分类置信度不足时，在等待 AI 分类的同时执行预测工作流的第一层任务
+
+    AI 分类与规则预测一致时，推测任务交给工作流路由器继续等待并采用其结果；
+    不一致时取消尚未开始的任务并丢弃结果。默认关闭，通过 SPECULATIVE_EXECUTION_ENABLED 开启。
+    """
+
+    def __init__(self, enabled: bool = False, max_workers: int = 4):
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def start(self, router, state: DiagnosisState, rule_result: ClassificationResult) -> Optional[Speculation]:
+        """按规则分类结果启动推测任务，未启用或没有可推测的任务时返回 None"""
+        if not self.enabled or rule_result.input_type == InputType.UNKNOWN:
+            return None
+
+        task_types = router.first_level_tasks(rule_result.input_type, state)
+        if not task_types:
+            return None
+
+        executor = self._get_executor()
+        speculation = Speculation(rule_result.input_type, state)
+        speculation._running = len(task_types)
+        for task_type in task_types:
+            speculation.futures[task_type] = executor.submit(speculation.run_task, router, task_type)
+        logger.info(f"推测执行 {rule_result.input_type.value} 工作流的第一层任务: {task_types}")
+        return speculation
+
+    def resolve(self, speculation: Optional[Speculation], final_result: ClassificationResult,
+                state: DiagnosisState) -> Dict[str, Future]:
+        """根据最终分类结果处理推测任务，返回需要被工作流采用的任务
+
+        同一次推测只计数一次；已处理过的推测再次以不同分类处理时（如分类后的步骤出错转为未知类型），
+        只取消推测任务。
+        """
+        if speculation is None:
+            return {}
+
+        hit = final_result.input_type == speculation.predicted_type
+        if speculation.outcome is None:
+            speculation.outcome = "hit" if hit else "miss"
+            with self._lock:
+                if hit:
+                    self._hits += 1
+                else:
+                    self._misses += 1
+            SPECULATION_OUTCOMES.inc(outcome=speculation.outcome)
+
+        state.metadata["speculation"] = {
+            "predicted_type": speculation.predicted_type.value,
+            "final_type": final_result.input_type.value,
+            "tasks": list(speculation.futures),
+            "outcome": "hit" if hit else "miss"
+        }
+
+        if hit:
+            logger.info(f"推测命中，采用推测任务: {list(speculation.futures)}")
+            speculation.merge_if_ready()
+            return speculation.futures
+
+        # 已开始执行的任务无法中断，其结果和统计直接丢弃
+        speculation.discard()
+        cancelled = [task_type for task_type, future in speculation.futures.items() if future.cancel()]
+        logger.info(f"推测未命中（预测 {speculation.predicted_type.value}，实际 {final_result.input_type.value}），"
+                    f"丢弃推测任务，其中未开始而被取消的: {cancelled}")
+        return {}
+
+    def stats(self) -> Dict[str, Any]:
+        """获取推测执行统计"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else None
+            }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="heimdallr-speculative"
+                )
+            return self._executor
+
+
+# 创建一个全局实例
+speculative_executor = SpeculativeExecutor(
+    enabled=os.getenv("SPECULATIVE_EXECUTION_ENABLED", "false").lower() == "true",
+    max_workers=int(os.getenv("SPECULATIVE_MAX_WORKERS", "4"))
+)
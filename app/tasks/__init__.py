@@ -1,7 +1,7 @@
 # 新的精细化tasks模块
 
 from .base_task_factory import BaseTaskFactory
-from .task_registry import TaskRegistry, WorkflowTemplates
+from .task_registry import TaskRegistry, TaskCreationError, WorkflowTemplates
 from .conditional_tasks import ConditionalTaskFactory, ParallelTaskCoordinator, TaskDependencyManager
 
 # 各类任务工厂
@@ -29,13 +29,15 @@ from .synthesis_tasks import (
     RootCauseHypothesisGenerationTaskFactory,
     HypothesisValidationTaskFactory,
     SolutionArchitectureTaskFactory,
-    ComprehensiveReportGenerationTaskFactory
+    ComprehensiveReportGenerationTaskFactory,
+    FastSynthesisTaskFactory
 )
 
 __all__ = [
     # 核心类
     'BaseTaskFactory',
     'TaskRegistry', 
+    'TaskCreationError',
     'WorkflowTemplates',
     'ConditionalTaskFactory',
     'ParallelTaskCoordinator',
@@ -68,5 +70,6 @@ __all__ = [
     'RootCauseHypothesisGenerationTaskFactory',
     'HypothesisValidationTaskFactory',
     'SolutionArchitectureTaskFactory',
-    'ComprehensiveReportGenerationTaskFactory'
+    'ComprehensiveReportGenerationTaskFactory',
+    'FastSynthesisTaskFactory'
 ] 
\ No newline at end of file
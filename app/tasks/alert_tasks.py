@@ -1,10 +1,18 @@
 from crewai import Task, Agent
 from typing import Dict, Any
 from .base_task_factory import BaseTaskFactory
+from .output_models import (
+    AlertTriageOutput,
+    AlertComponentIdentificationOutput,
+    AlertLogSearchParametersOutput,
+    AlertBusinessImpactOutput
+)
 
 class AlertTriageTaskFactory(BaseTaskFactory):
     """告警分流任务工厂 - 只做严重性和基础分类"""
     
+    output_model = AlertTriageOutput
+    
     def create_task(self, agent: Agent, alert_text: str, **kwargs) -> Task:
         self._validate_required_params(['alert_text'], {'alert_text': alert_text})
         
@@ -44,7 +52,7 @@ class AlertTriageTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含严重程度、告警类型、紧急程度和判断理由的JSON对象",
             agent=agent
@@ -53,6 +61,8 @@ class AlertTriageTaskFactory(BaseTaskFactory):
 class AlertComponentIdentificationTaskFactory(BaseTaskFactory):
     """告警组件识别任务工厂 - 只识别影响的系统组件"""
     
+    output_model = AlertComponentIdentificationOutput
+    
     def create_task(self, agent: Agent, alert_text: str, **kwargs) -> Task:
         self._validate_required_params(['alert_text'], {'alert_text': alert_text})
         
@@ -97,7 +107,7 @@ class AlertComponentIdentificationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含主要组件、次要组件、影响系统和依赖关系的JSON对象",
             agent=agent
@@ -106,6 +116,8 @@ class AlertComponentIdentificationTaskFactory(BaseTaskFactory):
 class AlertLogSearchParameterGenerationTaskFactory(BaseTaskFactory):
     """告警日志搜索参数生成任务工厂 - 只生成搜索参数"""
     
+    output_model = AlertLogSearchParametersOutput
+    
     def create_task(self, agent: Agent, alert_info: str, components: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['alert_info', 'components'], {
             'alert_info': alert_info, 
@@ -168,7 +180,7 @@ class AlertLogSearchParameterGenerationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含应用列表、搜索查询、时间范围和搜索策略的JSON对象",
             agent=agent
@@ -177,6 +189,8 @@ class AlertLogSearchParameterGenerationTaskFactory(BaseTaskFactory):
 class AlertBusinessImpactAssessmentTaskFactory(BaseTaskFactory):
     """告警业务影响评估任务工厂 - 只评估业务影响"""
     
+    output_model = AlertBusinessImpactOutput
+    
     def create_task(self, agent: Agent, alert_text: str, components: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['alert_text', 'components'], {
             'alert_text': alert_text,
@@ -248,7 +262,7 @@ class AlertBusinessImpactAssessmentTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含用户影响、服务可用性、数据风险和财务影响评估的JSON对象",
             agent=agent
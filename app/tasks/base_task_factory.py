@@ -1,15 +1,31 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Type
 from crewai import Task, Agent
+from pydantic import BaseModel
+
+# 结构化输出：开启后任务声明了输出模型时附加 crewai 的 output_pydantic。默认关闭：
+# 输出无法直接按模型解析时 crewai 会直接调用 LLM 转换，绕过 LLM 注册表的限流、缓存和指标；
+# 关闭时输出模型只用于 parse_json_output 的容错解析和校验
+STRUCTURED_OUTPUT_ENABLED = os.getenv("STRUCTURED_OUTPUT_ENABLED", "false").lower() == "true"
 
 class BaseTaskFactory(ABC):
     """Task工厂基类 - 定义task创建的统一接口"""
     
+    # 任务输出模型（见 output_models），为 None 时任务输出自由文本
+    output_model: Optional[Type[BaseModel]] = None
+    
     @abstractmethod
     def create_task(self, agent: Agent, **kwargs) -> Task:
         """创建具体的任务"""
         pass
     
+    def _create_task(self, **kwargs) -> Task:
+        """创建 Task，开启结构化输出时附加输出模型"""
+        if STRUCTURED_OUTPUT_ENABLED and self.output_model is not None:
+            kwargs.setdefault('output_pydantic', self.output_model)
+        return Task(**kwargs)
+    
     def _format_description(self, template: str, **kwargs) -> str:
         """格式化任务描述"""
         try:
@@ -1,9 +1,12 @@
 from crewai import Task, Agent
 from .base_task_factory import BaseTaskFactory
+from .output_models import InputClassificationOutput, PatternExtractionOutput
 
 class InputClassificationTaskFactory(BaseTaskFactory):
     """输入分类任务工厂"""
     
+    output_model = InputClassificationOutput
+    
     def create_task(self, agent: Agent, input_text: str, **kwargs) -> Task:
         """创建输入分类任务"""
         self._validate_required_params(['input_text'], {'input_text': input_text})
@@ -41,7 +44,7 @@ class InputClassificationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含输入类型、置信度、提取数据和判断理由的JSON对象",
             agent=agent
@@ -50,6 +53,8 @@ class InputClassificationTaskFactory(BaseTaskFactory):
 class PatternExtractionTaskFactory(BaseTaskFactory):
     """模式提取任务工厂"""
     
+    output_model = PatternExtractionOutput
+    
     def create_task(self, agent: Agent, input_text: str, target_patterns: list = None, **kwargs) -> Task:
         """创建模式提取任务"""
         self._validate_required_params(['input_text'], {'input_text': input_text})
@@ -94,7 +99,7 @@ class PatternExtractionTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含提取模式、置信度评分和提取摘要的JSON对象",
             agent=agent
@@ -1,3 +1,4 @@
+import os
 from typing import Callable, List, Dict, Any
 from crewai.tasks.conditional_task import ConditionalTask
 from crewai.tasks.task_output import TaskOutput
@@ -5,6 +6,11 @@ from crewai import Agent
 
 from .task_registry import TaskRegistry
 
+# 任务执行策略默认值：单个任务的截止时间（含重试）、失败重试次数和首次重试的退避时间
+TASK_DEFAULT_TIMEOUT_SECONDS = float(os.getenv("TASK_DEFAULT_TIMEOUT_SECONDS", "300"))
+TASK_MAX_RETRIES = int(os.getenv("TASK_MAX_RETRIES", "2"))
+TASK_RETRY_BACKOFF_SECONDS = float(os.getenv("TASK_RETRY_BACKOFF_SECONDS", "1.0"))
+
 class ConditionalTaskFactory:
     """条件任务工厂 - 创建基于条件执行的任务"""
     
@@ -132,19 +138,73 @@ class ConditionalTaskFactory:
 class ParallelTaskCoordinator:
     """并行任务协调器"""
     
+    # 按任务类型覆盖的截止时间（秒），未列出的任务使用 TASK_DEFAULT_TIMEOUT_SECONDS
+    # 单步提取类任务输出短，截止时间较短；日志搜索依赖外部工具，综合分析输入最长
+    TASK_TIMEOUTS: Dict[str, float] = {
+        'alert_triage': 120,
+        'alert_component_identification': 120,
+        'alert_log_search_params': 120,
+        'alert_business_impact': 180,
+        'jira_basic_info': 120,
+        'jira_categorization': 120,
+        'jira_components_analysis': 180,
+        'jira_context_enrichment': 180,
+        'log_search_execution': 180,
+        'log_pattern_analysis': 180,
+        'log_anomaly_detection': 180,
+        'log_correlation_analysis': 180,
+    }
+    
+    # 任务优先级：时间预算不足时先跳过 low，再跳过 medium；critical（最终报告）不会被跳过
+    TASK_PRIORITIES: Dict[str, str] = {
+        'alert_triage': 'high',
+        'alert_component_identification': 'high',
+        'alert_log_search_params': 'high',
+        'alert_business_impact': 'low',
+        'jira_basic_info': 'high',
+        'jira_categorization': 'medium',
+        'jira_components_analysis': 'low',
+        'jira_context_enrichment': 'low',
+        'log_search_execution': 'high',
+        'log_pattern_analysis': 'high',
+        'log_anomaly_detection': 'medium',
+        'log_correlation_analysis': 'low',
+        'timeline_reconstruction': 'high',
+        'root_cause_hypothesis': 'high',
+        'hypothesis_validation': 'medium',
+        'solution_architecture': 'medium',
+        'comprehensive_report': 'critical',
+        'fast_synthesis': 'critical',
+    }
+    
+    @staticmethod
+    def get_task_priority(task_type: str) -> str:
+        """获取任务优先级，未列出的任务为 medium"""
+        return ParallelTaskCoordinator.TASK_PRIORITIES.get(task_type, 'medium')
+    
+    @staticmethod
+    def get_task_policy(task_type: str) -> Dict[str, Any]:
+        """获取任务的执行策略：timeout 为整个任务（含重试）的截止时间，retry_count 为失败后的最大重试次数"""
+        return {
+            'timeout': ParallelTaskCoordinator.TASK_TIMEOUTS.get(task_type, TASK_DEFAULT_TIMEOUT_SECONDS),
+            'retry_count': TASK_MAX_RETRIES,
+            'retry_backoff': TASK_RETRY_BACKOFF_SECONDS
+        }
+    
     @staticmethod
     def create_parallel_analysis_group(task_configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """创建并行分析任务组"""
         parallel_tasks = []
         
         for config in task_configs:
+            policy = ParallelTaskCoordinator.get_task_policy(config['task_type'])
             task_info = {
                 'task_type': config['task_type'],
                 'agent': config['agent'],
                 'parameters': config.get('parameters', {}),
-                'priority': config.get('priority', 'normal'),
-                'timeout': config.get('timeout', 300),  # 5分钟默认超时
-                'retry_count': config.get('retry_count', 2)
+                'priority': config.get('priority', ParallelTaskCoordinator.get_task_priority(config['task_type'])),
+                'timeout': config.get('timeout', policy['timeout']),
+                'retry_count': config.get('retry_count', policy['retry_count'])
             }
             parallel_tasks.append(task_info)
         
@@ -246,10 +306,68 @@ class TaskDependencyManager:
             'root_cause_hypothesis': ['timeline_reconstruction'],
             'hypothesis_validation': ['root_cause_hypothesis'],
             'solution_architecture': ['hypothesis_validation'],
-            'comprehensive_report': ['solution_architecture']
+            'comprehensive_report': ['solution_architecture'],
+            'fast_synthesis': ['alert_triage', 'jira_basic_info', 'log_pattern_analysis']
         }
         return dependencies
     
+    @staticmethod
+    def define_task_inputs() -> Dict[str, Dict[str, List[str]]]:
+        """定义每个任务的必要输入及其来源
+        
+        来源格式：
+        - 'state:<字段路径>'：DiagnosisState 中的非空字段，如 'state:log_search_params.target_applications'
+        - 'task:<任务类型>'：上游任务的成功结果
+        - 'task:*'：任意其他任务的成功结果
+        任一来源可用即视为输入已满足；未列出的任务没有必要输入。
+        """
+        return {
+            # 分类任务已在分类阶段处理，没有可用的 agent
+            'input_classification': {'classification': []},
+            'pattern_extraction': {'classification': []},
+            
+            # 告警分析任务
+            'alert_triage': {'alert_text': ['state:input_text']},
+            'alert_component_identification': {'alert_text': ['state:input_text']},
+            'alert_log_search_params': {'alert_info': ['state:input_text']},
+            'alert_business_impact': {'alert_text': ['state:input_text']},
+            
+            # Jira分析任务
+            'jira_basic_info': {'issue_key': ['state:jira_issues']},
+            'jira_categorization': {'issue_content': ['task:jira_basic_info']},
+            'jira_components_analysis': {'issue_content': ['task:jira_basic_info']},
+            'jira_context_enrichment': {'issue_info': ['task:jira_basic_info']},
+            
+            # 日志分析任务
+            'log_search_execution': {
+                'applications': ['task:alert_log_search_params', 'state:log_search_params.target_applications']
+            },
+            'log_pattern_analysis': {'log_entries': ['task:log_search_execution']},
+            'log_anomaly_detection': {'log_entries': ['task:log_search_execution']},
+            'log_correlation_analysis': {'log_entries': ['task:log_search_execution']},
+            
+            # 综合分析任务
+            'timeline_reconstruction': {
+                'all_data': ['task:alert_triage', 'task:jira_basic_info', 'task:log_pattern_analysis']
+            },
+            'root_cause_hypothesis': {'timeline': ['task:timeline_reconstruction']},
+            'hypothesis_validation': {'hypotheses': ['task:root_cause_hypothesis']},
+            'solution_architecture': {'validated_root_cause': ['task:hypothesis_validation']},
+            # 最终报告在没有任何分析结果时基于原始输入生成
+            'comprehensive_report': {'all_analysis_results': ['task:*', 'state:input_text']},
+            'fast_synthesis': {'all_analysis_results': ['task:*', 'state:input_text']}
+        }
+    
+    @staticmethod
+    def get_task_dependencies(task_list: List[str]) -> Dict[str, List[str]]:
+        """获取任务列表内部的依赖关系（不在列表中的依赖视为已满足）"""
+        dependencies = TaskDependencyManager.define_task_dependencies()
+        task_set = set(task_list)
+        return {
+            task: [dep for dep in dependencies.get(task, []) if dep in task_set]
+            for task in task_list
+        }
+    
     @staticmethod
     def get_task_execution_order(task_list: List[str]) -> List[List[str]]:
         """根据依赖关系计算任务执行顺序（返回可并行执行的任务组）"""
@@ -1,10 +1,18 @@
 from crewai import Task, Agent
 from typing import Dict, Any
 from .base_task_factory import BaseTaskFactory
+from .output_models import (
+    JiraIssueBasicInfoOutput,
+    JiraCategorizationOutput,
+    JiraComponentsAnalysisOutput,
+    JiraContextEnrichmentOutput
+)
 
 class JiraIssueBasicInfoExtractionTaskFactory(BaseTaskFactory):
     """Jira工单基础信息提取任务工厂 - 只提取基本信息"""
     
+    output_model = JiraIssueBasicInfoOutput
+    
     def create_task(self, agent: Agent, issue_key: str, **kwargs) -> Task:
         self._validate_required_params(['issue_key'], {'issue_key': issue_key})
         
@@ -30,7 +38,7 @@ Issue Key: {issue_key}
 - 如果某些字段为空，请明确标示为null
 - 包含数据获取的状态（成功/失败）"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含工单完整基础信息的JSON对象，格式规范且易于解析",
             agent=agent
@@ -39,6 +47,8 @@ Issue Key: {issue_key}
 class JiraIssueCategorizationTaskFactory(BaseTaskFactory):
     """Jira工单分类任务工厂 - 只做问题分类"""
     
+    output_model = JiraCategorizationOutput
+    
     def create_task(self, agent: Agent, issue_content: str, **kwargs) -> Task:
         self._validate_required_params(['issue_content'], {'issue_content': issue_content})
         
@@ -102,7 +112,7 @@ class JiraIssueCategorizationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含技术类别、业务领域、紧急程度、复杂度和影响范围的JSON对象",
             agent=agent
@@ -111,6 +121,8 @@ class JiraIssueCategorizationTaskFactory(BaseTaskFactory):
 class JiraRelatedComponentsAnalysisTaskFactory(BaseTaskFactory):
     """Jira相关组件分析任务工厂 - 只分析技术组件"""
     
+    output_model = JiraComponentsAnalysisOutput
+    
     def create_task(self, agent: Agent, issue_content: str, **kwargs) -> Task:
         self._validate_required_params(['issue_content'], {'issue_content': issue_content})
         
@@ -196,7 +208,7 @@ class JiraRelatedComponentsAnalysisTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含服务、数据库、API、依赖和日志目标的详细技术组件分析JSON对象",
             agent=agent
@@ -205,6 +217,8 @@ class JiraRelatedComponentsAnalysisTaskFactory(BaseTaskFactory):
 class JiraContextEnrichmentTaskFactory(BaseTaskFactory):
     """Jira上下文富化任务工厂 - 收集相关上下文信息"""
     
+    output_model = JiraContextEnrichmentOutput
+    
     def create_task(self, agent: Agent, issue_info: Dict[str, Any], components: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['issue_info', 'components'], {
             'issue_info': issue_info,
@@ -291,7 +305,7 @@ class JiraContextEnrichmentTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含关联工单、历史上下文、环境信息和利益相关者的完整上下文JSON对象",
             agent=agent
@@ -1,10 +1,18 @@
 from crewai import Task, Agent
 from typing import List, Dict, Any
 from .base_task_factory import BaseTaskFactory
+from .output_models import (
+    LogSearchExecutionOutput,
+    LogPatternAnalysisOutput,
+    LogAnomalyDetectionOutput,
+    LogCorrelationAnalysisOutput
+)
 
 class LogSearchExecutionTaskFactory(BaseTaskFactory):
     """日志搜索执行任务工厂 - 只执行搜索"""
     
+    output_model = LogSearchExecutionOutput
+    
     def create_task(self, agent: Agent, applications: List[str], query: str, 
                    time_range: str = "1h", **kwargs) -> Task:
         self._validate_required_params(['applications', 'query'], {
@@ -51,7 +59,7 @@ class LogSearchExecutionTaskFactory(BaseTaskFactory):
 - 搜索执行时间
 - 任何错误信息"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含搜索状态、命中数量和日志条目的原始搜索结果",
             agent=agent
@@ -60,6 +68,8 @@ class LogSearchExecutionTaskFactory(BaseTaskFactory):
 class LogPatternAnalysisTaskFactory(BaseTaskFactory):
     """日志模式分析任务工厂 - 只做模式分析"""
     
+    output_model = LogPatternAnalysisOutput
+    
     def create_task(self, agent: Agent, log_entries: str, **kwargs) -> Task:
         self._validate_required_params(['log_entries'], {'log_entries': log_entries})
         
@@ -135,7 +145,7 @@ class LogPatternAnalysisTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含错误模式、时间分布、关联分析和异常指标的详细JSON对象",
             agent=agent
@@ -144,6 +154,8 @@ class LogPatternAnalysisTaskFactory(BaseTaskFactory):
 class LogAnomalyDetectionTaskFactory(BaseTaskFactory):
     """日志异常检测任务工厂 - 专门检测异常"""
     
+    output_model = LogAnomalyDetectionOutput
+    
     def create_task(self, agent: Agent, log_entries: str, baseline_info: Dict[str, Any] = None, **kwargs) -> Task:
         self._validate_required_params(['log_entries'], {'log_entries': log_entries})
         
@@ -220,7 +232,7 @@ class LogAnomalyDetectionTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含异常检测结果、频率分析、内容异常和风险评估的JSON对象",
             agent=agent
@@ -229,6 +241,8 @@ class LogAnomalyDetectionTaskFactory(BaseTaskFactory):
 class LogCorrelationAnalysisTaskFactory(BaseTaskFactory):
     """日志关联分析任务工厂 - 分析日志关联性"""
     
+    output_model = LogCorrelationAnalysisOutput
+    
     def create_task(self, agent: Agent, log_entries: str, multiple_sources: bool = False, **kwargs) -> Task:
         self._validate_required_params(['log_entries'], {'log_entries': log_entries})
         
@@ -318,7 +332,7 @@ class LogCorrelationAnalysisTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含关联链条、请求追踪、时间关联和跨服务影响的详细JSON对象",
             agent=agent
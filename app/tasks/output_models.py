@@ -0,0 +1,185 @@
+"""任务输出模型
+
+每个任务工厂通过 output_model 声明输出结构，用于解析后的结果校验，
+开启 STRUCTURED_OUTPUT_ENABLED 时也用于 crewai 的结构化输出（output_pydantic）。字段均可缺省并允许额外字段：只规范已声明字段的类型，
+不会因为 LLM 多写或少写字段而丢弃结果，也避免校验失败触发额外的转换调用。
+"""
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class TaskOutput(BaseModel):
+    """任务输出模型基类"""
+    model_config = ConfigDict(extra="allow")
+
+
+# 分类任务
+class InputClassificationOutput(TaskOutput):
+    input_type: Optional[str] = None
+    confidence: Optional[float] = None
+    extracted_data: Optional[Dict[str, Any]] = None
+    reasoning: Optional[str] = None
+
+
+class PatternExtractionOutput(TaskOutput):
+    extracted_patterns: Optional[Dict[str, Any]] = None
+    confidence_scores: Optional[Dict[str, Any]] = None
+    extraction_summary: Optional[str] = None
+
+
+# 告警分析任务
+class AlertTriageOutput(TaskOutput):
+    severity: Optional[str] = None
+    alert_type: Optional[str] = None
+    urgency_level: Optional[str] = None
+    reasoning: Optional[str] = None
+    confidence: Optional[float] = None
+
+
+class AlertComponentIdentificationOutput(TaskOutput):
+    primary_components: Optional[List[Any]] = None
+    secondary_components: Optional[List[Any]] = None
+    affected_systems: Optional[List[Any]] = None
+    versions_info: Optional[Dict[str, Any]] = None
+    dependency_map: Optional[Dict[str, Any]] = None
+    confidence_score: Optional[float] = None
+
+
+class AlertLogSearchParametersOutput(TaskOutput):
+    applications: Optional[List[str]] = None
+    search_queries: Optional[List[Any]] = None
+    time_range: Optional[str] = None
+    search_strategy: Optional[Dict[str, Any]] = None
+    expected_patterns: Optional[List[Any]] = None
+
+
+class AlertBusinessImpactOutput(TaskOutput):
+    user_impact: Optional[Dict[str, Any]] = None
+    service_availability: Optional[Dict[str, Any]] = None
+    data_risk: Optional[Dict[str, Any]] = None
+    financial_impact: Optional[Dict[str, Any]] = None
+    recovery_urgency: Optional[str] = None
+    stakeholder_notification: Optional[List[Any]] = None
+
+
+# Jira分析任务
+class JiraIssueBasicInfoOutput(TaskOutput):
+    issue_key: Optional[str] = None
+    summary: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    issue_type: Optional[str] = None
+    created: Optional[str] = None
+    updated: Optional[str] = None
+    reporter: Optional[str] = None
+    assignee: Optional[str] = None
+    components: Optional[List[Any]] = None
+    fix_versions: Optional[List[Any]] = None
+
+
+class JiraCategorizationOutput(TaskOutput):
+    technical_category: Optional[str] = None
+    business_domain: Optional[str] = None
+    urgency: Optional[str] = None
+    complexity: Optional[Dict[str, Any]] = None
+    impact_scope: Optional[Dict[str, Any]] = None
+    classification_confidence: Optional[float] = None
+    reasoning: Optional[str] = None
+
+
+class JiraComponentsAnalysisOutput(TaskOutput):
+    services: Optional[List[Any]] = None
+    databases: Optional[List[Any]] = None
+    apis: Optional[List[Any]] = None
+    dependencies: Optional[List[Any]] = None
+    infrastructure: Optional[List[Any]] = None
+    log_targets: Optional[List[Any]] = None
+    analysis_confidence: Optional[float] = None
+
+
+class JiraContextEnrichmentOutput(TaskOutput):
+    related_issues: Optional[List[Any]] = None
+    historical_context: Optional[Dict[str, Any]] = None
+    environment_info: Optional[Dict[str, Any]] = None
+    stakeholder_context: Optional[Dict[str, Any]] = None
+    timeline_context: Optional[Dict[str, Any]] = None
+    external_references: Optional[Dict[str, Any]] = None
+
+
+# 日志分析任务
+class LogSearchExecutionOutput(TaskOutput):
+    status: Optional[str] = None
+    total_hits: Optional[int] = None
+    log_entries: Optional[List[Any]] = None
+    execution_time: Optional[str] = None
+    error: Optional[str] = None
+
+
+class LogPatternAnalysisOutput(TaskOutput):
+    error_patterns: Optional[List[Any]] = None
+    time_distribution: Optional[Dict[str, Any]] = None
+    severity_distribution: Optional[Dict[str, Any]] = None
+    correlation_analysis: Optional[List[Any]] = None
+    anomaly_indicators: Optional[Dict[str, Any]] = None
+    analysis_summary: Optional[str] = None
+
+
+class LogAnomalyDetectionOutput(TaskOutput):
+    anomalies_detected: Optional[List[Any]] = None
+    frequency_analysis: Optional[Dict[str, Any]] = None
+    content_anomalies: Optional[Dict[str, Any]] = None
+    timing_anomalies: Optional[Dict[str, Any]] = None
+    risk_assessment: Optional[Dict[str, Any]] = None
+
+
+class LogCorrelationAnalysisOutput(TaskOutput):
+    correlation_chains: Optional[List[Any]] = None
+    request_traces: Optional[List[Any]] = None
+    temporal_correlations: Optional[Dict[str, Any]] = None
+    cross_service_impacts: Optional[Dict[str, Any]] = None
+    correlation_summary: Optional[str] = None
+
+
+# 综合分析任务
+class TimelineReconstructionOutput(TaskOutput):
+    timeline: Optional[List[Any]] = None
+    timeline_analysis: Optional[Dict[str, Any]] = None
+    event_clusters: Optional[List[Any]] = None
+    causality_analysis: Optional[Dict[str, Any]] = None
+    timeline_confidence: Optional[float] = None
+    data_gaps: Optional[List[Any]] = None
+
+
+class RootCauseHypothesisOutput(TaskOutput):
+    hypotheses: Optional[List[Any]] = None
+    hypothesis_ranking: Optional[List[Any]] = None
+    excluded_hypotheses: Optional[List[Any]] = None
+    investigation_roadmap: Optional[Dict[str, Any]] = None
+    confidence_assessment: Optional[Dict[str, Any]] = None
+
+
+class HypothesisValidationOutput(TaskOutput):
+    validation_results: Optional[List[Any]] = None
+    cross_validation: Optional[Dict[str, Any]] = None
+    evidence_analysis: Optional[Dict[str, Any]] = None
+    updated_probabilities: Optional[List[Any]] = None
+    validation_summary: Optional[Dict[str, Any]] = None
+
+
+class SolutionArchitectureOutput(TaskOutput):
+    immediate_actions: Optional[List[Any]] = None
+    short_term_solutions: Optional[List[Any]] = None
+    long_term_improvements: Optional[List[Any]] = None
+    prevention_measures: Optional[List[Any]] = None
+    implementation_roadmap: Optional[Dict[str, Any]] = None
+    risk_assessment: Optional[Dict[str, Any]] = None
+
+
+class FastSynthesisOutput(TaskOutput):
+    timeline: Optional[List[Any]] = None
+    hypotheses: Optional[List[Any]] = None
+    validation: Optional[Dict[str, Any]] = None
+    solutions: Optional[Dict[str, Any]] = None
+    report: Optional[str] = None
@@ -0,0 +1,230 @@
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..metrics import PROMPT_SECTIONS_CUT
+
+logger = logging.getLogger(__name__)
+
+# 综合分析任务中嵌入的分析数据的 token 预算（不含任务说明和输出格式）
+SYNTHESIS_PROMPT_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_PROMPT_TOKEN_BUDGET", "12000"))
+# 超出预算时单个段落压缩后至少保留的 token 数，预算仍不足时按优先级整段省略
+SECTION_MIN_TOKENS = 150
+
+# 分析结果作为段落时的优先级，数值越小越重要、越晚被压缩
+# 原始日志条目体积最大，且已由日志模式和异常分析总结，最先压缩
+RESULT_PRIORITIES: Dict[str, int] = {
+    'hypothesis_validation': 10,
+    'root_cause_hypothesis': 10,
+    'timeline_reconstruction': 20,
+    'solution_architecture': 20,
+    'alert_triage': 20,
+    'jira_basic_info': 20,
+    'jira_categorization': 30,
+    'alert_component_identification': 30,
+    'log_pattern_analysis': 30,
+    'log_anomaly_detection': 30,
+    'jira_components_analysis': 40,
+    'log_correlation_analysis': 40,
+    'alert_business_impact': 50,
+    'jira_context_enrichment': 50,
+    'alert_log_search_params': 60,
+    'log_search_execution': 70,
+}
+DEFAULT_RESULT_PRIORITY = 50
+
+# 结构化压缩的级别：(列表最多保留的元素数, 字符串最多保留的字符数)
+_SHRINK_LEVELS = ((20, 2000), (10, 800), (5, 300), (3, 120))
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """加载 tiktoken 编码，tiktoken 不可用（未安装或无法下载编码文件）时返回 None"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.info(f"tiktoken 不可用，按字符估算 token 数: {e}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数；没有 tiktoken 时按中文每字 1 个、其他每 4 个字符 1 个估算"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk_chars = sum(1 for char in text if '一' <= char <= '鿿')
+    return cjk_chars + (len(text) - cjk_chars + 3) // 4
+
+
+def _serialize(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+def _shrink(value: Any, max_items: int, max_chars: int) -> Any:
+    """结构化压缩：截短长列表和长字符串，保留字段结构"""
+    if isinstance(value, dict):
+        return {key: _shrink(item, max_items, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_shrink(item, max_items, max_chars) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"...（省略其余 {len(value) - max_items} 项）")
+        return items
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + f"...（截断，原 {len(value)} 字符）"
+    return value
+
+
+class _Section:
+    def __init__(self, name: str, content: Any, priority: int):
+        self.name = name
+        self.content = content
+        self.priority = priority
+        self.text = _serialize(content)
+        self.tokens = count_tokens(self.text)
+        self.original_tokens = self.tokens
+        self.action: Optional[str] = None
+
+
+class PromptAssembler:
+    """按 token 预算组装任务提示词中的数据段落
+
+    各段落按优先级（数值越小越重要）参与预算：总量超出预算时，从最不重要的段落开始
+    先结构化压缩（截短列表和长字符串），仍超出时按 token 比例截断，压缩到下限仍不够时整段省略。
+    被压缩的段落记录在 cuts 中，并上报到当前线程的 track_prompt_cuts。
+    """
+
+    def __init__(self, task_type: str, token_budget: int = SYNTHESIS_PROMPT_TOKEN_BUDGET):
+        self.task_type = task_type
+        self.token_budget = token_budget
+        self.cuts: List[Dict[str, Any]] = []
+        self._sections: Dict[str, _Section] = {}
+        self._assembled = False
+
+    def add_section(self, name: str, content: Any, priority: int = DEFAULT_RESULT_PRIORITY):
+        """添加一个数据段落"""
+        self._sections[name] = _Section(name, content, priority)
+        self._assembled = False
+
+    def add_results(self, results: Dict[str, Any]):
+        """把各任务的分析结果分别作为段落添加，优先级见 RESULT_PRIORITIES"""
+        for task_type, result_data in (results or {}).items():
+            self.add_section(task_type, result_data, RESULT_PRIORITIES.get(task_type, DEFAULT_RESULT_PRIORITY))
+
+    def text(self, name: str) -> str:
+        """获取预算内的段落文本"""
+        self._assemble()
+        section = self._sections[name]
+        if section.action == "omitted":
+            return "（因提示词长度限制已省略）"
+        return section.text
+
+    def join(self, names: List[str]) -> str:
+        """把多个段落按名称拼接，省略的段落在末尾列出"""
+        self._assemble()
+        lines = []
+        omitted = []
+        for name in names:
+            section = self._sections[name]
+            if section.action == "omitted":
+                omitted.append(name)
+            else:
+                lines.append(f"【{name}】\n{section.text}")
+        if omitted:
+            lines.append(f"以下结果因提示词长度限制已省略: {', '.join(omitted)}")
+        return "\n\n".join(lines) if lines else "无"
+
+    def _assemble(self):
+        if self._assembled:
+            return
+        self._assembled = True
+        total = sum(section.tokens for section in self._sections.values())
+        if total <= self.token_budget:
+            return
+
+        # 从最不重要的段落开始压缩，同优先级先压缩体积大的
+        order = sorted(self._sections.values(), key=lambda section: (-section.priority, -section.tokens))
+        for section in order:
+            excess = total - self.token_budget
+            if excess <= 0:
+                break
+            target = max(section.tokens - excess, min(section.tokens, SECTION_MIN_TOKENS))
+            if target < section.tokens:
+                total -= section.tokens
+                self._compress(section, target)
+                total += section.tokens
+
+        # 所有段落压缩到下限仍超出预算时，按优先级整段省略
+        for section in order:
+            if total <= self.token_budget:
+                break
+            total -= section.tokens
+            section.text, section.tokens, section.action = "", 0, "omitted"
+
+        for section in self._sections.values():
+            if section.action:
+                self._record_cut(section)
+        logger.warning(f"任务 {self.task_type} 的提示词数据超出 {self.token_budget} tokens 预算，已压缩: "
+                       f"{[(cut['section'], cut['action']) for cut in self.cuts]}")
+
+    @staticmethod
+    def _compress(section: _Section, target_tokens: int):
+        """把段落压缩到 target_tokens 以内：先结构化压缩，仍超出时按比例截断文本"""
+        if not isinstance(section.content, str):
+            for max_items, max_chars in _SHRINK_LEVELS:
+                text = _serialize(_shrink(section.content, max_items, max_chars))
+                tokens = count_tokens(text)
+                if tokens <= target_tokens:
+                    section.text, section.tokens, section.action = text, tokens, "summarized"
+                    return
+
+        text = section.text
+        tokens = section.tokens
+        while tokens > target_tokens and text:
+            text = text[:max(int(len(text) * target_tokens / tokens * 0.95), 0)]
+            tokens = count_tokens(text)
+        section.text = text + f"...（已截断，原约 {section.original_tokens} tokens）"
+        section.tokens = count_tokens(section.text)
+        section.action = "truncated"
+
+    def _record_cut(self, section: _Section):
+        cut = {
+            "section": section.name,
+            "action": section.action,
+            "original_tokens": section.original_tokens,
+            "kept_tokens": section.tokens
+        }
+        self.cuts.append(cut)
+        PROMPT_SECTIONS_CUT.inc(task_type=self.task_type, action=section.action)
+        cuts = getattr(_tracked, "cuts", None)
+        if cuts is not None:
+            cuts.append(cut)
+
+
+# 当前线程创建任务时记录的段落压缩情况，用于汇总到 state.metadata
+_tracked = threading.local()
+
+
+@contextmanager
+def track_prompt_cuts() -> Iterator[List[Dict[str, Any]]]:
+    """收集上下文内（当前线程）组装提示词时被压缩或省略的段落"""
+    previous = getattr(_tracked, "cuts", None)
+    cuts: List[Dict[str, Any]] = []
+    _tracked.cuts = cuts
+    try:
+        yield cuts
+    finally:
+        _tracked.cuts = previous
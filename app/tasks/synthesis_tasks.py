@@ -1,14 +1,26 @@
 from crewai import Task, Agent
 from typing import Dict, Any, List
 from .base_task_factory import BaseTaskFactory
+from .output_models import (
+    TimelineReconstructionOutput,
+    RootCauseHypothesisOutput,
+    HypothesisValidationOutput,
+    SolutionArchitectureOutput,
+    FastSynthesisOutput
+)
+from .prompt_budget import PromptAssembler
 
 class TimelineReconstructionTaskFactory(BaseTaskFactory):
     """时间线重建任务工厂 - 重建事件时间序列"""
     
+    output_model = TimelineReconstructionOutput
+    
     def create_task(self, agent: Agent, all_data: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['all_data'], {'all_data': all_data})
         
-        all_data_text = str(all_data)
+        assembler = PromptAssembler('timeline_reconstruction')
+        assembler.add_results(all_data)
+        all_data_text = assembler.join(list(all_data))
         
         json_schema = """{
     "timeline": [
@@ -82,7 +94,7 @@ class TimelineReconstructionTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="按时间排序的完整事件时间线JSON对象，包含因果分析和质量评估",
             agent=agent
@@ -91,6 +103,8 @@ class TimelineReconstructionTaskFactory(BaseTaskFactory):
 class RootCauseHypothesisGenerationTaskFactory(BaseTaskFactory):
     """根因假设生成任务工厂 - 生成根本原因假设"""
     
+    output_model = RootCauseHypothesisOutput
+    
     def create_task(self, agent: Agent, timeline: Dict[str, Any], patterns: Dict[str, Any], 
                    context: Dict[str, Any] = None, **kwargs) -> Task:
         self._validate_required_params(['timeline', 'patterns'], {
@@ -98,9 +112,13 @@ class RootCauseHypothesisGenerationTaskFactory(BaseTaskFactory):
             'patterns': patterns
         })
         
-        timeline_text = str(timeline)
-        patterns_text = str(patterns)
-        context_text = str(context) if context else "无额外上下文"
+        assembler = PromptAssembler('root_cause_hypothesis')
+        assembler.add_section('timeline', timeline, priority=0)
+        assembler.add_section('patterns', patterns, priority=10)
+        assembler.add_section('context', context or "无额外上下文", priority=30)
+        timeline_text = assembler.text('timeline')
+        patterns_text = assembler.text('patterns')
+        context_text = assembler.text('context')
         
         json_schema = """{
     "hypotheses": [
@@ -194,7 +212,7 @@ class RootCauseHypothesisGenerationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含根因假设、概率评估、证据分析和调查路线图的详细JSON对象",
             agent=agent
@@ -203,14 +221,19 @@ class RootCauseHypothesisGenerationTaskFactory(BaseTaskFactory):
 class HypothesisValidationTaskFactory(BaseTaskFactory):
     """假设验证任务工厂 - 验证根因假设"""
     
+    output_model = HypothesisValidationOutput
+    
     def create_task(self, agent: Agent, hypotheses: Dict[str, Any], available_data: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['hypotheses', 'available_data'], {
             'hypotheses': hypotheses,
             'available_data': available_data
         })
         
-        hypotheses_text = str(hypotheses)
-        data_text = str(available_data)
+        assembler = PromptAssembler('hypothesis_validation')
+        assembler.add_section('hypotheses', hypotheses, priority=0)
+        assembler.add_results(available_data)
+        hypotheses_text = assembler.text('hypotheses')
+        data_text = assembler.join(list(available_data))
         
         json_schema = """{
     "validation_results": [
@@ -301,7 +324,7 @@ class HypothesisValidationTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含验证结果、交叉验证、证据分析和更新概率的详细JSON对象",
             agent=agent
@@ -310,11 +333,16 @@ class HypothesisValidationTaskFactory(BaseTaskFactory):
 class SolutionArchitectureTaskFactory(BaseTaskFactory):
     """解决方案架构任务工厂 - 设计解决方案"""
     
+    output_model = SolutionArchitectureOutput
+    
     def create_task(self, agent: Agent, validated_root_cause: Dict[str, Any], context: Dict[str, Any], **kwargs) -> Task:
         self._validate_required_params(['validated_root_cause'], {'validated_root_cause': validated_root_cause})
         
-        root_cause_text = str(validated_root_cause)
-        context_text = str(context) if context else "无额外上下文"
+        assembler = PromptAssembler('solution_architecture')
+        assembler.add_section('validated_root_cause', validated_root_cause, priority=0)
+        assembler.add_results(context)
+        root_cause_text = assembler.text('validated_root_cause')
+        context_text = assembler.join(list(context)) if context else "无额外上下文"
         
         json_schema = """{
     "immediate_actions": [
@@ -430,7 +458,7 @@ class SolutionArchitectureTaskFactory(BaseTaskFactory):
 
 {self._build_json_output_instruction(json_schema)}"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="包含即时措施、短期方案、长期改进和实施路线图的完整解决方案JSON对象",
             agent=agent
@@ -439,15 +467,33 @@ class SolutionArchitectureTaskFactory(BaseTaskFactory):
 class ComprehensiveReportGenerationTaskFactory(BaseTaskFactory):
     """综合报告生成任务工厂 - 生成最终报告"""
     
-    def create_task(self, agent: Agent, all_analysis_results: Dict[str, Any], **kwargs) -> Task:
+    # 输出为 Markdown 报告，不使用结构化输出
+    output_model = None
+    
+    def create_task(self, agent: Agent, all_analysis_results: Dict[str, Any],
+                    skipped_analyses: Dict[str, str] = None, input_text: str = "", **kwargs) -> Task:
         self._validate_required_params(['all_analysis_results'], {'all_analysis_results': all_analysis_results})
         
-        results_text = str(all_analysis_results)
+        assembler = PromptAssembler('comprehensive_report')
+        assembler.add_results(all_analysis_results)
+        sections = list(all_analysis_results)
+        if not sections and input_text:
+            # 没有任何分析结果（如时间预算不足）时基于原始输入生成
+            assembler.add_section('原始输入', input_text, priority=0)
+            sections = ['原始输入']
+        results_text = assembler.join(sections)
+        skipped_text = ""
+        if skipped_analyses:
+            skipped_lines = "\n".join(f"- {task}: {reason}" for task, reason in skipped_analyses.items())
+            skipped_text = f"""
+
+以下分析因时间预算不足未执行，请在报告中注明，不要推测其结果：
+{skipped_lines}"""
         
         description = f"""基于所有分析结果生成综合诊断报告：
 
 所有分析结果：
-{results_text}
+{results_text}{skipped_text}
 
 请生成包含以下内容的综合报告：
 
@@ -521,8 +567,89 @@ class ComprehensiveReportGenerationTaskFactory(BaseTaskFactory):
 - 适合不同层级的读者
 - 突出关键信息和建议"""
         
-        return Task(
+        return self._create_task(
             description=description,
             expected_output="结构化的综合诊断报告，包含问题分析、根因、解决方案和实施建议",
             agent=agent
-        ) 
\ No newline at end of file
+        ) 
+
+class FastSynthesisTaskFactory(BaseTaskFactory):
+    """快速综合分析任务工厂 - 一次结构化调用完成时间线、根因假设、验证、解决方案和最终报告
+    
+    替代 timeline_reconstruction 到 comprehensive_report 的五步串行链路，分析结果只发送一次。
+    """
+    
+    output_model = FastSynthesisOutput
+    
+    def create_task(self, agent: Agent, all_analysis_results: Dict[str, Any],
+                    skipped_analyses: Dict[str, str] = None, input_text: str = "", **kwargs) -> Task:
+        self._validate_required_params(['all_analysis_results'], {'all_analysis_results': all_analysis_results})
+        
+        assembler = PromptAssembler('fast_synthesis')
+        assembler.add_results(all_analysis_results)
+        sections = list(all_analysis_results)
+        if not sections and input_text:
+            # 没有任何分析结果（如时间预算不足）时基于原始输入生成
+            assembler.add_section('原始输入', input_text, priority=0)
+            sections = ['原始输入']
+        results_text = assembler.join(sections)
+        skipped_text = ""
+        if skipped_analyses:
+            skipped_lines = "\n".join(f"- {task}: {reason}" for task, reason in skipped_analyses.items())
+            skipped_text = f"""
+
+以下分析因时间预算不足未执行，请在报告中注明，不要推测其结果：
+{skipped_lines}"""
+        
+        json_schema = """{
+    "timeline": [
+        {
+            "timestamp": "2024-01-15T14:20:00Z",
+            "event": "事件描述",
+            "source": "logs|alert|jira|monitoring",
+            "severity": "High|Medium|Low"
+        }
+    ],
+    "hypotheses": [
+        {
+            "hypothesis": "根因假设",
+            "category": "infrastructure|application|configuration|external|data",
+            "supporting_evidence": ["支持证据"],
+            "contradicting_evidence": ["反对证据"],
+            "confidence": 0.8
+        }
+    ],
+    "validation": {
+        "confirmed_root_cause": "最终确认的根本原因",
+        "confidence": 0.85,
+        "reasoning": "验证推理过程",
+        "data_gaps": ["影响结论的数据缺口"]
+    },
+    "solutions": {
+        "immediate_actions": ["立即止损措施"],
+        "short_term_fixes": ["1周内的修复方案"],
+        "long_term_prevention": ["长期预防措施"]
+    },
+    "report": "Markdown 格式的综合诊断报告"
+}"""
+        
+        description = f"""基于所有分析结果，一次性完成综合分析并生成诊断报告：
+
+所有分析结果：
+{results_text}{skipped_text}
+
+请依次完成以下步骤，并把每一步的结论写入对应字段：
+
+1. 时间线（timeline）：按时间顺序列出带时间戳的关键事件及其来源
+2. 根因假设（hypotheses）：结合时间线提出 2-4 个根因假设，列出支持和反对证据
+3. 假设验证（validation）：根据现有证据确认最可能的根本原因，说明推理过程和数据缺口
+4. 解决方案（solutions）：按即时措施、短期修复、长期预防给出可执行的方案
+5. 综合报告（report）：用 Markdown 写出报告，包含执行摘要、问题分析、根本原因、解决方案和实施建议
+
+{self._build_json_output_instruction(json_schema)}"""
+        
+        return self._create_task(
+            description=description,
+            expected_output="JSON 格式的综合分析结果，report 字段为 Markdown 综合诊断报告",
+            agent=agent
+        )
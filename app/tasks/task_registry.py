@@ -1,5 +1,6 @@
-from typing import Dict, Type, Any
+from typing import Dict, Type, Any, Optional
 from crewai import Agent, Task
+from pydantic import BaseModel
 
 from .base_task_factory import BaseTaskFactory
 from .classification_tasks import InputClassificationTaskFactory, PatternExtractionTaskFactory
@@ -26,9 +27,14 @@ from .synthesis_tasks import (
     RootCauseHypothesisGenerationTaskFactory,
     HypothesisValidationTaskFactory,
     SolutionArchitectureTaskFactory,
-    ComprehensiveReportGenerationTaskFactory
+    ComprehensiveReportGenerationTaskFactory,
+    FastSynthesisTaskFactory
 )
 
+class TaskCreationError(ValueError):
+    """任务创建失败（未知任务类型或任务工厂出错），重试不会改变结果"""
+
+
 class TaskRegistry:
     """精细化任务注册表 - 统一管理所有task工厂"""
     
@@ -61,6 +67,7 @@ class TaskRegistry:
         'hypothesis_validation': HypothesisValidationTaskFactory,
         'solution_architecture': SolutionArchitectureTaskFactory,
         'comprehensive_report': ComprehensiveReportGenerationTaskFactory,
+        'fast_synthesis': FastSynthesisTaskFactory,
     }
     
     @classmethod
@@ -70,14 +77,20 @@ class TaskRegistry:
             raise ValueError(f"Unknown task type: {task_type}. Available types: {list(cls._factories.keys())}")
         return cls._factories[task_type]()
     
+    @classmethod
+    def get_output_model(cls, task_type: str) -> Optional[Type[BaseModel]]:
+        """获取任务声明的输出模型，未知任务或输出为自由文本时返回 None"""
+        factory = cls._factories.get(task_type)
+        return factory.output_model if factory else None
+    
     @classmethod
     def create_task(cls, task_type: str, agent: Agent, **kwargs) -> Task:
         """创建任务实例"""
-        factory = cls.get_factory(task_type)
         try:
+            factory = cls.get_factory(task_type)
             return factory.create_task(agent, **kwargs)
         except Exception as e:
-            raise ValueError(f"Failed to create task '{task_type}': {e}")
+            raise TaskCreationError(f"Failed to create task '{task_type}': {e}") from e
     
     @classmethod
     def get_available_task_types(cls) -> list:
@@ -112,7 +125,8 @@ class TaskRegistry:
                 'root_cause_hypothesis',
                 'hypothesis_validation',
                 'solution_architecture',
-                'comprehensive_report'
+                'comprehensive_report',
+                'fast_synthesis'
             ]
         }
         return categories
@@ -128,8 +142,8 @@ class TaskRegistry:
 class WorkflowTemplates:
     """预定义的工作流模板"""
     
+    # 分类（input_classification）在 Flow 的分类阶段完成，不包含在工作流模板中
     ALERT_WORKFLOW = [
-        'input_classification',
         'alert_triage',
         'alert_component_identification', 
         'alert_log_search_params',
@@ -144,7 +158,6 @@ class WorkflowTemplates:
     ]
     
     JIRA_WORKFLOW = [
-        'input_classification',
         'jira_basic_info',
         'jira_categorization',
         'jira_components_analysis',
@@ -157,7 +170,6 @@ class WorkflowTemplates:
     ]
     
     LOG_WORKFLOW = [
-        'input_classification',
         'log_search_execution',
         'log_pattern_analysis',
         'log_anomaly_detection',
@@ -170,7 +182,6 @@ class WorkflowTemplates:
     ]
     
     HYBRID_WORKFLOW = [
-        'input_classification',
         # 并行执行多种分析
         'alert_triage',
         'jira_basic_info',
@@ -187,9 +198,25 @@ class WorkflowTemplates:
         'comprehensive_report'
     ]
     
+    # 完整模式下的五步串行综合分析链路，快速模式下替换为一次 fast_synthesis 调用
+    SYNTHESIS_TASKS = [
+        'timeline_reconstruction',
+        'root_cause_hypothesis',
+        'hypothesis_validation',
+        'solution_architecture',
+        'comprehensive_report'
+    ]
+    
+    @classmethod
+    def get_workflow_for_input_type(cls, input_type: str, synthesis_mode: str = "full") -> list:
+        """根据输入类型获取推荐的工作流，synthesis_mode 为 full（五步综合分析）或 fast（单次快速综合分析）"""
+        workflow = cls._get_base_workflow(input_type)
+        if synthesis_mode == "fast":
+            return [task for task in workflow if task not in cls.SYNTHESIS_TASKS] + ['fast_synthesis']
+        return workflow
+    
     @classmethod
-    def get_workflow_for_input_type(cls, input_type: str) -> list:
-        """根据输入类型获取推荐的工作流"""
+    def _get_base_workflow(cls, input_type: str) -> list:
         workflow_map = {
             'alert': cls.ALERT_WORKFLOW,
             'jira_issue': cls.JIRA_WORKFLOW,
@@ -1,9 +1,23 @@
-from .jira_search_tool import JiraSearchTool
-from .log_search_tool import LogSearchTool
+"""工具包 - 工具类和 all_tools 在首次访问时才导入和实例化
 
-all_tools = [
-    JiraSearchTool(),
-    LogSearchTool(),
-]
+工具依赖 crewai 和 jira 等较重的库，放在导入路径之外以缩短 API 进程的启动时间。
+"""
+import importlib
 
-__all__ = ["all_tools"]
+_TOOL_MODULES = {
+    "JiraSearchTool": ".jira_search_tool",
+    "LogSearchTool": ".log_search_tool",
+}
+
+
+def __getattr__(name):
+    if name in _TOOL_MODULES:
+        return getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
+    if name == "all_tools":
+        all_tools = [cls() for cls in (__getattr__("JiraSearchTool"), __getattr__("LogSearchTool"))]
+        globals()["all_tools"] = all_tools
+        return all_tools
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["all_tools", "JiraSearchTool", "LogSearchTool"]
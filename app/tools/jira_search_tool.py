@@ -4,6 +4,8 @@ from jira import JIRA
 from typing import Type
 from pydantic import BaseModel, Field
 
+from ..metrics import TOOL_CALL_DURATION
+
 class JiraSearchSchema(BaseModel):
     issue_key: str = Field(description="The Jira issue key, e.g. PROJ-123")
 
@@ -13,6 +15,13 @@ class JiraSearchTool(BaseTool):
     args_schema: Type[BaseModel] = JiraSearchSchema
 
     def _run(self, issue_key: str):
+        with TOOL_CALL_DURATION.time(tool=self.name, status="success") as labels:
+            result = self._fetch_issue(issue_key)
+            if isinstance(result, str):
+                labels["status"] = "error"
+            return result
+
+    def _fetch_issue(self, issue_key: str):
         try:
             jira_server = os.getenv("JIRA_SERVER")
             jira_access_token = os.getenv("JIRA_ACCESS_TOKEN")
@@ -6,6 +6,8 @@ from typing import Type, List
 from pydantic import BaseModel, Field
 import datetime
 
+from ..metrics import TOOL_CALL_DURATION
+
 class LogSearchSchema(BaseModel):
     applications: List[str] = Field(description="List of application names to search in")
     query: str = Field(description="Search query string")
@@ -18,6 +20,13 @@ class LogSearchTool(BaseTool):
     args_schema: Type[BaseModel] = LogSearchSchema
 
     def _run(self, applications: List[str], query: str, start_time: str, end_time: str):
+        with TOOL_CALL_DURATION.time(tool=self.name, status="success") as labels:
+            result = self._search_logs(applications, query, start_time, end_time)
+            if isinstance(result, str):
+                labels["status"] = "error"
+            return result
+
+    def _search_logs(self, applications: List[str], query: str, start_time: str, end_time: str):
         log_search_api_host = os.getenv("LOG_SEARCH_API_HOST")
         log_search_api_key = os.getenv("LOG_SEARCH_API_KEY")
 
@@ -0,0 +1,61 @@
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from .flow_state import DiagnosisState
+from .tasks import TaskDependencyManager
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowPlanner:
+    """工作流规划器 - 执行前按任务声明的输入检查状态，移除输入缺失的任务
+
+    被移除任务的下游任务如果因此失去输入来源，也会一并移除；执行期间上游任务失败时，
+    调度器同样用 missing_inputs 判断下游任务是否还有可用输入。
+    """
+
+    def __init__(self):
+        self.task_inputs = TaskDependencyManager.define_task_inputs()
+
+    def plan(self, workflow_tasks: List[str], state: DiagnosisState) -> Tuple[List[str], Dict[str, str]]:
+        """返回 (保留的任务列表, {被移除的任务: 原因})"""
+        planned = list(workflow_tasks)
+        pruned: Dict[str, str] = {}
+
+        # 反复检查直到没有新的任务被移除，处理级联移除
+        changed = True
+        while changed:
+            changed = False
+            for task_type in list(planned):
+                missing = self.missing_inputs(task_type, state, set(planned) - {task_type})
+                if missing:
+                    planned.remove(task_type)
+                    pruned[task_type] = f"缺少输入: {', '.join(missing)}"
+                    changed = True
+
+        if pruned:
+            logger.info(f"工作流规划移除 {len(pruned)} 个任务: {pruned}")
+        return planned, pruned
+
+    def missing_inputs(self, task_type: str, state: DiagnosisState, available_tasks: Set[str]) -> List[str]:
+        """返回任务缺失的必要输入名称，available_tasks 为可提供结果的任务集合"""
+        missing = []
+        for input_name, sources in self.task_inputs.get(task_type, {}).items():
+            if not any(self._source_available(source, state, available_tasks) for source in sources):
+                missing.append(input_name)
+        return missing
+
+    @staticmethod
+    def _source_available(source: str, state: DiagnosisState, available_tasks: Set[str]) -> bool:
+        kind, _, name = source.partition(":")
+        if kind == "task":
+            return bool(available_tasks) if name == "*" else name in available_tasks
+        if kind == "state":
+            value: Any = state
+            for part in name.split("."):
+                value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+                if value is None:
+                    return False
+            return bool(value)
+        logger.warning(f"未知的输入来源: '{source}'")
+        return False
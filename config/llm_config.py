@@ -2,15 +2,63 @@
 
 """
 LLM 配置的唯一来源。
+
+可选字段：
+- temperature: 采样温度，默认 0.7
+- deterministic: 为 True 时使用 temperature 0 并开启响应缓存（LLM_CACHE_* 环境变量配置缓存），
+  各 LLM 分别通过 LLM_<名称>_DETERMINISTIC 配置，如 LLM_FAST_DETERMINISTIC
+
+模型分级：
+- fast: 分类、分级、参数生成等输出短、结构固定的任务
+- standard: 常规的组件、日志和 Jira 分析任务，以及需要可靠调用工具的任务
+- deep: 根因推理、方案设计和报告生成
+各级模型未单独配置时使用 OPENAI_MODEL；某一级未注册成功时回退到 default。
 """
 
 import os
 
-LLM_CONFIG = {
-    "default": {
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+
+
+def _openai_llm(model_name: str, deterministic_env: str) -> dict:
+    return {
         "provider": "openai",
-        "model_name": os.getenv("OPENAI_MODEL", "gpt-4-turbo"),
+        "model_name": model_name,
         "api_key_env": "OPENAI_API_KEY",
         "base_url_env": "OPENAI_BASE_URL",
-    },
-}
\ No newline at end of file
+        "deterministic": os.getenv(deterministic_env, "false").lower() == "true",
+    }
+
+
+LLM_CONFIG = {
+    "default": _openai_llm(DEFAULT_MODEL, "LLM_DEFAULT_DETERMINISTIC"),
+    "fast": _openai_llm(os.getenv("LLM_FAST_MODEL") or DEFAULT_MODEL, "LLM_FAST_DETERMINISTIC"),
+    "standard": _openai_llm(os.getenv("LLM_STANDARD_MODEL") or DEFAULT_MODEL, "LLM_STANDARD_DETERMINISTIC"),
+    "deep": _openai_llm(os.getenv("LLM_DEEP_MODEL") or DEFAULT_MODEL, "LLM_DEEP_DETERMINISTIC"),
+}
+
+# 未在 TASK_LLM_TIERS 中列出的任务使用的模型分级
+DEFAULT_LLM_TIER = "standard"
+
+# 任务类型 -> 模型分级
+TASK_LLM_TIERS = {
+    # 分类阶段
+    "input_classification": "fast",
+    "pattern_extraction": "fast",
+
+    # 分级、归类和参数生成
+    "alert_triage": "fast",
+    "alert_log_search_params": "fast",
+    "jira_categorization": "fast",
+
+    # 调用工具的任务（Jira 查询、日志搜索）需要可靠的工具调用，使用 standard
+    "jira_basic_info": "standard",
+    "log_search_execution": "standard",
+
+    # 综合推理和报告
+    "root_cause_hypothesis": "deep",
+    "hypothesis_validation": "deep",
+    "solution_architecture": "deep",
+    "comprehensive_report": "deep",
+    "fast_synthesis": "deep",
+}
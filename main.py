@@ -1,15 +1,39 @@
 import os
 import sys
+import json
 import logging
 from dotenv import load_dotenv
 
 # 加载 .env 文件
 load_dotenv()
 
-from fastapi import FastAPI, BackgroundTasks
+import time
+import uuid
+import threading
+from datetime import timedelta
+from typing import TYPE_CHECKING, List, Optional
+from concurrent.futures import Future
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from app.heimdallr_flow import HeimdallrFlow
 from app.logging_config import setup_logging
+from app.result_store import result_store, ResultStatus
+from app.flow_executor import flow_executor, FlowTimeoutError, FlowCancelledError, FlowQueueFullError
+from app.flow_coalescer import flow_coalescer
+from app.flow_checkpoint import flow_checkpoints, FlowCheckpoint
+from app.progress_events import progress_broker, ProgressEventType, format_sse, make_event
+from app.batch_analysis import BatchAnalysisPlanner
+from app.metrics import metrics_registry
+from app.report_delivery import report_delivery
+from app.seatalk_events import (
+    EventDeduplicator, is_valid_signature, extract_message_text, extract_reply_target,
+    EVENT_VERIFICATION, MESSAGE_EVENT_TYPES
+)
+
+if TYPE_CHECKING:
+    # HeimdallrFlow 依赖 crewai，导入较慢，由 Flow 执行器在后台预加载
+    from app.heimdallr_flow import HeimdallrFlow
 
 # 在应用启动时配置日志
 setup_logging()
@@ -17,6 +41,43 @@ setup_logging()
 # 获取一个日志记录器实例
 logger = logging.getLogger(__name__)
 
+# 同步分析接口的默认和最大超时时间（秒）
+SYNC_ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("SYNC_ANALYSIS_TIMEOUT_SECONDS", "120"))
+SYNC_ANALYSIS_MAX_TIMEOUT_SECONDS = float(os.getenv("SYNC_ANALYSIS_MAX_TIMEOUT_SECONDS", "300"))
+
+# 启动时是否在后台预加载 Flow 模块（crewai、LLM 注册）
+FLOW_PRELOAD_ON_STARTUP = os.getenv("FLOW_PRELOAD_ON_STARTUP", "true").lower() == "true"
+
+# SeaTalk 事件回调签名密钥
+SEATALK_SIGNING_SECRET = os.getenv("SEATALK_SIGNING_SECRET", "").encode("utf-8")
+
+# 批量分析接口单次最多接受的输入数量
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "200"))
+
+
+def agent_pool_stats() -> dict:
+    """agent 池随 Flow 模块加载，尚未加载时不触发导入"""
+    module = sys.modules.get("app.agent_pool")
+    return module.agent_pool.stats() if module else {}
+
+
+def llm_stats() -> dict:
+    """各模型分级的调用次数和平均耗时，LLM 注册表尚未加载时不触发导入"""
+    module = sys.modules.get("app.llms")
+    return module.llm_registry.stats() if module else {}
+
+
+def llm_rate_limiter_stats() -> dict:
+    """LLM 限流器状态（排队数、预计等待时间），尚未加载时不触发导入"""
+    module = sys.modules.get("app.llm_rate_limiter")
+    return module.llm_rate_limiter.stats() if module else {}
+
+
+def speculation_stats() -> dict:
+    """推测执行统计，Flow 模块尚未加载时不触发导入"""
+    module = sys.modules.get("app.speculative_execution")
+    return module.speculative_executor.stats() if module else {}
+
 
 def check_environment():
     """检查环境变量配置"""
@@ -36,9 +97,51 @@ app = FastAPI(
 )
 
 
+@app.on_event("startup")
+async def preload_flow_modules():
+    if FLOW_PRELOAD_ON_STARTUP:
+        flow_executor.preload()
+
+
+@app.on_event("startup")
+async def start_report_delivery():
+    await report_delivery.start()
+
+
+@app.on_event("startup")
+async def resume_checkpointed_flows():
+    """恢复上次进程退出时未完成的 Flow（需开启 FLOW_CHECKPOINT_ENABLED）"""
+    checkpoints = flow_checkpoints.load_unfinished()
+    if checkpoints:
+        logger.info(f"发现 {len(checkpoints)} 个未完成的 Flow 检查点，开始恢复")
+    for checkpoint in checkpoints:
+        resume_checkpointed_flow(checkpoint)
+
+
+@app.on_event("shutdown")
+async def stop_report_delivery():
+    await report_delivery.stop()
+
+
+# 批量分析规划器（规则分类，无 LLM 调用）
+batch_planner = BatchAnalysisPlanner()
+
+# SeaTalk 事件去重器，平台重试同一事件时不重复触发分析
+seatalk_event_deduplicator = EventDeduplicator(
+    max_entries=int(os.getenv("SEATALK_EVENT_DEDUP_MAX_ENTRIES", "10000"))
+)
+
+
 # 定义请求体模型
 class AnalyzeRequest(BaseModel):
     text: str
+    timeout_seconds: Optional[float] = None  # 仅同步接口使用，超过后取消分析
+    latency_budget_seconds: Optional[float] = None  # 时间预算，不足时跳过低优先级分析并提前生成报告
+
+
+class AnalyzeBatchRequest(BaseModel):
+    texts: List[str]
+    latency_budget_seconds: Optional[float] = None
 
 
 # 定义响应模型
@@ -49,47 +152,195 @@ class AnalyzeResponse(BaseModel):
     metadata: dict = None
 
 
-def run_flow_analysis(request: AnalyzeRequest):
-    """用于在后台运行的 Flow 分析任务"""
+def build_analysis_summary(flow: "HeimdallrFlow") -> dict:
+    """根据 Flow 状态构建分析摘要"""
+    return {
+        "flow_id": flow.state.flow_id,
+        "input_classification": {
+            "type": flow.state.classification.input_type.value if flow.state.classification else "unknown",
+            "confidence": flow.state.classification.confidence if flow.state.classification else 0.0,
+            "reasoning": flow.state.classification.reasoning if flow.state.classification else ""
+        },
+        "workflow_executed": flow.state.current_workflow,
+        "tasks_completed": len(flow.state.completed_tasks),
+        "tasks_failed": len(flow.state.failed_tasks),
+        "execution_time": flow.state.total_execution_time,
+        "progress": flow.state.get_workflow_progress(),
+        "execution_metadata": flow.state.metadata
+    }
+
+
+def track_flow_progress(request_id: str, flow: "HeimdallrFlow"):
+    """Flow 开始执行时更新状态，并在每个任务完成后更新进度、发布进度事件"""
+    # 记录到 Flow 检查点，进程重启恢复 Flow 后继续更新该请求
+    record = result_store.get(request_id)
+    flow_checkpoints.attach_request(flow.state, request_id, (record or {}).get("source"))
+    
+    # 合并到已在执行的 Flow 时需要补发已完成任务的事件。先注册监听器再补发，
+    # 按 task_type 去重，避免补发与监听之间完成的任务丢失或重复推送
+    published = set()
+    published_lock = threading.Lock()
+    
+    def publish_once(result):
+        with published_lock:
+            if result.task_type in published:
+                return
+            published.add(result.task_type)
+        publish_task_event(request_id, result)
+    
+    def on_task_result(state, task_type, result):
+        result_store.update(request_id, progress=state.get_task_progress())
+        publish_once(result)
+    
+    flow.state.add_result_listener(on_task_result)
+    for result in list(flow.state.analysis_results.values()):
+        publish_once(result)
+    
+    result_store.update(request_id, status=ResultStatus.RUNNING)
+    progress_broker.publish(request_id, ProgressEventType.STATUS, {
+        "request_id": request_id,
+        "status": ResultStatus.RUNNING,
+        "queue_wait_time": flow.state.metadata.get("queue_wait_time")
+    })
+
+
+def terminal_event_from_record(record: Optional[dict]) -> Optional[dict]:
+    """请求已结束时根据结果存储中的记录构建终止事件，未结束时返回 None"""
+    if record is None:
+        return None
+    if record["status"] == ResultStatus.COMPLETED:
+        return make_event(ProgressEventType.COMPLETED, {
+            "request_id": record["request_id"],
+            "status": ResultStatus.COMPLETED,
+            "final_report": record.get("final_report"),
+            "metadata": record.get("metadata")
+        })
+    if record["status"] == ResultStatus.FAILED:
+        return make_event(ProgressEventType.FAILED, {
+            "request_id": record["request_id"],
+            "status": ResultStatus.FAILED,
+            "error": record.get("error")
+        })
+    return None
+
+
+def publish_task_event(request_id: str, result):
+    """发布单个任务结果事件"""
+    progress_broker.publish(request_id, ProgressEventType.TASK_COMPLETED, {
+        "request_id": request_id,
+        "task_type": result.task_type,
+        "success": result.success,
+        "execution_time": result.execution_time,
+        "result_data": result.result_data,
+        "error_message": result.error_message
+    })
+
+
+def record_flow_result(request_id: str, future: Future):
+    """后台 Flow 执行结束后，将结果写入结果存储供轮询查询"""
     try:
-        logger.info(f"开始 Flow 分析任务，输入文本: '{request.text[:50]}...'")
-        
-        # 创建 Heimdallr Flow 实例并执行分析
-        flow = HeimdallrFlow(input_text=request.text)
-        result = flow.kickoff()
+        flow = future.result()
         
         # 提取分析结果
         final_report = flow.state.final_report if flow.state.final_report else "分析完成，但未生成报告"
+        analysis_summary = build_analysis_summary(flow)
         
-        # 构建分析摘要
-        analysis_summary = {
-            "flow_id": flow.state.flow_id,
-            "input_classification": {
-                "type": flow.state.classification.input_type.value if flow.state.classification else "unknown",
-                "confidence": flow.state.classification.confidence if flow.state.classification else 0.0,
-                "reasoning": flow.state.classification.reasoning if flow.state.classification else ""
-            },
-            "workflow_executed": flow.state.current_workflow,
-            "tasks_completed": len(flow.state.completed_tasks),
-            "tasks_failed": len(flow.state.failed_tasks),
-            "execution_time": flow.state.total_execution_time,
-            "progress": flow.state.get_workflow_progress()
-        }
+        result_store.update(
+            request_id,
+            status=ResultStatus.COMPLETED,
+            progress=flow.state.get_task_progress(),
+            final_report=final_report,
+            metadata=analysis_summary
+        )
+        progress_broker.publish(request_id, ProgressEventType.COMPLETED, {
+            "request_id": request_id,
+            "status": ResultStatus.COMPLETED,
+            "final_report": final_report,
+            "metadata": analysis_summary
+        })
         
-        logger.info(f"Flow 分析任务完成，工作流: {flow.state.current_workflow}, "
+        logger.info(f"Flow 分析任务 {request_id} 完成，工作流: {flow.state.current_workflow}, "
                    f"完成任务: {len(flow.state.completed_tasks)}, "
                    f"耗时: {flow.state.total_execution_time:.2f}s")
         logger.debug(f"最终报告:\n{final_report}")
         
-        # 这里可以将结果存储到数据库或缓存中，供后续查询
-        # 暂时只记录到日志
+        deliver_report(request_id, final_report)
         
     except Exception as e:
-        logger.error(f"Flow 分析任务执行失败: {e}", exc_info=True)
+        logger.error(f"Flow 分析任务 {request_id} 执行失败: {e}", exc_info=True)
+        result_store.update(request_id, status=ResultStatus.FAILED, error=str(e))
+        progress_broker.publish(request_id, ProgressEventType.FAILED, {
+            "request_id": request_id,
+            "status": ResultStatus.FAILED,
+            "error": str(e)
+        })
+
+
+def deliver_report(request_id: str, final_report: str):
+    """请求来自 SeaTalk 时，将最终报告投递回原会话（只入队，不阻塞 Flow 工作线程）"""
+    record = result_store.get(request_id)
+    source = (record or {}).get("source") or {}
+    if source.get("channel") == "seatalk" and source.get("reply_target"):
+        report_delivery.deliver_threadsafe(source["reply_target"], final_report)
+
+
+def submit_background_analysis(request_id: str, text: str, source: Optional[dict] = None,
+                               latency_budget: Optional[float] = None) -> bool:
+    """记录请求并提交到 Flow 执行器（相同告警合并到执行中的 Flow），返回是否合并
+
+    队列已满时删除请求记录并抛出 FlowQueueFullError。
+    """
+    result_store.create(request_id, text, source=source)
+    try:
+        future, coalesced = flow_coalescer.submit(
+            text,
+            on_flow_created=lambda flow: track_flow_progress(request_id, flow),
+            latency_budget=latency_budget
+        )
+    except FlowQueueFullError:
+        result_store.delete(request_id)
+        raise
+    future.add_done_callback(lambda f: record_flow_result(request_id, f))
+    return coalesced
+
+
+def resume_checkpointed_flow(checkpoint: FlowCheckpoint):
+    """从检查点恢复 Flow，结果继续写入原请求；结果存储中已没有的请求按检查点重建记录"""
+    state = checkpoint.state
+    request_ids = list(checkpoint.requests)
+    # 进程停止期间不计入总执行时间：按检查点保存后经过的时间顺延 Flow 的开始时间
+    downtime = max(0.0, time.time() - checkpoint.updated_at)
+    state.input_timestamp += timedelta(seconds=downtime)
+    state.metadata["resume_downtime"] = round(downtime, 3)
+    for request_id, source in checkpoint.requests.items():
+        if result_store.get(request_id) is None:
+            result_store.create(request_id, state.input_text, source=source)
+    
+    def on_flow_created(flow):
+        for request_id in request_ids:
+            track_flow_progress(request_id, flow)
+    
+    try:
+        future = flow_executor.submit(state.input_text, on_flow_created=on_flow_created, resume_state=state)
+    except FlowQueueFullError:
+        logger.warning(f"Flow 队列已满，暂不恢复 Flow {checkpoint.flow_id}")
+        return
+    for request_id in request_ids:
+        future.add_done_callback(lambda f, rid=request_id: record_flow_result(rid, f))
+    logger.info(f"恢复 Flow {checkpoint.flow_id}，已完成任务: {state.completed_tasks}，请求: {request_ids}")
+
+
+def queue_full_response(error: FlowQueueFullError, content: dict) -> JSONResponse:
+    """构建队列已满时的 429 响应"""
+    return JSONResponse(
+        status_code=429,
+        content=content,
+        headers={"Retry-After": str(error.retry_after)}
+    )
 
 
 @app.post("/analyze", response_model=dict)
-async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+async def analyze_text(request: AnalyzeRequest):
     """
     接收文本分析请求，立即返回确认，并在后台启动分析任务。
     支持多种输入类型：告警信息、Jira 工单、日志查询等。
@@ -104,19 +355,32 @@ async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTask
             }
         
         # 生成请求ID
-        import uuid
         request_id = str(uuid.uuid4())
         
-        # 在后台启动分析任务
-        background_tasks.add_task(run_flow_analysis, request)
+        # 提交到 Flow 执行器，队列已满时返回 429
+        try:
+            coalesced = submit_background_analysis(request_id, request.text,
+                                                   latency_budget=request.latency_budget_seconds)
+        except FlowQueueFullError as e:
+            return queue_full_response(e, {
+                "success": False,
+                "message": str(e),
+                "request_id": None,
+                "retry_after": e.retry_after
+            })
         
-        logger.info(f"接收到分析请求 {request_id}，文本长度: {len(request.text)}")
+        logger.info(f"接收到分析请求 {request_id}，文本长度: {len(request.text)}"
+                    f"{'，已合并到执行中的相同分析' if coalesced else ''}")
         
         return {
             "success": True,
             "message": "分析请求已接收，Heimdallr 正在后台进行智能诊断...",
             "request_id": request_id,
-            "estimated_time": "预计30-60秒完成"
+            "coalesced": coalesced,
+            "estimated_time": (f"预计{request.latency_budget_seconds:g}秒内完成"
+                               if request.latency_budget_seconds else "预计30-60秒完成"),
+            "status_url": f"/analyze/{request_id}",
+            "events_url": f"/analyze/{request_id}/events"
         }
         
     except Exception as e:
@@ -128,10 +392,84 @@ async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTask
         }
 
 
+@app.post("/analyze-batch", response_model=dict)
+async def analyze_batch(request: AnalyzeBatchRequest):
+    """
+    批量分析接口 - 一次接收多条输入，统一做规则分类并按分类和指纹分组，
+    每组只执行一次 Flow，每条输入都返回所属分组的 request_id 供查询结果。
+    """
+    texts = request.texts
+    if not texts:
+        return {"success": False, "message": "输入列表为空", "results": []}
+    if len(texts) > MAX_BATCH_SIZE:
+        return {"success": False, "message": f"单次最多提交 {MAX_BATCH_SIZE} 条输入", "results": []}
+    
+    results: List[dict] = [None] * len(texts)
+    valid_indexes = []
+    for index, text in enumerate(texts):
+        if not text or len(text.strip()) < 3:
+            results[index] = {"index": index, "success": False, "message": "输入文本太短，至少需要3个字符"}
+        else:
+            valid_indexes.append(index)
+    
+    # 规划可能执行分类并首次导入 crewai，在线程池中执行，避免阻塞事件循环
+    plan = await run_in_threadpool(batch_planner.plan, [texts[index] for index in valid_indexes])
+    
+    accepted_groups = 0
+    retry_after = None
+    for group in plan["groups"]:
+        request_id = str(uuid.uuid4())
+        try:
+            coalesced = submit_background_analysis(request_id, group.representative_text,
+                                                   latency_budget=request.latency_budget_seconds)
+            accepted_groups += 1
+            group_result = {
+                "success": True,
+                "request_id": request_id,
+                "coalesced": coalesced,
+                "status_url": f"/analyze/{request_id}",
+                "events_url": f"/analyze/{request_id}/events"
+            }
+        except FlowQueueFullError as e:
+            retry_after = e.retry_after
+            group_result = {"success": False, "message": str(e), "retry_after": e.retry_after}
+        
+        for plan_index in group.item_indexes:
+            item = plan["items"][plan_index]
+            index = valid_indexes[plan_index]
+            results[index] = {
+                "index": index,
+                "group_key": group.group_key,
+                "input_type": item["input_type"],
+                "confidence": item["confidence"],
+                **group_result
+            }
+    
+    logger.info(f"接收到批量分析请求: {len(texts)} 条输入, {len(plan['groups'])} 组, "
+                f"已提交 {accepted_groups} 组")
+    
+    response = {
+        "success": accepted_groups > 0,
+        "message": f"已提交 {accepted_groups}/{len(plan['groups'])} 组分析",
+        "total_items": len(texts),
+        "total_groups": len(plan["groups"]),
+        "accepted_groups": accepted_groups,
+        "results": results
+    }
+    if retry_after is not None:
+        response["retry_after"] = retry_after
+        if accepted_groups == 0:
+            return JSONResponse(status_code=429, content=response,
+                                headers={"Retry-After": str(retry_after)})
+    return response
+
+
 @app.post("/analyze-sync", response_model=AnalyzeResponse)
-def analyze_text_sync(request: AnalyzeRequest):
+async def analyze_text_sync(request: AnalyzeRequest, http_request: Request):
     """
     同步分析接口 - 直接返回分析结果（用于测试或小规模使用）
+    
+    Flow 在专用线程池中执行，不占用 Web 服务线程；超过截止时间或客户端断开连接时取消分析。
     """
     try:
         logger.info(f"收到同步分析请求，文本长度: {len(request.text)}")
@@ -143,27 +481,24 @@ def analyze_text_sync(request: AnalyzeRequest):
                 message="输入文本太短，至少需要3个字符"
             )
         
-        # 创建 Heimdallr Flow 实例并执行分析
-        flow = HeimdallrFlow(input_text=request.text)
-        result = flow.kickoff()
+        timeout = min(request.timeout_seconds or SYNC_ANALYSIS_TIMEOUT_SECONDS,
+                      SYNC_ANALYSIS_MAX_TIMEOUT_SECONDS)
+        # 时间预算不超过超时时间，保证超时取消前已按预算生成报告
+        latency_budget = min(request.latency_budget_seconds, timeout) if request.latency_budget_seconds else None
+        
+        # 在 Flow 执行器中执行分析
+        flow = await flow_coalescer.run_async(
+            request.text,
+            timeout=timeout,
+            is_disconnected=http_request.is_disconnected,
+            latency_budget=latency_budget
+        )
         
         # 提取最终报告
         final_report = flow.state.final_report if flow.state.final_report else "分析完成，但未生成报告"
         
         # 构建详细的分析结果
-        analysis_summary = {
-            "flow_id": flow.state.flow_id,
-            "input_classification": {
-                "type": flow.state.classification.input_type.value if flow.state.classification else "unknown",
-                "confidence": flow.state.classification.confidence if flow.state.classification else 0.0,
-                "reasoning": flow.state.classification.reasoning if flow.state.classification else ""
-            },
-            "workflow_executed": flow.state.current_workflow,
-            "tasks_completed": len(flow.state.completed_tasks),
-            "tasks_failed": len(flow.state.failed_tasks),
-            "execution_time": flow.state.total_execution_time,
-            "progress": flow.state.get_workflow_progress()
-        }
+        analysis_summary = build_analysis_summary(flow)
         
         # 返回结果
         return AnalyzeResponse(
@@ -173,6 +508,17 @@ def analyze_text_sync(request: AnalyzeRequest):
             metadata=analysis_summary
         )
         
+    except FlowQueueFullError as e:
+        return queue_full_response(e, AnalyzeResponse(success=False, message=str(e)).dict())
+    except FlowTimeoutError as e:
+        logger.warning(f"同步分析超时: {e}")
+        return JSONResponse(
+            status_code=504,
+            content=AnalyzeResponse(success=False, message=f"分析超时: {str(e)}").dict()
+        )
+    except FlowCancelledError as e:
+        logger.info(f"同步分析已取消: {e}")
+        return AnalyzeResponse(success=False, message=f"分析已取消: {str(e)}")
     except Exception as e:
         logger.error(f"同步分析过程中发生错误: {e}", exc_info=True)
         return AnalyzeResponse(
@@ -181,6 +527,94 @@ def analyze_text_sync(request: AnalyzeRequest):
         )
 
 
+@app.post("/seatalk/callback")
+async def seatalk_event_callback(http_request: Request):
+    """
+    SeaTalk 事件回调接口：验证签名后立即响应。
+    - event_verification: 原样返回 seatalk_challenge
+    - 机器人消息事件: 按 event_id 去重后提交后台分析，不等待分析完成
+    """
+    body = await http_request.body()
+    if not is_valid_signature(body, http_request.headers.get("signature"), SEATALK_SIGNING_SECRET):
+        logger.warning("SeaTalk 回调签名校验失败")
+        raise HTTPException(status_code=403, detail="invalid signature")
+    
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid json")
+    
+    event_type = data.get("event_type", "")
+    event = data.get("event") or {}
+    
+    if event_type == EVENT_VERIFICATION:
+        return {"seatalk_challenge": event.get("seatalk_challenge")}
+    
+    if event_type not in MESSAGE_EVENT_TYPES:
+        logger.debug(f"忽略 SeaTalk 事件: {event_type}")
+        return {}
+    
+    event_id = str(data.get("event_id", ""))
+    if event_id and seatalk_event_deduplicator.check_and_mark(event_id):
+        logger.info(f"SeaTalk 事件 {event_id} 已处理过，忽略重试")
+        return {}
+    
+    text = extract_message_text(event_type, event)
+    if not text or len(text) < 3:
+        logger.info(f"SeaTalk 事件 {event_id} 不包含可分析的文本消息")
+        return {}
+    
+    request_id = str(uuid.uuid4())
+    try:
+        submit_background_analysis(request_id, text, source={
+            "channel": "seatalk",
+            "event_id": event_id,
+            "event_type": event_type,
+            "reply_target": extract_reply_target(event_type, event)
+        })
+        logger.info(f"SeaTalk 事件 {event_id} 已提交分析，请求 {request_id}")
+    except FlowQueueFullError as e:
+        # 仍然返回 200，避免平台重试加重拥塞
+        logger.warning(f"SeaTalk 事件 {event_id} 因队列已满未能提交分析: {e}")
+    
+    return {}
+
+
+@app.get("/analyze/{request_id}")
+async def get_analysis_result(request_id: str):
+    """
+    查询异步分析请求的状态、任务进度和最终报告。
+    """
+    record = result_store.get(request_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"未找到分析请求 {request_id}，可能已过期")
+    return record
+
+
+@app.get("/analyze/{request_id}/events")
+async def stream_analysis_events(request_id: str, http_request: Request):
+    """
+    以 Server-Sent Events 推送分析进度：每个任务记录结果时推送 task_completed 事件，
+    分析结束时推送 completed 或 failed 事件后关闭连接。
+    事件历史已被淘汰（或进程重启）时，按结果存储中的最终状态推送终止事件。
+    """
+    if result_store.get(request_id) is None:
+        raise HTTPException(status_code=404, detail=f"未找到分析请求 {request_id}，可能已过期")
+    
+    async def event_stream():
+        terminal_check = lambda: terminal_event_from_record(result_store.get(request_id))
+        async for event in progress_broker.subscribe(request_id, terminal_check=terminal_check):
+            if await http_request.is_disconnected():
+                break
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/")
 async def root():
     return {
@@ -209,6 +643,12 @@ async def health_check():
             "version": "2.0.0",
             "architecture": "CrewAI Flow + Dynamic Workflow Router",
             "api_key_configured": api_key_configured,
+            "flow_executor": flow_executor.stats(),
+            "flow_coalescer": flow_coalescer.stats(),
+            "agent_pool": agent_pool_stats(),
+            "llms": llm_stats(),
+            "llm_rate_limiter": llm_rate_limiter_stats(),
+            "speculation": speculation_stats(),
             "supported_input_types": ["alert", "jira_issue", "log_query", "hybrid", "unknown"]
         }
     except Exception as e:
@@ -219,6 +659,15 @@ async def health_check():
         }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 格式的运行指标：各阶段延迟直方图、LLM 和工具调用耗时、队列深度等"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/capabilities")
 async def get_capabilities():
     """获取系统能力描述"""
@@ -263,7 +712,12 @@ if __name__ == "__main__":
     logger.info(f"API 文档: http://localhost:{os.getenv('PORT', '8000')}/docs")
     logger.info(f"同步分析接口: POST /analyze-sync")
     logger.info(f"异步分析接口: POST /analyze")
+    logger.info(f"批量分析接口: POST /analyze-batch")
+    logger.info(f"分析结果查询: GET /analyze/{{request_id}}")
+    logger.info(f"分析进度推送: GET /analyze/{{request_id}}/events")
     logger.info(f"系统能力: GET /capabilities")
+    logger.info(f"SeaTalk 事件回调: POST /seatalk/callback")
+    logger.info(f"运行指标: GET /metrics")
 
     try:
         uvicorn.run(
@@ -0,0 +1,73 @@
+"""Agent 构造开销基准测试
+
+对比每个 Flow 的 agent 准备开销：
+- rebuild: 旧方式，每个 Flow 构造全部 agent
+- pool:    从进程级 agent 池租借工作流实际需要的 agent（预热后）
+
+用法:
+    python scripts/benchmark_agent_pool.py --flows 50
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.llms import llm_registry
+from app.agent_pool import AgentPool, AGENT_FACTORIES, agent_key_for_task
+from app.tasks import WorkflowTemplates
+
+WORKFLOW_TYPES = ["alert", "jira_issue", "log_query", "hybrid", "unknown"]
+
+
+def rebuild_all(llm):
+    return [factory(llm) for factory in AGENT_FACTORIES.values()]
+
+
+def lease_workflow(pool: AgentPool, llm, workflow_type: str):
+    agent_keys = [agent_key_for_task(task_type)
+                  for task_type in WorkflowTemplates.get_workflow_for_input_type(workflow_type)]
+    for agent_key in filter(None, agent_keys):
+        with pool.lease(agent_key, llm):
+            pass
+
+
+def measure(function, flows: int):
+    samples = []
+    for index in range(flows):
+        start_time = time.perf_counter()
+        function(index)
+        samples.append((time.perf_counter() - start_time) * 1000)
+    return statistics.mean(samples), statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比每个 Flow 的 agent 构造开销")
+    parser.add_argument("--flows", type=int, default=50, help="模拟的 Flow 数量")
+    args = parser.parse_args()
+
+    llm = llm_registry.get("default")
+    pool = AgentPool()
+    # 预热：首次导入和构造的开销不计入
+    rebuild_all(llm)
+    for workflow_type in WORKFLOW_TYPES:
+        lease_workflow(pool, llm, workflow_type)
+
+    results = {
+        "rebuild": measure(lambda index: rebuild_all(llm), args.flows),
+        "pool": measure(lambda index: lease_workflow(pool, llm, WORKFLOW_TYPES[index % len(WORKFLOW_TYPES)]),
+                        args.flows),
+    }
+
+    print(f"每个 Flow 的 agent 准备耗时 ({args.flows} 个 Flow, ms):")
+    print(f"  {'方式':<10}{'平均':>10}{'中位数':>10}{'最大':>10}")
+    for name, (mean, median, maximum) in results.items():
+        print(f"  {name:<10}{mean:>10.3f}{median:>10.3f}{maximum:>10.3f}")
+    print(f"\nagent 池状态: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""启动耗时基准测试
+
+在全新的子进程中用 `python -X importtime` 导入目标模块，统计整体导入耗时和各模块的累计导入耗时，
+用于跟踪 API 进程的冷启动时间。
+
+用法:
+    python scripts/benchmark_startup.py                  # 默认导入 main
+    python scripts/benchmark_startup.py --module app.heimdallr_flow --repeat 5 --top 30
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_import(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """在子进程中导入模块，返回 (墙钟耗时秒数, {模块名: (自身耗时us, 累计耗时us)})"""
+    start_time = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    wall_time = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr[-2000:]}")
+
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return wall_time, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计 API 进程的模块导入耗时")
+    parser.add_argument("--module", default="main", help="要导入的模块，默认 main")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取中位数")
+    parser.add_argument("--top", type=int, default=20, help="输出累计耗时最高的模块数量")
+    args = parser.parse_args()
+
+    wall_times: List[float] = []
+    runs: List[Dict[str, Tuple[int, int]]] = []
+    for _ in range(args.repeat):
+        wall_time, timings = run_import(args.module)
+        wall_times.append(wall_time)
+        runs.append(timings)
+
+    modules = set().union(*runs)
+    cumulative = {
+        name: statistics.median(run[name][1] for run in runs if name in run) / 1000
+        for name in modules
+    }
+    project_modules = sorted(
+        (name for name in modules if name == "main" or name.split(".")[0] in ("app", "config")),
+        key=lambda name: cumulative[name], reverse=True
+    )
+    top_level = sorted(
+        (name for name in modules if "." not in name),
+        key=lambda name: cumulative[name], reverse=True
+    )
+
+    print(f"导入 {args.module}: 中位数 {statistics.median(wall_times):.3f}s "
+          f"(含解释器启动, {args.repeat} 次: {', '.join(f'{t:.3f}s' for t in wall_times)})")
+
+    print(f"\n项目模块累计导入耗时 (ms):")
+    for name in project_modules[:args.top]:
+        print(f"  {cumulative[name]:>10.1f}  {name}")
+
+    print(f"\n顶层包累计导入耗时 Top {args.top} (ms):")
+    for name in top_level[:args.top]:
+        print(f"  {cumulative[name]:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""综合分析模式基准测试
+
+对比两种综合分析模式的延迟和 token 消耗：
+- full: timeline_reconstruction -> root_cause_hypothesis -> hypothesis_validation
+        -> solution_architecture -> comprehensive_report 五次串行 LLM 调用
+- fast: 一次 fast_synthesis 结构化调用
+
+两种模式使用相同的上游分析结果（告警、日志分析样例），按路由器的方式准备任务参数。
+需要可用的 LLM（按 .env 中的配置，综合分析任务使用 deep 分级），每个任务使用新构造的 agent 以单独统计 token。
+
+用法:
+    python scripts/benchmark_synthesis.py --repeat 3
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crewai import Crew, Process
+
+from app.llms import llm_registry
+from app.agent_pool import AGENT_FACTORIES, agent_key_for_task
+from app.dynamic_workflow_router import DynamicWorkflowRouter
+from app.flow_state import DiagnosisState, AnalysisResult, ClassificationResult, InputType
+from app.tasks import TaskRegistry, WorkflowTemplates
+
+SAMPLE_INPUT = "[CRITICAL] payment-service 2024-01-15 14:20:00 数据库连接池耗尽，/api/pay 错误率 35%，P99 延迟 8s"
+
+# 综合分析之前的上游分析结果样例
+SAMPLE_RESULTS = {
+    "alert_triage": {
+        "severity": "Critical",
+        "urgency": "High",
+        "affected_service": "payment-service",
+        "summary": "支付服务数据库连接池耗尽，接口错误率和延迟显著上升"
+    },
+    "alert_component_identification": {
+        "primary_component": "payment-service",
+        "dependencies": ["payment-db (MySQL)", "order-service", "redis-cache"],
+        "infrastructure": ["k8s prod-cluster", "HikariCP 连接池 (max 50)"]
+    },
+    "log_pattern_analysis": {
+        "error_patterns": [
+            {"pattern": "HikariPool-1 - Connection is not available, request timed out after 30000ms",
+             "count": 1843, "first_seen": "2024-01-15T14:18:12Z"},
+            {"pattern": "SlowQuery: SELECT * FROM payment_orders WHERE status = ? (12.4s)",
+             "count": 212, "first_seen": "2024-01-15T14:15:40Z"}
+        ],
+        "deployments": [{"service": "payment-service", "version": "v2.31.0", "time": "2024-01-15T14:10:00Z"}],
+        "trend": "14:15 起慢查询增加，14:18 起连接获取超时持续上升"
+    }
+}
+
+
+def build_state() -> DiagnosisState:
+    state = DiagnosisState(
+        input_text=SAMPLE_INPUT,
+        classification=ClassificationResult(input_type=InputType.ALERT, confidence=0.95)
+    )
+    for task_type, result_data in SAMPLE_RESULTS.items():
+        state.add_analysis_result(task_type, AnalysisResult(task_type=task_type, result_data=result_data))
+    return state
+
+
+def run_synthesis(router: DynamicWorkflowRouter, synthesis_tasks):
+    """按顺序执行综合分析任务，返回 (总耗时秒, prompt token, completion token, 任务描述总字符数)"""
+    state = build_state()
+    prompt_tokens = completion_tokens = description_chars = 0
+    start_time = time.perf_counter()
+    for task_type in synthesis_tasks:
+        # 每个任务使用新的 agent（按任务的模型分级选择 LLM），token 统计不与其他任务累加
+        agent = AGENT_FACTORIES[agent_key_for_task(task_type)](llm_registry.get_for_task(task_type, fallback=router.llm))
+        task = TaskRegistry.create_task(task_type, agent, **router._prepare_task_parameters(task_type, state))
+        description_chars += len(task.description)
+        output = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False).kickoff()
+        prompt_tokens += output.token_usage.prompt_tokens
+        completion_tokens += output.token_usage.completion_tokens
+        state.add_analysis_result(task_type, AnalysisResult(
+            task_type=task_type,
+            result_data=router._parse_task_result(output.raw, task_type, output.pydantic)
+        ))
+    return time.perf_counter() - start_time, prompt_tokens, completion_tokens, description_chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比完整与快速综合分析模式的延迟和 token 消耗")
+    parser.add_argument("--repeat", type=int, default=3, help="每种模式的执行次数")
+    args = parser.parse_args()
+
+    router = DynamicWorkflowRouter(llm_registry.get("default"))
+    modes = {
+        "full": WorkflowTemplates.SYNTHESIS_TASKS,
+        "fast": ["fast_synthesis"],
+    }
+
+    results = {}
+    for name, synthesis_tasks in modes.items():
+        samples = [run_synthesis(router, synthesis_tasks) for _ in range(args.repeat)]
+        results[name] = (
+            len(synthesis_tasks),
+            statistics.median(sample[0] for sample in samples),
+            statistics.median(sample[1] for sample in samples),
+            statistics.median(sample[2] for sample in samples),
+            statistics.median(sample[3] for sample in samples),
+        )
+
+    print(f"综合分析模式对比 (每种模式执行 {args.repeat} 次，取中位数):")
+    print(f"  {'模式':<8}{'LLM任务':>8}{'耗时(s)':>10}{'prompt':>10}{'completion':>12}{'描述字符':>10}")
+    for name, (calls, duration, prompt_tokens, completion_tokens, chars) in results.items():
+        print(f"  {name:<8}{calls:>8}{duration:>10.2f}{prompt_tokens:>10.0f}{completion_tokens:>12.0f}{chars:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
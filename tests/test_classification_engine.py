@@ -0,0 +1,19 @@
+from app.classification_engine import RuleBasedClassifier, filter_jira_issue_keys
+from app.flow_state import InputType
+
+
+def test_filter_drops_encoding_and_standard_tokens():
+    keys = ["UTF-8", "ISO-8601", "SHA-256", "CASH-123", "LOAN-7", "CASH-123"]
+    assert filter_jira_issue_keys(keys) == ["CASH-123", "LOAN-7"]
+
+
+def test_rule_classifier_ignores_non_jira_tokens():
+    text = "请求体编码为 UTF-8，时间格式 ISO-8601，签名算法 SHA-256，解析失败"
+    result = RuleBasedClassifier().classify(text)
+    assert result.input_type != InputType.JIRA_ISSUE
+    assert not result.extracted_data.get("jira_issues")
+
+
+def test_rule_classifier_keeps_real_issue_keys():
+    result = RuleBasedClassifier().classify("请看 CASH-123，日志里 UTF-8 解码失败")
+    assert result.extracted_data.get("jira_issues") == ["CASH-123"]
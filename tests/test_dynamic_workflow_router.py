@@ -0,0 +1,41 @@
+import time
+
+from app.dynamic_workflow_router import DynamicWorkflowRouter
+from app.flow_state import AnalysisResult, DiagnosisState
+
+TASK_SECONDS = {
+    'alert_triage': 0.2,
+    'alert_log_search_params': 0.2,
+    'log_search_execution': 6.0,
+    'comprehensive_report': 0.2,
+}
+
+
+def test_report_starts_before_slow_task_when_budget_expires():
+    router = DynamicWorkflowRouter(llm=None)
+    started = {}
+
+    def execute(task_type, state, cancel_event=None):
+        started[task_type] = time.time()
+        time.sleep(TASK_SECONDS[task_type])
+        return AnalysisResult(task_type=task_type, result_data={"ok": True}, execution_time=0.0, success=True)
+
+    router._execute_single_task = execute
+    state = DiagnosisState(input_text="ERROR: payment-service timeout")
+    start = time.time()
+    state.latency_deadline = start + 2.5
+
+    router._execute_dag(
+        list(TASK_SECONDS),
+        {
+            'log_search_execution': ['alert_log_search_params'],
+            'comprehensive_report': ['alert_triage', 'log_search_execution'],
+        },
+        state
+    )
+    elapsed = time.time() - start
+
+    assert started['comprehensive_report'] - start < TASK_SECONDS['log_search_execution']
+    assert elapsed < TASK_SECONDS['log_search_execution']
+    assert 'comprehensive_report' in state.completed_tasks
+    assert 'log_search_execution' in state.metadata["shed_tasks"]
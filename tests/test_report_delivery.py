@@ -0,0 +1,37 @@
+import random
+
+from app.report_delivery import split_markdown
+
+
+def _assert_within_limit(text, max_length):
+    chunks = split_markdown(text, max_length=max_length)
+    assert chunks
+    assert all(len(chunk) <= max_length for chunk in chunks), [len(chunk) for chunk in chunks]
+    return chunks
+
+
+def test_long_line_outside_fence_is_hard_cut():
+    chunks = _assert_within_limit("标题\n" + "x" * 450 + "\n结尾", 100)
+    assert "".join(chunks).count("x") == 450
+
+
+def test_long_line_inside_fence_is_hard_cut_and_reopened():
+    text = "说明\n```python\n" + "q" * 450 + "\nprint(1)\n```\n结尾"
+    chunks = _assert_within_limit(text, 100)
+    assert "".join(chunks).count("q") == 450
+    for chunk in chunks[1:-1]:
+        assert chunk.startswith("```python")
+        assert chunk.endswith("\n```")
+
+
+def test_random_markdown_chunks_within_limit():
+    rng = random.Random(0)
+    for _ in range(200):
+        lines = []
+        for _ in range(rng.randint(1, 40)):
+            kind = rng.random()
+            if kind < 0.15:
+                lines.append("```" + rng.choice(["", "json", "python"]))
+            else:
+                lines.append("z" * rng.randint(0, 300))
+        _assert_within_limit("\n".join(lines), rng.randint(40, 200))